@@ -14,6 +14,7 @@ ApiKeyDep = Depends(require_api_key)
 IdempotencyDep = Depends(get_idempotency_key)
 
 
-def ApprovalDep(x_approved: str | None = Header(default=None)) -> None:
+# Async deps run inline on the event loop instead of a threadpool hop
+async def ApprovalDep(x_approved: str | None = Header(default=None)) -> None:
   return require_approval(x_approved)
 
@@ -1,7 +1,10 @@
 from fastapi import APIRouter
 
+from backend.api.routes.debug import router as debug_router
 from backend.api.routes.execute import router as execute_router
+from backend.api.routes.jobs import router as jobs_router
 from backend.api.routes.logs import router as logs_router
+from backend.api.routes.metrics import router as metrics_router
 from backend.api.routes.preview import router as preview_router
 from backend.api.routes.rollback import router as rollback_router
 
@@ -9,6 +12,9 @@ api_router = APIRouter(prefix="/api")
 
 api_router.include_router(preview_router, tags=["preview"])
 api_router.include_router(execute_router, tags=["execute"])
+api_router.include_router(jobs_router, tags=["jobs"])
 api_router.include_router(rollback_router, tags=["rollback"])
 api_router.include_router(logs_router, tags=["logs"])
+api_router.include_router(metrics_router, tags=["metrics"])
+api_router.include_router(debug_router, tags=["debug"])
 
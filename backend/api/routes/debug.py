@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from backend.api.deps import ApiKeyDep
+from backend.schemas.response import ProfilesResponse, ProfileSummary
+from backend.services.profile_service import profile_store
+from backend.utils.encoding import FastJSONResponse
+
+router = APIRouter(prefix="/debug")
+
+
+@router.get("/profiles", response_model=ProfilesResponse, dependencies=[ApiKeyDep])
+async def list_profiles() -> ProfilesResponse:
+  return ProfilesResponse(items=[ProfileSummary(**p.summary()) for p in profile_store.list()])
+
+
+@router.get("/profiles/{profile_id}", dependencies=[ApiKeyDep])
+async def get_profile(profile_id: str, format: str = Query(default="folded", pattern="^(folded|json)$")):
+  # Folded stacks download as a file (flamegraph.pl / speedscope); json adds
+  # the phase timings
+  profile = profile_store.get(profile_id)
+  if profile is None:
+    raise HTTPException(status_code=404, detail=f"unknown profile: {profile_id}")
+  if format == "json":
+    return FastJSONResponse({
+      **profile.summary(),
+      "interval_ms": profile.interval_ms,
+      "timings": [{"phase": n, "ms": round(s * 1000, 3), "count": c} for n, s, c in profile.timings],
+      "stacks": profile.stacks,
+    })
+  return PlainTextResponse(
+    profile.folded(),
+    headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+  )
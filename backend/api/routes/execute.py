@@ -1,26 +1,115 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from backend.api.deps import ApiKeyDep, ApprovalDep, IdempotencyDep
-from backend.core.idempotency import get_cached_response, store_cached_response
-from backend.schemas.execution import ExecuteRequest, ExecuteResponse
-from backend.services.execution_service import execute_action
+from backend.core.config import get_settings
+from backend.core.idempotency import CachedResponse, derive_idempotency_key, idempotency_store, replay_response
+from backend.core.timing import phase
+from backend.schemas.execution import BatchExecuteRequest, BatchExecuteResponse, ExecuteRequest, ExecuteResponse
+from backend.schemas.job import JobAccepted
+from backend.services.batch_service import check_batch_size, iter_batch, run_batch
+from backend.services.execution_service import aexecute_action
+from backend.services.job_service import job_queue
+from backend.services.stream_service import iter_execute_events
+from backend.tools.router import tool_router
+from backend.utils.encoding import FastJSONResponse, json_bytes
 
 router = APIRouter()
 
 
-@router.post("/execute", response_model=ExecuteResponse, dependencies=[ApiKeyDep])
-def execute(
+@router.post(
+  "/execute",
+  response_model=ExecuteResponse,
+  responses={202: {"model": JobAccepted}},
+  dependencies=[ApiKeyDep],
+)
+async def execute(
   req: ExecuteRequest,
   _approval: None = Depends(ApprovalDep),
   idem_key: str | None = IdempotencyDep,
-) -> ExecuteResponse:
-  if idem_key:
-    cached = get_cached_response(idem_key)
-    if cached:
-      return ExecuteResponse.model_validate(cached)
+  mode: str = Query(default="sync", pattern="^(sync|async)$"),
+  prefer: str | None = Header(default=None),
+):
+  if mode == "async" or "respond-async" in (prefer or ""):
+    job_id = await run_in_threadpool(job_queue.submit, req, idem_key)
+    accepted = JobAccepted(job_id=job_id, status="queued", status_url=f"/api/jobs/{job_id}")
+    return FastJSONResponse(status_code=202, content=accepted.model_dump())
 
-  res = execute_action(req)
-  if idem_key:
-    store_cached_response(idem_key, res.model_dump())
-  return res
+  idem_key = idem_key or _derived_key(req)
+  if not idem_key:
+    return await aexecute_action(req)
 
+  async def _run() -> CachedResponse:
+    res = await aexecute_action(req)
+    with phase("serialize"):
+      return CachedResponse(body=res.model_dump_json().encode())
+
+  # Concurrent requests with the same key share one execution; the encoded
+  # bytes are returned as-is, replays marked with Idempotent-Replay: true
+  value, replayed = await idempotency_store.arun_tracked(idem_key, _run)
+  return replay_response(value, replayed)
+
+
+def _derived_key(req: ExecuteRequest) -> str | None:
+  # Opt-in (AUTO_IDEMPOTENCY_KEY). Dry runs of tools whose preview depends on
+  # live data (cacheable_preview = False) are never replayed.
+  if not get_settings().auto_idempotency_key:
+    return None
+  if req.dry_run and not tool_router.get(req.tool).cacheable_preview:
+    return None
+  return derive_idempotency_key(req.tool, req.payload, req.dry_run)
+
+
+@router.post("/execute/stream", dependencies=[ApiKeyDep])
+async def execute_stream(
+  req: ExecuteRequest,
+  _approval: None = Depends(ApprovalDep),
+  idem_key: str | None = IdempotencyDep,
+  format: str = Query(default="sse", pattern="^(sse|ndjson)$"),
+):
+  # Progress events while the tool works, then the final ExecuteResponse in
+  # a "result" event. Same idempotency keys (explicit or derived) as
+  # /execute, so a retry of either replays the stored result.
+  tool_router.get(req.tool)  # unknown tools still fail with a plain 400
+  idem_key = idem_key or _derived_key(req)
+  sse = format == "sse"
+
+  async def _events():
+    seq = 0
+    async for event in iter_execute_events(req, idem_key):
+      if event is None:
+        yield b": keepalive\n\n" if sse else b"\n"
+        continue
+      seq += 1
+      data = json_bytes(event)
+      if sse:
+        yield b"id: %d\nevent: %s\ndata: %s\n\n" % (seq, event["event"].encode(), data)
+      else:
+        yield data + b"\n"
+
+  return StreamingResponse(
+    _events(),
+    media_type="text/event-stream" if sse else "application/x-ndjson",
+    # Keep proxies from buffering the stream
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+  )
+
+
+@router.post("/execute/batch", response_model=BatchExecuteResponse, dependencies=[ApiKeyDep])
+async def execute_batch(
+  req: BatchExecuteRequest,
+  stream: bool = False,
+  _approval: None = Depends(ApprovalDep),
+):
+  check_batch_size(req.items)
+  if stream:
+    # NDJSON, one line per item in completion order
+    async def _lines():
+      async for res in iter_batch(req.items):
+        yield res.model_dump_json() + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+  items, stats = await run_batch(req.items)
+  return BatchExecuteResponse(ok=all(r.ok for r in items), items=items, stats=stats)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Query
+
+from backend.api.deps import ApiKeyDep
+from backend.schemas.job import JobResponse
+from backend.services.job_service import job_queue
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse, dependencies=[ApiKeyDep])
+async def get_job(job_id: str, wait: float = Query(default=0, ge=0, le=60)) -> JobResponse:
+  # ?wait=N long-polls up to N seconds for the job to finish
+  return await job_queue.wait(job_id, wait)
@@ -1,13 +1,59 @@
-from fastapi import APIRouter, Depends
+import json
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from backend.api.deps import ApiKeyDep
 from backend.schemas.response import LogsResponse
-from backend.services.log_service import list_logs
+from backend.services.log_service import last_seq, page_logs, tail_logs
 
 router = APIRouter()
 
 
 @router.get("/logs", response_model=LogsResponse, dependencies=[ApiKeyDep])
-def get_logs() -> LogsResponse:
-  return LogsResponse(items=list_logs())
+def get_logs(
+  level: str | None = None,
+  message: str | None = Query(default=None, description="substring match"),
+  tool: str | None = None,
+  since_ts: float | None = None,
+  until_ts: float | None = None,
+  after_seq: int | None = Query(default=None, ge=0),
+  limit: int | None = Query(default=None, ge=1),
+) -> LogsResponse:
+  # Plain def: a shared state backend reads logs with blocking I/O
+  items, cursor = page_logs(
+    level=level,
+    message=message,
+    tool=tool,
+    since_ts=since_ts,
+    until_ts=until_ts,
+    after_seq=after_seq,
+    limit=limit,
+  )
+  return LogsResponse(items=items, last_seq=cursor)
+
+
+@router.get("/logs/tail", dependencies=[ApiKeyDep])
+async def tail(
+  request: Request,
+  after_seq: int | None = Query(default=None, ge=0),
+  level: str | None = None,
+  tool: str | None = None,
+  format: str = Query(default="ndjson", pattern="^(ndjson|sse)$"),
+) -> StreamingResponse:
+  # Live tail: streams entries newer than after_seq (default: from now on)
+  sse = format == "sse"
+
+  async def _stream():
+    cursor = await run_in_threadpool(last_seq) if after_seq is None else after_seq
+    while not await request.is_disconnected():
+      items, cursor = await tail_logs(cursor, level=level, tool=tool)
+      if not items:
+        yield ": keepalive\n\n" if sse else "\n"
+        continue
+      for item in items:
+        line = json.dumps(item.model_dump())
+        yield f"id: {item.seq}\ndata: {line}\n\n" if sse else line + "\n"
 
+  return StreamingResponse(_stream(), media_type="text/event-stream" if sse else "application/x-ndjson")
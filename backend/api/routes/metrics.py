@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import PlainTextResponse
+
+from backend.api.deps import ApiKeyDep
+from backend.core.metrics import metrics
+from backend.utils.encoding import FastJSONResponse
+
+router = APIRouter()
+
+
+@router.get("/metrics", dependencies=[ApiKeyDep])
+async def get_metrics(format: str = Query(default="prometheus", pattern="^(prometheus|json)$")):
+  # Prometheus text exposition; ?format=json gives p50/p95/p99 per series
+  if format == "json":
+    return FastJSONResponse(metrics.summary())
+  return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
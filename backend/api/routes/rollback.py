@@ -2,12 +2,12 @@ from fastapi import APIRouter, Depends
 
 from backend.api.deps import ApiKeyDep, ApprovalDep
 from backend.schemas.execution import RollbackRequest, RollbackResponse
-from backend.services.execution_service import rollback_action
+from backend.services.execution_service import arollback_action
 
 router = APIRouter()
 
 
 @router.post("/rollback", response_model=RollbackResponse, dependencies=[ApiKeyDep])
-def rollback(req: RollbackRequest, _approval: None = Depends(ApprovalDep)) -> RollbackResponse:
-  return rollback_action(req)
+async def rollback(req: RollbackRequest, _approval: None = Depends(ApprovalDep)) -> RollbackResponse:
+  return await arollback_action(req)
 
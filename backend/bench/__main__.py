@@ -0,0 +1,74 @@
+import argparse
+import json
+import sys
+
+from backend.bench.fakes import Faults
+from backend.bench.runner import WORKLOADS, BenchConfig, compare, run_bench
+
+
+def _ints(value: str) -> list[int]:
+  return [int(v) for v in value.split(",") if v]
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(
+    prog="python -m backend.bench",
+    description="Offline benchmark of the API against local Notion/Google stand-ins",
+  )
+  parser.add_argument("--concurrency", type=_ints, default=[1, 8, 32], help="comma-separated levels")
+  parser.add_argument("--requests", type=int, default=200, help="requests per workload and level")
+  parser.add_argument("--batch-size", type=int, default=20)
+  parser.add_argument("--workloads", default=",".join(WORKLOADS))
+  parser.add_argument("--latency-ms", type=float, default=20.0, help="fake provider latency")
+  parser.add_argument("--jitter", type=float, default=0.5)
+  parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of provider calls answered 429")
+  parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of provider calls answered 5xx")
+  parser.add_argument("--keep-rate-limits", action="store_true", help="keep client-side provider rate limits")
+  parser.add_argument("--state-backend", default="memory", choices=["memory", "sqlite", "supabase"])
+  parser.add_argument("--out", help="write JSON results here instead of stdout")
+  parser.add_argument("--baseline", help="previous results; exit 1 on regressions")
+  parser.add_argument("--tolerance", type=float, default=0.2)
+  args = parser.parse_args(argv)
+
+  workloads = [w for w in args.workloads.split(",") if w]
+  unknown = set(workloads) - set(WORKLOADS)
+  if unknown:
+    parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+
+  config = BenchConfig(
+    concurrency=args.concurrency,
+    requests=args.requests,
+    batch_size=args.batch_size,
+    workloads=workloads,
+    faults=Faults(latency_ms=args.latency_ms, jitter=args.jitter, rate_429=args.rate_429, error_rate=args.error_rate),
+    keep_rate_limits=args.keep_rate_limits,
+    state_backend=args.state_backend,
+  )
+  report = run_bench(config)
+
+  text = json.dumps(report, indent=2)
+  if args.out:
+    with open(args.out, "w", encoding="utf-8") as f:
+      f.write(text + "\n")
+  else:
+    print(text)
+
+  for r in report["results"]:
+    lat = r["latency_ms"]
+    print(
+      f"{r['workload']:>16} c={r['concurrency']:<3} {r['throughput_rps']:>9.1f} rps"
+      f"  p50={lat['p50']:.1f} p95={lat['p95']:.1f} p99={lat['p99']:.1f} ms  errors={r['errors']}",
+      file=sys.stderr,
+    )
+
+  if args.baseline:
+    with open(args.baseline, encoding="utf-8") as f:
+      problems = compare(report, json.load(f), args.tolerance)
+    for p in problems:
+      print(f"REGRESSION {p}", file=sys.stderr)
+    return 1 if problems else 0
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
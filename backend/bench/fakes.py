@@ -0,0 +1,161 @@
+import asyncio
+import random
+import socket
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+@dataclass
+class Faults:
+  latency_ms: float = 20.0
+  jitter: float = 0.5  # latency varies uniformly by +/- this fraction
+  rate_429: float = 0.0  # fraction of calls answered with 429
+  error_rate: float = 0.0  # fraction of calls answered with 500/503
+  retry_after: float = 0.1
+
+
+class _Injector:
+  def __init__(self, faults: Faults, seed: int):
+    self.faults = faults
+    self.rand = random.Random(seed)
+    self.calls = 0
+    self.injected_429 = 0
+    self.injected_5xx = 0
+
+  async def __call__(self, error: Callable[[int], dict]) -> Response | None:
+    f = self.faults
+    self.calls += 1
+    delay = f.latency_ms * (1 + self.rand.uniform(-f.jitter, f.jitter)) / 1000
+    if delay > 0:
+      await asyncio.sleep(delay)
+    roll = self.rand.random()
+    if roll < f.rate_429:
+      self.injected_429 += 1
+      return JSONResponse(error(429), status_code=429, headers={"Retry-After": str(f.retry_after)})
+    if roll < f.rate_429 + f.error_rate:
+      self.injected_5xx += 1
+      code = self.rand.choice((500, 503))
+      return JSONResponse(error(code), status_code=code)
+    return None
+
+  def stats(self) -> dict:
+    return {"calls": self.calls, "injected_429": self.injected_429, "injected_5xx": self.injected_5xx}
+
+
+def _notion_error(status: int) -> dict:
+  code = {429: "rate_limited", 500: "internal_server_error", 503: "service_unavailable"}[status]
+  return {"object": "error", "status": status, "code": code, "message": "injected by fake"}
+
+
+def _google_error(status: int) -> dict:
+  reason = "rateLimitExceeded" if status == 429 else "backendError"
+  return {"error": {"code": status, "message": "injected by fake", "errors": [{"reason": reason}]}}
+
+
+BENCH_SCHEMA = {
+  "Name": {"id": "title", "type": "title", "title": {}},
+  "Points": {"id": "p", "type": "number", "number": {}},
+  "Done": {"id": "d", "type": "checkbox", "checkbox": {}},
+}
+
+
+def notion_app(faults: Faults, seed: int = 1) -> tuple[FastAPI, _Injector]:
+  # Just enough of the Notion REST API for the tools: pages, block children,
+  # databases and data sources
+  app = FastAPI()
+  inject = _Injector(faults, seed)
+
+  async def _page(page_id: str) -> Response:
+    if (r := await inject(_notion_error)) is not None:
+      return r
+    return JSONResponse({"object": "page", "id": page_id, "url": "https://notion.invalid/p"})
+
+  @app.post("/v1/pages")
+  async def create_page():
+    return await _page(str(uuid.uuid4()))
+
+  @app.patch("/v1/pages/{page_id}")
+  async def update_page(page_id: str):
+    return await _page(page_id)
+
+  @app.patch("/v1/blocks/{block_id}/children")
+  async def append_children(block_id: str):
+    if (r := await inject(_notion_error)) is not None:
+      return r
+    return {"object": "list", "results": []}
+
+  @app.get("/v1/databases/{database_id}")
+  async def retrieve_database(database_id: str):
+    if (r := await inject(_notion_error)) is not None:
+      return r
+    return {"object": "database", "id": database_id, "data_sources": [{"id": f"ds-{database_id}", "name": "bench"}]}
+
+  @app.get("/v1/data_sources/{source_id}")
+  async def retrieve_data_source(source_id: str):
+    if (r := await inject(_notion_error)) is not None:
+      return r
+    return {"object": "data_source", "id": source_id, "properties": BENCH_SCHEMA}
+
+  return app, inject
+
+
+def google_app(faults: Faults, seed: int = 2) -> tuple[FastAPI, _Injector]:
+  # OAuth token endpoint (service-account JWT grant) plus event insert/delete
+  app = FastAPI()
+  inject = _Injector(faults, seed)
+
+  @app.post("/token")
+  async def token():
+    return {"access_token": "bench-token", "token_type": "Bearer", "expires_in": 3600}
+
+  @app.post("/calendar/v3/calendars/{calendar_id}/events")
+  async def insert_event(request: Request, calendar_id: str):
+    if (r := await inject(_google_error)) is not None:
+      return r
+    body = await request.json()
+    return {"id": uuid.uuid4().hex, "htmlLink": "https://calendar.invalid/e", **body}
+
+  @app.delete("/calendar/v3/calendars/{calendar_id}/events/{event_id}")
+  async def delete_event(calendar_id: str, event_id: str):
+    if (r := await inject(_google_error)) is not None:
+      return r
+    return Response(status_code=204)
+
+  return app, inject
+
+
+class FakeServer:
+  # Runs an ASGI app with uvicorn on 127.0.0.1 in a background thread
+  def __init__(self, app: FastAPI):
+    self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self._sock.bind(("127.0.0.1", 0))
+    self.port = self._sock.getsockname()[1]
+    config = uvicorn.Config(app, log_level="warning", lifespan="off", access_log=False)
+    self._server = uvicorn.Server(config)
+    self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._sock]}, daemon=True)
+
+  @property
+  def url(self) -> str:
+    return f"http://127.0.0.1:{self.port}"
+
+  def start(self) -> "FakeServer":
+    self._thread.start()
+    deadline = time.monotonic() + 10
+    while not self._server.started:
+      if time.monotonic() > deadline:
+        raise RuntimeError("fake server did not start")
+      time.sleep(0.01)
+    return self
+
+  def stop(self) -> None:
+    self._server.should_exit = True
+    self._thread.join(timeout=10)
+    self._sock.close()
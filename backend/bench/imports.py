@@ -0,0 +1,106 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Provider client modules a tool pulls in on first execute
+PROVIDER_MODULES = {
+  "notion": "backend.integrations.notion_client",
+  "google": "backend.integrations.google_client",
+}
+HEAVY = ("googleapiclient", "google.oauth2", "notion_client", "supabase")
+
+# Runs in a fresh interpreter: times `import backend.main`, then each step
+# given in argv ("tool:<name>" or "preload"), and reports heavy SDKs loaded
+_PROBE = """
+import importlib, json, sys, time
+t = time.perf_counter()
+import backend.main
+out = {"app_ms": (time.perf_counter() - t) * 1000, "steps": {}}
+from backend.tools.router import tool_router
+providers = json.loads(sys.argv[1])
+for step in sys.argv[2:]:
+  t = time.perf_counter()
+  names = tool_router.names() if step == "preload" else [step.split(":", 1)[1]]
+  for name in names:
+    tool = tool_router.get(name)
+    if tool.provider in providers:
+      importlib.import_module(providers[tool.provider])
+  out["steps"][step] = (time.perf_counter() - t) * 1000
+out["heavy_loaded"] = [m for m in %r if m in sys.modules]
+print(json.dumps(out))
+""" % (HEAVY,)
+
+
+def _probe(steps: list[str]) -> dict:
+  res = subprocess.run(
+    [sys.executable, "-c", _PROBE, json.dumps(PROVIDER_MODULES), *steps],
+    capture_output=True,
+    text=True,
+    check=True,
+  )
+  return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def _top_modules(limit: int) -> list[dict]:
+  # `python -X importtime` self times for a cold `import backend.main`
+  res = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+    capture_output=True,
+    text=True,
+    check=True,
+  )
+  rows = []
+  for line in res.stderr.splitlines():
+    if not line.startswith("import time:") or "self [us]" in line:
+      continue
+    self_us, cumulative_us, name = (p.strip() for p in line[len("import time:") :].split("|"))
+    rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+  rows.sort(key=lambda r: r["self_ms"], reverse=True)
+  return rows[:limit]
+
+
+def profile(repeat: int = 3, top: int = 15) -> dict:
+  from backend.tools.router import tool_router
+
+  tools = tool_router.names()
+  lazy = [_probe([]) for _ in range(repeat)]
+  eager = [_probe(["preload"]) for _ in range(repeat)]
+  first_use = {name: [_probe([f"tool:{name}"]) for _ in range(repeat)] for name in tools}
+
+  def _median(samples: list[dict], key) -> float:
+    return round(statistics.median(key(s) for s in samples), 2)
+
+  return {
+    "repeat": repeat,
+    # Startup with lazy tools: what a worker pays before its first request
+    "lazy_startup_ms": _median(lazy, lambda s: s["app_ms"]),
+    "lazy_heavy_loaded": lazy[0]["heavy_loaded"],
+    # Startup plus every tool and provider client: the old eager behaviour,
+    # and what PRELOAD_TOOLS='["*"]' costs
+    "eager_startup_ms": _median(eager, lambda s: s["app_ms"] + s["steps"]["preload"]),
+    "eager_heavy_loaded": eager[0]["heavy_loaded"],
+    # Extra latency the first request for each tool pays when not preloaded
+    "first_use_ms": {name: _median(samples, lambda s, n=name: s["steps"][f"tool:{n}"]) for name, samples in first_use.items()},
+    "top_modules": _top_modules(top),
+  }
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(prog="python -m backend.bench.imports", description="Import-time profile of the API")
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--top", type=int, default=15)
+  parser.add_argument("--out", help="write JSON here instead of stdout")
+  args = parser.parse_args(argv)
+  text = json.dumps(profile(args.repeat, args.top), indent=2)
+  if args.out:
+    with open(args.out, "w", encoding="utf-8") as f:
+      f.write(text + "\n")
+  else:
+    print(text)
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
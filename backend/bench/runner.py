@@ -0,0 +1,256 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from backend.bench.fakes import Faults, FakeServer, google_app, notion_app
+from backend.core.config import get_settings, reload_settings
+from backend.core.idempotency import idempotency_store
+from backend.services.log_service import store_stats
+
+WORKLOADS = ("preview", "execute_notion", "execute_calendar", "batch", "replay")
+APPROVED = {"X-Approved": "true"}
+CONTENT = "Benchmark paragraph. " * 40
+
+
+@dataclass
+class BenchConfig:
+  concurrency: list[int] = field(default_factory=lambda: [1, 8, 32])
+  requests: int = 200  # per workload and concurrency level
+  batch_size: int = 20  # items per /execute/batch request
+  workloads: list[str] = field(default_factory=lambda: list(WORKLOADS))
+  faults: Faults = field(default_factory=Faults)
+  # Client-side provider rate limits would cap throughput at ~3 rps for
+  # Notion; they are disabled unless explicitly kept
+  keep_rate_limits: bool = False
+  state_backend: str = "memory"  # memory | sqlite | supabase
+
+
+def _service_account(token_uri: str) -> str:
+  # Throwaway key so google-auth can sign its JWT grant against the fake
+  key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+  pem = key.private_bytes(
+    serialization.Encoding.PEM,
+    serialization.PrivateFormat.PKCS8,
+    serialization.NoEncryption(),
+  ).decode()
+  return json.dumps({
+    "type": "service_account",
+    "client_email": "bench@zelo.invalid",
+    "private_key": pem,
+    "private_key_id": "bench",
+    "token_uri": token_uri,
+  })
+
+
+def _percentile(sorted_ms: list[float], q: float) -> float:
+  if not sorted_ms:
+    return 0.0
+  return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))]
+
+
+def _memory() -> dict:
+  idem = idempotency_store.stats()
+  logs = store_stats()
+  return {
+    "traced_bytes": tracemalloc.get_traced_memory()[0],
+    "idempotency_entries": idem["entries"],
+    "idempotency_bytes": idem["bytes"],
+    "log_records": logs["records"],
+    "log_payload_bytes": logs["payload_bytes"],
+  }
+
+
+async def _drive(n: int, concurrency: int, send: Callable[[int], Awaitable[httpx.Response]]) -> dict:
+  # `concurrency` workers pull request numbers until `n` have been sent
+  latencies: list[float] = []
+  statuses: Counter[int] = Counter()
+  counter = itertools.count()
+
+  async def _worker() -> None:
+    while (i := next(counter)) < n:
+      start = time.perf_counter()
+      try:
+        res = await send(i)
+        statuses[res.status_code] += 1
+      except httpx.HTTPError:
+        statuses[0] += 1
+      latencies.append((time.perf_counter() - start) * 1000)
+
+  start = time.perf_counter()
+  await asyncio.gather(*(_worker() for _ in range(concurrency)))
+  elapsed = time.perf_counter() - start
+  latencies.sort()
+  ok = sum(v for k, v in statuses.items() if 200 <= k < 300)
+  return {
+    "requests": n,
+    "ok": ok,
+    "errors": n - ok,
+    "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+    "elapsed_s": round(elapsed, 4),
+    "throughput_rps": round(n / elapsed, 2) if elapsed else 0.0,
+    "latency_ms": {
+      "p50": round(_percentile(latencies, 0.50), 3),
+      "p95": round(_percentile(latencies, 0.95), 3),
+      "p99": round(_percentile(latencies, 0.99), 3),
+      "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+      "max": round(latencies[-1], 3) if latencies else 0.0,
+    },
+  }
+
+
+def _senders(client: httpx.AsyncClient, run: str, batch_size: int) -> dict[str, Callable[[int], Awaitable[httpx.Response]]]:
+  # Payloads are unique per request (the run id is part of them) so derived
+  # idempotency keys and the preview cache do not turn work into replays
+  def _page(i: int) -> dict:
+    return {"tool": "notion_page", "payload": {"title": f"bench {run} {i}", "content": CONTENT}}
+
+  async def preview(i: int) -> httpx.Response:
+    return await client.post("/api/preview", json=_page(i))
+
+  async def execute_notion(i: int) -> httpx.Response:
+    return await client.post("/api/execute", headers=APPROVED, json=_page(i))
+
+  async def execute_calendar(i: int) -> httpx.Response:
+    payload = {
+      "title": f"bench {run} {i}",
+      "start_iso": "2030-01-01T10:00:00Z",
+      "end_iso": "2030-01-01T11:00:00Z",
+    }
+    return await client.post("/api/execute", headers=APPROVED, json={"tool": "calendar_event", "payload": payload})
+
+  async def batch(i: int) -> httpx.Response:
+    items = [_page(i * batch_size + j) for j in range(batch_size)]
+    return await client.post("/api/execute/batch", headers=APPROVED, json={"items": items})
+
+  async def replay(i: int) -> httpx.Response:
+    headers = {**APPROVED, "X-Idempotency-Key": f"bench-{run}"}
+    return await client.post("/api/execute", headers=headers, json=_page(0))
+
+  return {
+    "preview": preview,
+    "execute_notion": execute_notion,
+    "execute_calendar": execute_calendar,
+    "batch": batch,
+    "replay": replay,
+  }
+
+
+async def _run(config: BenchConfig) -> list[dict]:
+  from backend.main import create_app
+
+  app = create_app()
+  # Per-request client logging would dominate the run
+  for name in ("httpx", "app.error_handler"):
+    logging.getLogger(name).setLevel(logging.CRITICAL)
+  headers = {"X-API-Key": get_settings().api_key} if get_settings().api_key else {}
+  results: list[dict] = []
+  async with app.router.lifespan_context(app):
+    # Unhandled app errors become 500s, as they would behind uvicorn
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=120) as client:
+      for workload in config.workloads:
+        for concurrency in config.concurrency:
+          run = uuid.uuid4().hex[:8]
+          send = _senders(client, run, config.batch_size)[workload]
+          n = config.requests
+          if workload == "batch":
+            n = max(1, config.requests // config.batch_size)
+          if workload == "replay":
+            await send(0)  # the first call executes, the rest replay
+          before = _memory()
+          res = await _drive(n, concurrency, send)
+          after = _memory()
+          res = {"workload": workload, "concurrency": concurrency, **res}
+          if workload == "batch":
+            res["items_per_sec"] = round(res["throughput_rps"] * config.batch_size, 2)
+          res["memory"] = {
+            "before": before,
+            "after": after,
+            "growth": {k: after[k] - before[k] for k in before},
+          }
+          results.append(res)
+  return results
+
+
+def run_bench(config: BenchConfig) -> dict:
+  notion_fake, notion_stats = notion_app(config.faults)
+  google_fake, google_stats = google_app(config.faults)
+  notion_srv = FakeServer(notion_fake).start()
+  google_srv = FakeServer(google_fake).start()
+  state = tempfile.TemporaryDirectory(prefix="zelo-bench-")
+  env = {
+    "NOTION_TOKEN": "bench",
+    "NOTION_BASE_URL": notion_srv.url,
+    "NOTION_PARENT_PAGE_ID": "bench-parent",
+    "GOOGLE_SERVICE_ACCOUNT_JSON": _service_account(f"{google_srv.url}/token"),
+    "GOOGLE_CALENDAR_ID": "bench",
+    "GOOGLE_API_BASE_URL": f"{google_srv.url}/calendar/v3",
+    "STATE_DIR": state.name,
+    "STATE_BACKEND": config.state_backend,
+    # Measure steady state, not first-use imports and client construction
+    "PRELOAD_TOOLS": '["*"]',
+  }
+  if not config.keep_rate_limits:
+    env.update({"NOTION_RATE_LIMIT_PER_SEC": "0", "GOOGLE_RATE_LIMIT_PER_SEC": "0"})
+  saved = {k: os.environ.get(k) for k in env}
+  os.environ.update(env)
+  reload_settings()
+  tracemalloc.start()
+  try:
+    started = time.time()
+    results = asyncio.run(_run(config))
+    return {
+      "meta": {
+        "started_at": started,
+        "duration_s": round(time.time() - started, 3),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": asdict(config),
+      },
+      "fakes": {"notion": notion_stats.stats(), "google": google_stats.stats()},
+      "results": results,
+    }
+  finally:
+    tracemalloc.stop()
+    for k, v in saved.items():
+      if v is None:
+        os.environ.pop(k, None)
+      else:
+        os.environ[k] = v
+    reload_settings()
+    notion_srv.stop()
+    google_srv.stop()
+    state.cleanup()
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+  # Regressions: throughput down or p95 latency up by more than `tolerance`
+  # for the same workload and concurrency
+  base = {(r["workload"], r["concurrency"]): r for r in baseline.get("results", [])}
+  problems: list[str] = []
+  for r in current["results"]:
+    old = base.get((r["workload"], r["concurrency"]))
+    if old is None:
+      continue
+    name = f"{r['workload']}@{r['concurrency']}"
+    if old["throughput_rps"] and r["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+      problems.append(f"{name}: throughput {old['throughput_rps']} -> {r['throughput_rps']} rps")
+    if old["latency_ms"]["p95"] and r["latency_ms"]["p95"] > old["latency_ms"]["p95"] * (1 + tolerance):
+      problems.append(f"{name}: p95 {old['latency_ms']['p95']} -> {r['latency_ms']['p95']} ms")
+    if r["errors"] > old["errors"]:
+      problems.append(f"{name}: errors {old['errors']} -> {r['errors']}")
+  return problems
@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from backend.core.config import get_settings, reload_settings
+from backend.core.state import BACKENDS, StateBackend
+
+VALUE = b"r" + b'{"status_code":200}' + b"\n" + b"x" * 512  # a typical stored response
+
+
+def _percentile(sorted_us: list[float], q: float) -> float:
+  return sorted_us[min(len(sorted_us) - 1, int(q * len(sorted_us)))] if sorted_us else 0.0
+
+
+def _timed(n: int, op) -> dict:
+  latencies = []
+  start = time.perf_counter()
+  for i in range(n):
+    t = time.perf_counter()
+    op(i)
+    latencies.append((time.perf_counter() - t) * 1e6)
+  elapsed = time.perf_counter() - start
+  latencies.sort()
+  return {
+    "ops": n,
+    "ops_per_sec": round(n / elapsed, 1) if elapsed else 0.0,
+    "p50_us": round(_percentile(latencies, 0.50), 1),
+    "p99_us": round(_percentile(latencies, 0.99), 1),
+  }
+
+
+def _contended(cls: type[StateBackend], threads: int, keys: int) -> dict:
+  # `threads` independent instances (separate connections, as separate
+  # workers would have) race to claim the same keys; each key must have
+  # exactly one winner. The per-process memory backend is raced as one
+  # instance shared by the threads.
+  backends = [cls() for _ in range(threads)] if cls.shared else [cls()] * threads
+  prefix = uuid.uuid4().hex
+  wins = [0] * keys
+  lock = threading.Lock()
+  barrier = threading.Barrier(threads)
+
+  def _worker(backend: StateBackend) -> None:
+    barrier.wait()
+    for k in range(keys):
+      if backend.set_if_absent(f"{prefix}:{k}", VALUE, 60):
+        with lock:
+          wins[k] += 1
+
+  start = time.perf_counter()
+  pool = [threading.Thread(target=_worker, args=(b,)) for b in backends]
+  for t in pool:
+    t.start()
+  for t in pool:
+    t.join()
+  elapsed = time.perf_counter() - start
+  for b in backends:
+    b.close()
+  return {
+    "threads": threads,
+    "keys": keys,
+    "attempts_per_sec": round(threads * keys / elapsed, 1) if elapsed else 0.0,
+    "keys_with_one_winner": sum(1 for w in wins if w == 1),
+  }
+
+
+def bench_backend(name: str, ops: int, threads: int) -> dict:
+  cls = BACKENDS[name]
+  backend = cls()
+  prefix = uuid.uuid4().hex
+  capacity = get_settings().log_capacity
+  try:
+    return {
+      "backend": name,
+      "shared": cls.shared,
+      "set_if_absent": _timed(ops, lambda i: backend.set_if_absent(f"{prefix}:c{i}", VALUE, 60)),
+      "get_hit": _timed(ops, lambda i: backend.get(f"{prefix}:c{i}")),
+      "put": _timed(ops, lambda i: backend.put(f"{prefix}:p{i}", VALUE, 60)),
+      "append_log": _timed(ops, lambda i: backend.append_log(time.time(), "INFO", "bench", {"i": i}, capacity)),
+      "read_logs": _timed(max(1, ops // 100), lambda i: backend.logs(capacity=capacity)),
+      "contended_claims": _contended(cls, threads, max(1, ops // threads)),
+    }
+  finally:
+    backend.close()
+
+
+def run(backends: list[str], ops: int, threads: int) -> dict:
+  state = tempfile.TemporaryDirectory(prefix="zelo-state-bench-")
+  saved = os.environ.get("STATE_DIR")
+  os.environ["STATE_DIR"] = state.name
+  reload_settings()
+  try:
+    results = []
+    for name in backends:
+      settings = get_settings()
+      if name == "supabase" and not (settings.supabase_url and settings.supabase_service_key):
+        results.append({"backend": name, "skipped": "SUPABASE_URL / SUPABASE_SERVICE_KEY are not set"})
+        continue
+      results.append(bench_backend(name, ops, threads))
+    return {"ops": ops, "threads": threads, "results": results}
+  finally:
+    if saved is None:
+      os.environ.pop("STATE_DIR", None)
+    else:
+      os.environ["STATE_DIR"] = saved
+    reload_settings()
+    state.cleanup()
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(prog="python -m backend.bench.state", description="Micro-benchmark of the state backends")
+  parser.add_argument("--backends", default=",".join(BACKENDS))
+  parser.add_argument("--ops", type=int, default=2000, help="operations per measurement")
+  parser.add_argument("--threads", type=int, default=8, help="racing instances for contended claims")
+  parser.add_argument("--out", help="write JSON here instead of stdout")
+  args = parser.parse_args(argv)
+  backends = [b for b in args.backends.split(",") if b]
+  unknown = set(backends) - set(BACKENDS)
+  if unknown:
+    parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+
+  text = json.dumps(run(backends, args.ops, args.threads), indent=2)
+  if args.out:
+    with open(args.out, "w", encoding="utf-8") as f:
+      f.write(text + "\n")
+  else:
+    print(text)
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -1,32 +1,188 @@
+import os
+import threading
+import time
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from backend.core.timing import phase
+
+ENV_FILE = ".env"
+
 
 class Settings(BaseSettings):
-  model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+  model_config = SettingsConfigDict(env_file=ENV_FILE, extra="ignore", frozen=True)
 
   # Basic security
   api_key: str | None = None  # if set, require X-API-Key
 
   # Idempotency
   idempotency_ttl_seconds: int = 60 * 10
+  idempotency_max_entries: int = 10_000
+  idempotency_max_bytes: int = 64 * 1024 * 1024
+  # Opt-in: without X-Idempotency-Key, /execute derives a key from the
+  # canonical request hash, so identical retries within the TTL replay
+  auto_idempotency_key: bool = False
+
+  # Where idempotency results and /api/logs records live: "memory" (per
+  # worker), "sqlite" (shared by the workers on one host) or "supabase"
+  # (shared across nodes; tables in backend/core/state.py)
+  state_backend: str = "memory"
+  # With a shared backend, an execute claimed by one worker holds off the
+  # others for at most this long, so keep it above the slowest execute
+  idempotency_lease_seconds: float = 120.0
+  state_poll_interval_seconds: float = 0.05
+
+  # JSON encoding for raw/streamed responses: "auto" uses orjson when it is
+  # installed, "std" forces the standard library
+  json_encoder: str = "auto"
+
+  # Preview cache (tools opt in with cacheable_preview)
+  preview_cache_ttl_seconds: int = 60
+  preview_cache_max_entries: int = 2048
+
+  # Batch execute: global and per-tool concurrency within one batch
+  batch_max_items: int = 500
+  batch_max_concurrency: int = 16
+  batch_per_tool_concurrency: int = 4
+  batch_tool_concurrency: dict[str, int] = {}  # e.g. {"notion_page": 3}
+
+  # Tools are imported on first use. PRELOAD_TOOLS='["notion_page"]' (or
+  # '["*"]') imports them and warms their provider clients at startup.
+  preload_tools: list[str] = []
+  tool_entry_points: bool = True  # discover third-party tools ("zelo.tools")
+
+  # Local state (SQLite files for jobs etc.)
+  state_dir: str = ".state"
+
+  # Async execute jobs
+  job_workers: int = 8
+  job_retention_seconds: int = 60 * 60 * 24
+  # A running job is handed to another worker once its owner has not renewed
+  # the lease for this long (renewed every third of it)
+  job_lease_seconds: float = 60.0
+  # ?wait= re-reads the job this often, since another worker process may be
+  # the one running it
+  job_poll_seconds: float = 0.5
+
+  # Rollback: compensations run concurrently, still paced by provider limits
+  max_rollback_ids: int = 1000
+  rollback_concurrency: int = 16
+
+  # Provider retries: retries may use at most this fraction of call volume,
+  # plus a small per-second floor
+  retry_budget_ratio: float = 0.2
+  retry_budget_min_per_sec: float = 1.0
+
+  # Client-side provider rate limits (requests/sec, 0 disables). Defaults
+  # sit just under Notion's ~3 rps per integration and Google's per-user
+  # quota. "sqlite" shares the buckets across workers on one host.
+  rate_limit_backend: str = "memory"  # memory | sqlite
+  notion_rate_limit_per_sec: float = 2.8
+  notion_rate_limit_burst: int = 3
+
+  # Notion database schemas (databases.retrieve) are cached per database and
+  # refetched on expiry or when a payload no longer matches
+  notion_schema_ttl_seconds: int = 300
+  # Rows in flight at once for notion_db bulk inserts (still rate limited)
+  notion_bulk_concurrency: int = 4
+  google_rate_limit_per_sec: float = 8.0
+  google_rate_limit_burst: int = 10
+
+  # calendar_event previews check conflicts against a per-calendar cache
+  # that is incrementally synced at most this often, and suggest up to
+  # calendar_suggestions free slots within the horizon
+  calendar_cache_ttl_seconds: float = 30.0
+  calendar_suggestions: int = 3
+  calendar_suggest_horizon_hours: float = 72.0
+
+  # Per-provider circuit breaker (sliding window over recent calls)
+  circuit_window_seconds: float = 30.0
+  circuit_min_calls: int = 10
+  circuit_error_rate: float = 0.5
+  circuit_slow_call_seconds: float = 10.0
+  circuit_slow_call_rate: float = 0.8
+  circuit_open_seconds: float = 30.0
+  circuit_half_open_max_calls: int = 2
 
   # Logging
   log_level: str = "INFO"
+  log_capacity: int = 5000  # in-memory entries served by /api/logs
+  # Durable audit trail: "supabase" also ships every log record to
+  # audit_table in batches from a background thread ("off" disables)
+  audit_sink: str = "off"
+  audit_table: str = "zelo_audit"
+  audit_queue_size: int = 10_000  # records beyond this are dropped and counted
+  audit_batch_size: int = 200
+  audit_flush_seconds: float = 1.0
+  audit_shutdown_seconds: float = 10.0
+
+  # Every response carries a Server-Timing header with per-phase durations
+  server_timing: bool = True
+  # Statistical profiling of single requests: sent X-Profile: 1 together
+  # with a valid X-API-Key (so API_KEY must be set), or a random fraction
+  # of /api requests. Profiles stay in memory under /api/debug/profiles.
+  profile_sample_rate: float = 0.0
+  profile_interval_ms: float = 5.0
+  profile_max_entries: int = 50
+
+  # Settings hot reload: how often (seconds) the .env mtime is checked
+  settings_reload_interval_seconds: float = 1.0
 
   # Notion
   notion_token: str | None = None
   notion_parent_page_id: str | None = None
   notion_database_id: str | None = None
+  notion_base_url: str = "https://api.notion.com"  # overridden by the benchmark fakes
 
   # Google Calendar (Service Account)
   google_service_account_json: str | None = None  # JSON string
   google_calendar_id: str | None = None
+  google_api_base_url: str = "https://www.googleapis.com/calendar/v3"
 
   # Supabase (optional for this FastAPI backend)
   supabase_url: str | None = None
   supabase_service_key: str | None = None
 
 
+# (env file mtime, next check deadline, settings) swapped as a single tuple so
+# readers never observe a half-updated snapshot.
+_SNAPSHOT: tuple[int | None, float, Settings] | None = None
+_LOCK = threading.Lock()
+
+
+def _env_mtime() -> int | None:
+  try:
+    return os.stat(ENV_FILE).st_mtime_ns
+  except OSError:
+    return None
+
+
 def get_settings() -> Settings:
-  return Settings()
+  global _SNAPSHOT
+  snap = _SNAPSHOT
+  now = time.monotonic()
+  if snap is not None and now < snap[1]:
+    return snap[2]
+
+  mtime = _env_mtime()
+  if snap is not None and snap[0] == mtime:
+    _SNAPSHOT = (mtime, now + snap[2].settings_reload_interval_seconds, snap[2])
+    return snap[2]
+
+  with _LOCK:
+    snap = _SNAPSHOT
+    if snap is not None and snap[0] == mtime:
+      return snap[2]
+    with phase("settings"):
+      settings = Settings()
+    _SNAPSHOT = (mtime, now + settings.settings_reload_interval_seconds, settings)
+    return settings
+
 
+def reload_settings() -> Settings:
+  # Force a re-parse (e.g. after changing process env vars in tests)
+  global _SNAPSHOT
+  with _LOCK:
+    settings = Settings()
+    _SNAPSHOT = (_env_mtime(), time.monotonic() + settings.settings_reload_interval_seconds, settings)
+    return settings
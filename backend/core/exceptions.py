@@ -10,3 +10,17 @@ class Unauthorized(HTTPException):
   def __init__(self, detail: str = "unauthorized"):
     super().__init__(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
 
+
+class InvalidPayload(HTTPException):
+  def __init__(self, detail: str | list | dict):
+    super().__init__(status_code=422, detail=detail)
+
+
+class ProviderUnavailable(HTTPException):
+  def __init__(self, provider: str, retry_after: float = 1.0):
+    super().__init__(
+      status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+      detail=f"{provider} is unavailable (circuit open), retry later",
+      headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+    )
+    self.provider = provider
@@ -1,45 +1,439 @@
+import asyncio
+import heapq
+import json
+import logging
+import threading
 import time
-from dataclasses import dataclass
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
 
-from fastapi import Header
+from fastapi import Header, Response
+from starlette.concurrency import run_in_threadpool
 
 from backend.core.config import get_settings
+from backend.core.metrics import metrics
+from backend.core.state import StateBackend, get_state_backend
+from backend.utils.encoding import json_bytes
+from backend.utils.hash import canonical_hash
+
+logger = logging.getLogger("app.idempotency")
+
+REPLAY_HEADER = "Idempotent-Replay"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+  # A final, already-encoded response. Replays send these bytes as-is, with
+  # no model validation or re-serialization.
+  body: bytes
+  status_code: int = 200
+  media_type: str = "application/json"
+  headers: tuple[tuple[str, str], ...] = ()
+
+  def as_dict(self) -> dict:
+    return json.loads(self.body)
 
 
 @dataclass
 class _Entry:
   expires_at: float
-  response_json: dict
+  value: dict | CachedResponse
+  size: int
+
+
+@dataclass
+class _Flight:
+  # One in-flight execution; later callers with the same key wait on `done`
+  done: threading.Event = field(default_factory=threading.Event)
+  result: dict | CachedResponse | None = None
+  error: BaseException | None = None
+  # (loop, future) pairs for async waiters, woken thread-safely on finish
+  waiters: list = field(default_factory=list)
+
+  def finish(self) -> None:
+    self.done.set()
+    for loop, fut in self.waiters:
+      loop.call_soon_threadsafe(_resolve, fut)
+
+  def outcome(self) -> dict | CachedResponse:
+    if self.error is not None:
+      raise self.error
+    return self.result
+
+
+def _resolve(fut: asyncio.Future) -> None:
+  if not fut.done():
+    fut.set_result(None)
+
+
+# Values in a shared state backend: a one-byte tag, then the payload
+_PENDING = b"p"  # claim held by a worker that is still executing
+_DICT = b"j"
+_RESPONSE = b"r"  # JSON head (status, media type, headers), newline, body
+
+
+def _encode(value: dict | CachedResponse) -> bytes:
+  if isinstance(value, CachedResponse):
+    head = json_bytes({"status_code": value.status_code, "media_type": value.media_type, "headers": value.headers})
+    return _RESPONSE + head + b"\n" + value.body
+  return _DICT + json_bytes(value)
+
+
+def _decode(raw: bytes) -> dict | CachedResponse:
+  tag, data = raw[:1], raw[1:]
+  if tag == _RESPONSE:
+    head, _, body = data.partition(b"\n")
+    meta = json.loads(head)
+    return CachedResponse(
+      body=body,
+      status_code=meta["status_code"],
+      media_type=meta["media_type"],
+      headers=tuple((k, v) for k, v in meta["headers"]),
+    )
+  return json.loads(data)
+
+
+def _size_of(value: dict | CachedResponse) -> int:
+  if isinstance(value, CachedResponse):
+    return len(value.body) + sum(len(k) + len(v) for k, v in value.headers)
+  return len(json_bytes(value))
+
+
+class IdempotencyStore:
+  # TTL expiry is driven by a min-heap of (expires_at, key) so cleanup only
+  # touches expired entries; an OrderedDict gives LRU eviction once the entry
+  # or byte cap is exceeded. Stale heap items (overwritten/evicted keys) are
+  # skipped lazily and compacted when they outnumber live entries.
+  #
+  # With a shared state backend (sqlite/supabase) this stays the per-worker
+  # front: a local miss consults the backend, and a leader first claims the
+  # key there with set_if_absent, so only one worker anywhere executes it.
+  # The others poll until the result is stored or the claim's lease expires.
+  def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+    self._max_entries = max_entries
+    self._max_bytes = max_bytes
+    self._entries: OrderedDict[str, _Entry] = OrderedDict()
+    self._heap: list[tuple[float, str]] = []
+    self._flights: dict[str, _Flight] = {}
+    self._bytes = 0
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.expirations = 0
+    self.coalesced = 0
+    self.shared_hits = 0
+
+  def _limits(self) -> tuple[int, int]:
+    settings = get_settings()
+    return (
+      self._max_entries if self._max_entries is not None else settings.idempotency_max_entries,
+      self._max_bytes if self._max_bytes is not None else settings.idempotency_max_bytes,
+    )
+
+  def _drop(self, key: str) -> None:
+    ent = self._entries.pop(key, None)
+    if ent is not None:
+      self._bytes -= ent.size
+
+  def _expire(self, now: float) -> None:
+    heap = self._heap
+    while heap and heap[0][0] <= now:
+      expires_at, key = heapq.heappop(heap)
+      ent = self._entries.get(key)
+      if ent is not None and ent.expires_at == expires_at:
+        self._drop(key)
+        self.expirations += 1
+    if len(heap) > 64 and len(heap) > 2 * len(self._entries):
+      self._heap = [(e.expires_at, k) for k, e in self._entries.items()]
+      heapq.heapify(self._heap)
+
+  def _lookup(self, key: str, now: float) -> dict | CachedResponse | None:
+    self._expire(now)
+    ent = self._entries.get(key)
+    if ent is None:
+      return None
+    self._entries.move_to_end(key)
+    return ent.value
+
+  def get(self, key: str) -> dict | CachedResponse | None:
+    with self._lock:
+      value = self._lookup(key, time.time())
+    backend_hit = False
+    if value is None and (backend := self._shared()) is not None:
+      raw = backend.get(key)
+      if raw is not None and not raw.startswith(_PENDING):
+        value = _decode(raw)
+        self._put_local(key, value)
+        backend_hit = True
+    with self._lock:
+      if value is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+        self.shared_hits += backend_hit
+    return value
 
+  def put(self, key: str, value: dict | CachedResponse) -> None:
+    self._put_local(key, value)
+    if (backend := self._shared()) is not None:
+      backend.put(key, _encode(value), get_settings().idempotency_ttl_seconds)
 
-_CACHE: dict[str, _Entry] = {}
+  def _put_local(self, key: str, value: dict | CachedResponse) -> None:
+    ttl = get_settings().idempotency_ttl_seconds
+    size = _size_of(value)
+    max_entries, max_bytes = self._limits()
+    with self._lock:
+      now = time.time()
+      self._expire(now)
+      self._drop(key)
+      if size > max_bytes:
+        return
+      ent = _Entry(expires_at=now + ttl, value=value, size=size)
+      self._entries[key] = ent
+      self._bytes += size
+      heapq.heappush(self._heap, (ent.expires_at, key))
+      while len(self._entries) > max_entries or self._bytes > max_bytes:
+        _old_key, old = self._entries.popitem(last=False)
+        self._bytes -= old.size
+        self.evictions += 1
 
+  def _begin(self, key: str) -> tuple[dict | CachedResponse | None, _Flight | None, bool]:
+    # Returns (cached, flight, leader). Must be called with the lock held.
+    cached = self._lookup(key, time.time())
+    if cached is not None:
+      self.hits += 1
+      return cached, None, False
+    flight = self._flights.get(key)
+    if flight is None:
+      self.misses += 1
+      flight = self._flights[key] = _Flight()
+      return None, flight, True
+    self.coalesced += 1
+    return None, flight, False
 
-def _cleanup(now: float) -> None:
-  dead = [k for k, v in _CACHE.items() if v.expires_at <= now]
-  for k in dead:
-    _CACHE.pop(k, None)
+  def _finish(self, key: str, flight: _Flight) -> None:
+    with self._lock:
+      self._flights.pop(key, None)
+      flight.finish()
 
+  def _shared(self) -> StateBackend | None:
+    backend = get_state_backend()
+    return backend if backend.shared else None
 
-def get_idempotency_key(
+  def _try_claim(self, backend: StateBackend, key: str, token: bytes) -> tuple[bool, dict | CachedResponse | None]:
+    # (claimed, stored result); neither means another worker is executing
+    if backend.set_if_absent(key, token, get_settings().idempotency_lease_seconds):
+      return True, None
+    raw = backend.get(key)
+    if raw is None or raw.startswith(_PENDING):
+      return False, None
+    value = _decode(raw)
+    self._put_local(key, value)
+    with self._lock:
+      self.shared_hits += 1
+    return False, value
+
+  def _store_shared(self, backend: StateBackend, key: str, value: dict | CachedResponse, token: bytes) -> None:
+    # The provider call already happened; a failing backend only costs the
+    # other workers their replay, so the result is still returned
+    try:
+      backend.put(key, _encode(value), get_settings().idempotency_ttl_seconds)
+    except Exception:  # noqa: BLE001
+      logger.exception("storing idempotent result %s in %s failed", key, backend.name)
+      self._release(backend, key, token)
+
+  def _release(self, backend: StateBackend, key: str, token: bytes) -> None:
+    # Lets the next worker claim the key now instead of after the lease
+    try:
+      backend.release(key, token)
+    except Exception:  # noqa: BLE001
+      logger.warning("releasing idempotency claim %s in %s failed", key, backend.name)
+
+  def _claim(self, backend: StateBackend, key: str, timeout: float | None) -> tuple[dict | CachedResponse | None, bytes | None]:
+    # Returns (stored result, None) when another worker finished the key, or
+    # (None, token) once this worker owns it
+    token = _PENDING + uuid.uuid4().hex.encode()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+      claimed, stored = self._try_claim(backend, key, token)
+      if claimed:
+        return None, token
+      if stored is not None:
+        return stored, None
+      if deadline is not None and time.monotonic() > deadline:
+        raise TimeoutError(f"idempotent request {key!r} still in flight on another worker")
+      time.sleep(get_settings().state_poll_interval_seconds)
+
+  async def _aclaim(
+    self,
+    backend: StateBackend,
+    key: str,
+    timeout: float | None,
+  ) -> tuple[dict | CachedResponse | None, bytes | None]:
+    token = _PENDING + uuid.uuid4().hex.encode()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+      claimed, stored = await run_in_threadpool(self._try_claim, backend, key, token)
+      if claimed:
+        return None, token
+      if stored is not None:
+        return stored, None
+      if deadline is not None and time.monotonic() > deadline:
+        raise TimeoutError(f"idempotent request {key!r} still in flight on another worker")
+      await asyncio.sleep(get_settings().state_poll_interval_seconds)
+
+  def run(self, key: str, fn: Callable[[], dict], timeout: float | None = None) -> dict:
+    # Single-flight: the first caller executes `fn`, concurrent callers with
+    # the same key block until it finishes and share its result (or error).
+    with self._lock:
+      cached, flight, leader = self._begin(key)
+    if cached is not None:
+      return cached
+    if not leader:
+      if not flight.done.wait(timeout):
+        raise TimeoutError(f"idempotent request {key!r} still in flight")
+      return flight.outcome()
+
+    backend = self._shared()
+    token = None
+    try:
+      if backend is not None:
+        stored, token = self._claim(backend, key, timeout)
+        if stored is not None:
+          flight.result = stored
+          return stored
+      flight.result = fn()
+      self._put_local(key, flight.result)
+      if backend is not None:
+        self._store_shared(backend, key, flight.result, token)
+      return flight.result
+    except BaseException as e:
+      flight.error = e
+      if token is not None:
+        self._release(backend, key, token)
+      raise
+    finally:
+      self._finish(key, flight)
+
+  async def arun(self, key: str, fn: Callable[[], Awaitable[dict]], timeout: float | None = None) -> dict | CachedResponse:
+    return (await self.arun_tracked(key, fn, timeout))[0]
+
+  async def arun_tracked(
+    self,
+    key: str,
+    fn: Callable[[], Awaitable[dict | CachedResponse]],
+    timeout: float | None = None,
+  ) -> tuple[dict | CachedResponse, bool]:
+    # Async flavour of run(); waiters park on a future instead of a thread.
+    # Also reports whether the value was replayed (cached or coalesced)
+    # rather than produced by this call.
+    with self._lock:
+      cached, flight, leader = self._begin(key)
+      fut = None
+      if not leader and flight is not None:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        flight.waiters.append((loop, fut))
+    if cached is not None:
+      return cached, True
+    if not leader:
+      if fut is not None:
+        try:
+          await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+          raise TimeoutError(f"idempotent request {key!r} still in flight") from None
+      return flight.outcome(), True
+
+    backend = self._shared()
+    token = None
+    try:
+      if backend is not None:
+        stored, token = await self._aclaim(backend, key, timeout)
+        if stored is not None:
+          flight.result = stored
+          return stored, True
+      flight.result = await fn()
+      self._put_local(key, flight.result)
+      if backend is not None:
+        await run_in_threadpool(self._store_shared, backend, key, flight.result, token)
+      return flight.result, False
+    except BaseException as e:
+      flight.error = e
+      if token is not None:
+        await run_in_threadpool(self._release, backend, key, token)
+      raise
+    finally:
+      self._finish(key, flight)
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {
+        "entries": len(self._entries),
+        "bytes": self._bytes,
+        "in_flight": len(self._flights),
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "expirations": self.expirations,
+        "coalesced": self.coalesced,
+        "shared_hits": self.shared_hits,
+      }
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+      self._heap.clear()
+      self._bytes = 0
+
+
+idempotency_store = IdempotencyStore()
+
+
+def _collect():
+  stats = idempotency_store.stats()
+  for name in ("entries", "bytes", "in_flight"):
+    yield f"zelo_idempotency_{name}", "gauge", {}, stats[name]
+  for name in ("hits", "misses", "evictions", "expirations", "coalesced", "shared_hits"):
+    yield f"zelo_idempotency_{name}_total", "counter", {}, stats[name]
+
+
+metrics.register_collector(_collect)
+
+
+async def get_idempotency_key(
   x_idempotency_key: str | None = Header(default=None),
 ) -> str | None:
   # Optional: clients may send it to make execute/save safe to retry
   return x_idempotency_key
 
 
+def derive_idempotency_key(tool: str, payload: dict, dry_run: bool = False) -> str:
+  # Used when the client sends no key: identical requests map to one key.
+  # The prefix keeps derived keys apart from client-chosen ones.
+  return "auto:" + canonical_hash({"tool": tool, "payload": payload, "dry_run": dry_run})
+
+
+def as_dict(value: dict | CachedResponse) -> dict:
+  # Batch items and jobs share keys with /execute, which stores raw bytes
+  return value.as_dict() if isinstance(value, CachedResponse) else value
+
+
+def replay_response(value: dict | CachedResponse, replayed: bool) -> Response:
+  if not isinstance(value, CachedResponse):
+    value = CachedResponse(body=json_bytes(value))
+  headers = dict(value.headers)
+  if replayed:
+    headers[REPLAY_HEADER] = "true"
+  return Response(value.body, status_code=value.status_code, media_type=value.media_type, headers=headers)
+
+
 def get_cached_response(key: str) -> dict | None:
-  now = time.time()
-  _cleanup(now)
-  ent = _CACHE.get(key)
-  if not ent:
-    return None
-  return ent.response_json
+  value = idempotency_store.get(key)
+  return None if value is None else as_dict(value)
 
 
 def store_cached_response(key: str, response_json: dict) -> None:
-  settings = get_settings()
-  now = time.time()
-  _cleanup(now)
-  _CACHE[key] = _Entry(expires_at=now + settings.idempotency_ttl_seconds, response_json=response_json)
-
+  idempotency_store.put(key, response_json)
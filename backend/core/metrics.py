@@ -0,0 +1,177 @@
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+# Latency buckets in seconds (Prometheus-style upper bounds, +Inf implied)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+  __slots__ = ("buckets", "counts", "sum", "count")
+
+  def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1)
+    self.sum = 0.0
+    self.count = 0
+
+  def observe(self, value: float) -> None:
+    self.counts[bisect_left(self.buckets, value)] += 1
+    self.sum += value
+    self.count += 1
+
+  def quantile(self, q: float) -> float:
+    # Linear interpolation inside the bucket, like histogram_quantile()
+    if not self.count:
+      return 0.0
+    rank = q * self.count
+    seen = 0
+    lower = 0.0
+    # the +Inf bucket is clamped to the largest finite bound
+    for c, upper in zip(self.counts, (*self.buckets, self.buckets[-1])):
+      if c and seen + c >= rank:
+        return lower + (upper - lower) * (rank - seen) / c
+      seen += c
+      lower = upper
+    return self.buckets[-1]
+
+
+class MetricsRegistry:
+  # Counters, gauges and histograms keyed by (name, sorted labels). One lock
+  # guards updates; each update is a couple of dict lookups and adds.
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._counters: dict[tuple[str, Labels], float] = {}
+    self._gauges: dict[tuple[str, Labels], float] = {}
+    self._histograms: dict[tuple[str, Labels], Histogram] = {}
+    self._help: dict[str, str] = {}
+    self._collectors: list[Callable[[], Iterator[tuple[str, str, dict, float]]]] = []
+
+  def describe(self, name: str, help_text: str) -> None:
+    self._help[name] = help_text
+
+  def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+    key = (name, tuple(sorted(labels.items())))
+    with self._lock:
+      self._counters[key] = self._counters.get(key, 0.0) + value
+
+  def set_gauge(self, name: str, value: float, **labels: str) -> None:
+    key = (name, tuple(sorted(labels.items())))
+    with self._lock:
+      self._gauges[key] = value
+
+  def add_gauge(self, name: str, delta: float, **labels: str) -> None:
+    key = (name, tuple(sorted(labels.items())))
+    with self._lock:
+      self._gauges[key] = self._gauges.get(key, 0.0) + delta
+
+  def observe(self, name: str, value: float, **labels: str) -> None:
+    key = (name, tuple(sorted(labels.items())))
+    with self._lock:
+      h = self._histograms.get(key)
+      if h is None:
+        h = self._histograms[key] = Histogram()
+      h.observe(value)
+
+  @contextmanager
+  def timer(self, name: str, **labels: str):
+    # Observes elapsed seconds with an extra outcome=ok|error label
+    start = time.perf_counter_ns()
+    outcome = "error"
+    try:
+      yield
+      outcome = "ok"
+    finally:
+      self.observe(name, (time.perf_counter_ns() - start) / 1e9, outcome=outcome, **labels)
+
+  def register_collector(self, fn: Callable[[], Iterator[tuple[str, str, dict, float]]]) -> None:
+    # fn yields (name, "counter"|"gauge", labels, value) at scrape time
+    self._collectors.append(fn)
+
+  def counter_value(self, name: str, **labels: str) -> float:
+    return self._counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+  def histogram(self, name: str, **labels: str) -> Histogram | None:
+    return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+  def summary(self) -> dict:
+    # p50/p99 per histogram series, for humans and capacity planning
+    with self._lock:
+      items = list(self._histograms.items())
+    out: dict = {}
+    for (name, labels), h in items:
+      out.setdefault(name, []).append(
+        {
+          "labels": dict(labels),
+          "count": h.count,
+          "avg": h.sum / h.count if h.count else 0.0,
+          "p50": h.quantile(0.5),
+          "p95": h.quantile(0.95),
+          "p99": h.quantile(0.99),
+        }
+      )
+    return out
+
+  def render(self) -> str:
+    with self._lock:
+      counters = list(self._counters.items())
+      gauges = list(self._gauges.items())
+      histograms = [(k, list(h.counts), h.sum, h.count, h.buckets) for k, h in self._histograms.items()]
+    for fn in self._collectors:
+      for name, kind, labels, value in fn():
+        key = (name, tuple(sorted(labels.items())))
+        (counters if kind == "counter" else gauges).append((key, value))
+
+    lines: list[str] = []
+    typed: set[str] = set()
+
+    def _head(name: str, kind: str) -> None:
+      if name in typed:
+        return
+      typed.add(name)
+      if name in self._help:
+        lines.append(f"# HELP {name} {self._help[name]}")
+      lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters):
+      _head(name, "counter")
+      lines.append(f"{name}{_fmt_labels(labels)} {_fmt_num(value)}")
+    for (name, labels), value in sorted(gauges):
+      _head(name, "gauge")
+      lines.append(f"{name}{_fmt_labels(labels)} {_fmt_num(value)}")
+    for (name, labels), counts, total, count, buckets in sorted(histograms, key=lambda h: h[0]):
+      _head(name, "histogram")
+      cumulative = 0
+      for bound, c in zip((*buckets, float("inf")), counts):
+        cumulative += c
+        le = "+Inf" if bound == float("inf") else _fmt_num(bound)
+        lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', le),))} {cumulative}")
+      lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_num(total)}")
+      lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _fmt_labels(labels: Labels) -> str:
+  if not labels:
+    return ""
+  body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+  return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+  return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_num(value: float) -> str:
+  return repr(float(value)) if value != int(value) else str(int(value))
+
+
+metrics = MetricsRegistry()
+metrics.describe("zelo_http_requests_total", "HTTP requests by route, method and status")
+metrics.describe("zelo_http_request_duration_seconds", "HTTP request latency by route and status")
+metrics.describe("zelo_http_requests_in_flight", "HTTP requests currently being served")
+metrics.describe("zelo_tool_execute_duration_seconds", "Tool execute latency by tool and provider")
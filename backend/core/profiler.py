@@ -0,0 +1,68 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+import backend
+
+_BACKEND_DIR = os.path.dirname(backend.__file__)
+MAX_STACK_DEPTH = 128
+
+
+def _label(code) -> str:
+  # "func (dir/file.py:firstline)" - short enough to read in a flame graph
+  path = code.co_filename
+  short = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+  return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+
+class Sampler:
+  # Statistical profiler: a daemon thread snapshots stacks every `interval`
+  # seconds with sys._current_frames(). It samples the thread the request
+  # started on (the event loop for async routes) plus any other thread that
+  # is running backend code at that moment (threadpool offloads); idle pool
+  # threads are skipped. On a busy worker the loop thread is shared, so
+  # samples can include other requests' frames.
+  def __init__(self, interval: float, thread_id: int | None = None):
+    self.interval = interval
+    self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+    self.samples = 0
+    self._stacks: Counter[str] = Counter()
+    self._labels: dict = {}
+    self._stop = threading.Event()
+    self._thread = threading.Thread(target=self._run, name="zelo-profiler", daemon=True)
+
+  def start(self) -> "Sampler":
+    self._thread.start()
+    return self
+
+  def stop(self) -> dict[str, int]:
+    self._stop.set()
+    self._thread.join()
+    return dict(self._stacks)
+
+  def _run(self) -> None:
+    own = threading.get_ident()
+    while not self._stop.wait(self.interval):
+      self._sample(own)
+
+  def _sample(self, own: int) -> None:
+    labels = self._labels
+    for tid, frame in sys._current_frames().items():
+      if tid == own:
+        continue
+      stack = []
+      in_backend = False
+      while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        label = labels.get(code)
+        if label is None:
+          label = labels[code] = _label(code)
+        in_backend = in_backend or code.co_filename.startswith(_BACKEND_DIR)
+        stack.append(label)
+        frame = frame.f_back
+      if tid != self.thread_id and not in_backend:
+        continue
+      stack.reverse()
+      self._stacks[";".join(stack)] += 1
+      self.samples += 1
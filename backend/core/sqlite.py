@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import time
+
+from backend.core.config import get_settings
+
+
+def db_path(name: str) -> str:
+  state_dir = get_settings().state_dir
+  os.makedirs(state_dir, exist_ok=True)
+  return os.path.join(state_dir, name)
+
+
+def connect(name: str) -> sqlite3.Connection:
+  # WAL lets readers proceed during writes and is safe across worker processes
+  # on one host; synchronous=NORMAL is durable across app crashes under WAL.
+  conn = sqlite3.connect(db_path(name), timeout=30, check_same_thread=False, isolation_level=None)
+  # Switching a fresh file to WAL does not wait on the busy timeout, so
+  # workers opening it at the same moment can see "database is locked"
+  for attempt in range(50):
+    try:
+      conn.execute("PRAGMA journal_mode=WAL")
+      break
+    except sqlite3.OperationalError:
+      if attempt == 49:
+        raise
+      time.sleep(0.01 * (attempt + 1))
+  conn.execute("PRAGMA synchronous=NORMAL")
+  return conn
@@ -0,0 +1,414 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import get_settings
+from backend.core.sqlite import connect
+
+# Compact log record: (seq, ts, level, message, context)
+LogRecord = tuple[int, float, str, str, dict | None]
+
+
+class LogRing:
+  # Fixed-capacity ring buffer. Records are plain tuples and LogItem models are
+  # only built when logs are read. Sequence numbers are contiguous, so a
+  # cursor (after_seq) maps straight to a slot and only newer records are
+  # visited.
+  def __init__(self, capacity: int):
+    self.capacity = capacity
+    self._buf: list[LogRecord | None] = [None] * capacity
+    self._next_seq = 1
+    self._lock = threading.Lock()
+    self._waiters: list = []
+
+  def append(self, ts: float, level: str, message: str, context: dict | None) -> int:
+    with self._lock:
+      seq = self._next_seq
+      self._buf[seq % self.capacity] = (seq, ts, level, message, context)
+      self._next_seq = seq + 1
+      waiters = self._waiters
+      if waiters:
+        self._waiters = []
+    for loop, fut in waiters:
+      loop.call_soon_threadsafe(_resolve, fut)
+    return seq
+
+  def resize(self, capacity: int) -> None:
+    with self._lock:
+      records = self._snapshot(0)
+      self.capacity = capacity
+      self._buf = [None] * capacity
+      for rec in records[-capacity:]:
+        self._buf[rec[0] % capacity] = rec
+
+  @property
+  def last_seq(self) -> int:
+    return self._next_seq - 1
+
+  def _snapshot(self, after_seq: int) -> list[LogRecord]:
+    # Oldest-first records with seq > after_seq. Caller holds the lock.
+    first = max(after_seq + 1, self._next_seq - self.capacity, 1)
+    cap = self.capacity
+    buf = self._buf
+    return [buf[s % cap] for s in range(first, self._next_seq)]
+
+  def records(self, after_seq: int = 0, since_ts: float | None = None) -> list[LogRecord]:
+    with self._lock:
+      recs = self._snapshot(after_seq)
+    if since_ts is not None:
+      # timestamps are appended in order, so the cut point is a bisect away
+      recs = recs[bisect_left(recs, since_ts, key=lambda r: r[1]) :]
+    return recs
+
+  async def wait(self, after_seq: int, timeout: float) -> None:
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    with self._lock:
+      if self._next_seq - 1 > after_seq:
+        return
+      self._waiters.append((loop, fut))
+    try:
+      await asyncio.wait_for(fut, timeout)
+    except asyncio.TimeoutError:
+      pass
+
+
+def _resolve(fut: asyncio.Future) -> None:
+  if not fut.done():
+    fut.set_result(None)
+
+
+class StateBackend(ABC):
+  # Where idempotency results and logs live. Keys hold opaque bytes with a
+  # TTL; set_if_absent must be atomic across every process sharing the
+  # backend, since it is what elects the single worker that executes an
+  # idempotent request.
+  name: str
+  shared: bool = False  # visible to other processes (workers or nodes)
+  log_poll_seconds: float = 0.25  # tail polling interval when not shared in-process
+
+  @abstractmethod
+  def get(self, key: str) -> bytes | None:
+    raise NotImplementedError
+
+  @abstractmethod
+  def set_if_absent(self, key: str, value: bytes, ttl: float) -> bool:
+    raise NotImplementedError
+
+  @abstractmethod
+  def put(self, key: str, value: bytes, ttl: float) -> None:
+    raise NotImplementedError
+
+  @abstractmethod
+  def release(self, key: str, value: bytes) -> None:
+    # Delete `key` only if it still holds `value` (e.g. our own claim)
+    raise NotImplementedError
+
+  @abstractmethod
+  def append_log(self, ts: float, level: str, message: str, context: dict | None, capacity: int) -> int:
+    raise NotImplementedError
+
+  @abstractmethod
+  def logs(self, after_seq: int = 0, since_ts: float | None = None, capacity: int | None = None) -> list[LogRecord]:
+    # Oldest-first, at most the newest `capacity` records
+    raise NotImplementedError
+
+  @abstractmethod
+  def last_log_seq(self) -> int:
+    raise NotImplementedError
+
+  async def wait_logs(self, after_seq: int, timeout: float) -> None:
+    # Other processes append too, so there is nothing to wake on: poll
+    deadline = time.monotonic() + timeout
+    while await run_in_threadpool(self.last_log_seq) <= after_seq:
+      left = deadline - time.monotonic()
+      if left <= 0:
+        return
+      await asyncio.sleep(min(self.log_poll_seconds, left))
+
+  def close(self) -> None:
+    return None
+
+
+class MemoryStateBackend(StateBackend):
+  # Per-process state. The idempotency store already coalesces and caches
+  # in-process, so it skips this backend's key space; logs live in the ring.
+  name = "memory"
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._kv: dict[str, tuple[bytes, float]] = {}
+    self.ring = LogRing(get_settings().log_capacity)
+
+  def _live(self, key: str, now: float) -> bytes | None:
+    ent = self._kv.get(key)
+    if ent is None:
+      return None
+    if ent[1] <= now:
+      del self._kv[key]
+      return None
+    return ent[0]
+
+  def get(self, key: str) -> bytes | None:
+    with self._lock:
+      return self._live(key, time.time())
+
+  def set_if_absent(self, key: str, value: bytes, ttl: float) -> bool:
+    with self._lock:
+      now = time.time()
+      if self._live(key, now) is not None:
+        return False
+      self._kv[key] = (value, now + ttl)
+      return True
+
+  def put(self, key: str, value: bytes, ttl: float) -> None:
+    with self._lock:
+      self._kv[key] = (value, time.time() + ttl)
+
+  def release(self, key: str, value: bytes) -> None:
+    with self._lock:
+      ent = self._kv.get(key)
+      if ent is not None and ent[0] == value:
+        del self._kv[key]
+
+  def append_log(self, ts: float, level: str, message: str, context: dict | None, capacity: int) -> int:
+    if capacity != self.ring.capacity:
+      self.ring.resize(capacity)
+    return self.ring.append(ts, level, message, context)
+
+  def logs(self, after_seq: int = 0, since_ts: float | None = None, capacity: int | None = None) -> list[LogRecord]:
+    recs = self.ring.records(after_seq, since_ts)
+    return recs[-capacity:] if capacity else recs
+
+  def last_log_seq(self) -> int:
+    return self.ring.last_seq
+
+  async def wait_logs(self, after_seq: int, timeout: float) -> None:
+    await self.ring.wait(after_seq, timeout)
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS kv_expires ON kv(expires_at);
+CREATE TABLE IF NOT EXISTS logs (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  ts REAL NOT NULL,
+  level TEXT NOT NULL,
+  message TEXT NOT NULL,
+  context TEXT
+);
+"""
+
+# Expired keys and logs beyond capacity are deleted in passes, not per write
+_SWEEP_SECONDS = 60.0
+_TRIM_EVERY = 256
+
+
+class SqliteStateBackend(StateBackend):
+  # state.db under STATE_DIR, shared by every uvicorn worker on the host.
+  # set_if_absent is one INSERT .. ON CONFLICT statement that only overwrites
+  # an expired row, so it is atomic without an explicit transaction.
+  name = "sqlite"
+  shared = True
+
+  def __init__(self):
+    self._conn = None
+    self._lock = threading.Lock()
+    self._next_sweep = 0.0
+
+  def _db(self):
+    if self._conn is None:
+      self._conn = connect("state.db")
+      self._conn.executescript(_SQLITE_SCHEMA)
+    return self._conn
+
+  def get(self, key: str) -> bytes | None:
+    with self._lock:
+      row = self._db().execute("SELECT value FROM kv WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+    return row[0] if row else None
+
+  def set_if_absent(self, key: str, value: bytes, ttl: float) -> bool:
+    now = time.time()
+    with self._lock:
+      cur = self._db().execute(
+        "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?)"
+        " ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+        " WHERE kv.expires_at <= ?",
+        (key, value, now + ttl, now),
+      )
+      return cur.rowcount == 1
+
+  def put(self, key: str, value: bytes, ttl: float) -> None:
+    now = time.time()
+    with self._lock:
+      db = self._db()
+      db.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl))
+      if now >= self._next_sweep:
+        self._next_sweep = now + _SWEEP_SECONDS
+        db.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+
+  def release(self, key: str, value: bytes) -> None:
+    with self._lock:
+      self._db().execute("DELETE FROM kv WHERE key = ? AND value = ?", (key, value))
+
+  def append_log(self, ts: float, level: str, message: str, context: dict | None, capacity: int) -> int:
+    ctx = json.dumps(context, default=str) if context else None
+    with self._lock:
+      db = self._db()
+      seq = db.execute(
+        "INSERT INTO logs (ts, level, message, context) VALUES (?, ?, ?, ?)",
+        (ts, level, message, ctx),
+      ).lastrowid
+      if seq % _TRIM_EVERY == 0:
+        db.execute("DELETE FROM logs WHERE seq <= ?", (seq - capacity,))
+    return seq
+
+  def logs(self, after_seq: int = 0, since_ts: float | None = None, capacity: int | None = None) -> list[LogRecord]:
+    sql = "SELECT seq, ts, level, message, context FROM logs WHERE seq > ?"
+    args: list = [after_seq]
+    if since_ts is not None:
+      sql += " AND ts >= ?"
+      args.append(since_ts)
+    sql += " ORDER BY seq DESC"
+    if capacity:
+      sql += " LIMIT ?"
+      args.append(capacity)
+    with self._lock:
+      rows = self._db().execute(sql, args).fetchall()
+    return [(r[0], r[1], r[2], r[3], json.loads(r[4]) if r[4] else None) for r in reversed(rows)]
+
+  def last_log_seq(self) -> int:
+    with self._lock:
+      row = self._db().execute("SELECT MAX(seq) FROM logs").fetchone()
+    return row[0] or 0
+
+  def close(self) -> None:
+    with self._lock:
+      if self._conn is not None:
+        self._conn.close()
+        self._conn = None
+
+
+# Tables for the Supabase backend (run once in the SQL editor):
+#
+#   create table zelo_state (
+#     key text primary key,
+#     value text not null,  -- base64
+#     expires_at double precision not null
+#   );
+#   create table zelo_logs (
+#     seq bigserial primary key,
+#     ts double precision not null,
+#     level text not null,
+#     message text not null,
+#     context jsonb
+#   );
+#   create index on zelo_logs (ts);
+SUPABASE_STATE_TABLE = "zelo_state"
+SUPABASE_LOG_TABLE = "zelo_logs"
+
+
+def _b64(value: bytes) -> str:
+  return base64.b64encode(value).decode()
+
+
+class SupabaseStateBackend(StateBackend):
+  # Postgres through the Supabase REST API, for workers on several nodes.
+  # set_if_absent is an insert that ignores conflicts: Postgres's primary key
+  # lets exactly one caller insert, and an expired row is removed first by a
+  # delete that only matches while it is still expired.
+  name = "supabase"
+  shared = True
+  log_poll_seconds = 1.0
+
+  def _table(self, name: str):
+    from backend.integrations.registry import get_supabase_client
+
+    return get_supabase_client().client.table(name)
+
+  def get(self, key: str) -> bytes | None:
+    rows = (
+      self._table(SUPABASE_STATE_TABLE)
+      .select("value")
+      .eq("key", key)
+      .gt("expires_at", time.time())
+      .limit(1)
+      .execute()
+      .data
+    )
+    return base64.b64decode(rows[0]["value"]) if rows else None
+
+  def set_if_absent(self, key: str, value: bytes, ttl: float) -> bool:
+    now = time.time()
+    row = {"key": key, "value": _b64(value), "expires_at": now + ttl}
+    table = self._table(SUPABASE_STATE_TABLE)
+    for _ in range(2):
+      if table.upsert(row, on_conflict="key", ignore_duplicates=True).execute().data:
+        return True
+      if not table.delete().eq("key", key).lte("expires_at", now).execute().data:
+        return False
+    return False
+
+  def put(self, key: str, value: bytes, ttl: float) -> None:
+    row = {"key": key, "value": _b64(value), "expires_at": time.time() + ttl}
+    self._table(SUPABASE_STATE_TABLE).upsert(row, on_conflict="key").execute()
+
+  def release(self, key: str, value: bytes) -> None:
+    self._table(SUPABASE_STATE_TABLE).delete().eq("key", key).eq("value", _b64(value)).execute()
+
+  def append_log(self, ts: float, level: str, message: str, context: dict | None, capacity: int) -> int:
+    row = {"ts": ts, "level": level, "message": message, "context": context}
+    table = self._table(SUPABASE_LOG_TABLE)
+    seq = table.insert(json.loads(json.dumps(row, default=str))).execute().data[0]["seq"]
+    if seq % _TRIM_EVERY == 0:
+      table.delete().lte("seq", seq - capacity).execute()
+    return seq
+
+  def logs(self, after_seq: int = 0, since_ts: float | None = None, capacity: int | None = None) -> list[LogRecord]:
+    query = self._table(SUPABASE_LOG_TABLE).select("seq,ts,level,message,context").gt("seq", after_seq)
+    if since_ts is not None:
+      query = query.gte("ts", since_ts)
+    query = query.order("seq", desc=True)
+    if capacity:
+      query = query.limit(capacity)
+    rows = query.execute().data
+    return [(r["seq"], r["ts"], r["level"], r["message"], r["context"]) for r in reversed(rows)]
+
+  def last_log_seq(self) -> int:
+    rows = self._table(SUPABASE_LOG_TABLE).select("seq").order("seq", desc=True).limit(1).execute().data
+    return rows[0]["seq"] if rows else 0
+
+
+BACKENDS = {
+  "memory": MemoryStateBackend,
+  "sqlite": SqliteStateBackend,
+  "supabase": SupabaseStateBackend,
+}
+_INSTANCES: dict[str, StateBackend] = {}
+_LOCK = threading.Lock()
+
+
+def get_state_backend() -> StateBackend:
+  name = get_settings().state_backend
+  backend = _INSTANCES.get(name)
+  if backend is not None:
+    return backend
+  if name not in BACKENDS:
+    raise ValueError(f"unknown STATE_BACKEND: {name}")
+  with _LOCK:
+    backend = _INSTANCES.get(name)
+    if backend is None:
+      backend = _INSTANCES[name] = BACKENDS[name]()
+  return backend
+
+
+def close_state_backends() -> None:
+  # Closes connections only; the in-memory log ring survives
+  for backend in list(_INSTANCES.values()):
+    backend.close()
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+
+
+class Timings:
+  # Phase durations of one request, sent back as a Server-Timing header.
+  # Repeated phases (retries, batch items, appended block chunks) accumulate.
+  # Tasks and threadpool work spawned by the request copy the contextvar and
+  # so report into the same object, hence the lock.
+  __slots__ = ("_phases", "_lock")
+
+  def __init__(self):
+    self._phases: dict[str, list[float]] = {}  # name -> [seconds, count]
+    self._lock = threading.Lock()
+
+  def add(self, name: str, seconds: float) -> None:
+    with self._lock:
+      ent = self._phases.get(name)
+      if ent is None:
+        self._phases[name] = [seconds, 1]
+      else:
+        ent[0] += seconds
+        ent[1] += 1
+
+  def items(self) -> list[tuple[str, float, int]]:
+    with self._lock:
+      return [(name, sec, int(count)) for name, (sec, count) in self._phases.items()]
+
+  def header(self, total: float | None = None) -> str:
+    parts = [
+      f'{name};dur={sec * 1000:.3f}' + (f';desc="x{count}"' if count > 1 else "")
+      for name, sec, count in self.items()
+    ]
+    if total is not None:
+      parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
+
+
+_CURRENT: ContextVar[Timings | None] = ContextVar("zelo_timings", default=None)
+
+
+def start_timings() -> tuple[Timings, Token]:
+  timings = Timings()
+  return timings, _CURRENT.set(timings)
+
+
+def stop_timings(token: Token) -> None:
+  _CURRENT.reset(token)
+
+
+def current_timings() -> Timings | None:
+  return _CURRENT.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+  # No-op outside a timed request (jobs, tests, the bench fakes)
+  timings = _CURRENT.get()
+  if timings is None:
+    yield
+    return
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    timings.add(name, time.perf_counter() - start)
+
+
+def record(name: str, seconds: float) -> None:
+  # For durations measured elsewhere (e.g. a rate-limit wait)
+  timings = _CURRENT.get()
+  if timings is not None:
+    timings.add(name, seconds)
@@ -0,0 +1,228 @@
+import asyncio
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone, tzinfo
+
+from backend.core.config import get_settings
+from backend.core.metrics import metrics
+from backend.utils.intervals import IntervalIndex
+
+metrics.describe("zelo_calendar_sync_total", "Calendar cache syncs by kind (full/incremental/expired)")
+
+# (sync_token, page_token) -> events.list page
+FetchPage = Callable[[str | None, str | None], dict]
+AFetchPage = Callable[[str | None, str | None], Awaitable[dict]]
+
+
+@dataclass(frozen=True)
+class CachedEvent:
+  id: str
+  start: float  # epoch seconds
+  end: float
+  summary: str
+
+  def as_dict(self, tz: tzinfo = timezone.utc) -> dict:
+    return {"id": self.id, "summary": self.summary, "start_iso": to_iso(self.start, tz), "end_iso": to_iso(self.end, tz)}
+
+
+def parse_time(value: str) -> float:
+  dt = datetime.fromisoformat(value)
+  if dt.tzinfo is None:
+    dt = dt.replace(tzinfo=timezone.utc)
+  return dt.timestamp()
+
+
+def to_iso(ts: float, tz: tzinfo = timezone.utc) -> str:
+  return datetime.fromtimestamp(ts, tz).isoformat()
+
+
+def _when(value: dict | None) -> float | None:
+  # All-day events carry a date instead of a dateTime; they are treated as
+  # UTC midnight to midnight
+  if not value:
+    return None
+  if value.get("dateTime"):
+    return parse_time(value["dateTime"])
+  if value.get("date"):
+    return parse_time(value["date"])
+  return None
+
+
+def parse_event(item: dict) -> CachedEvent | None:
+  # None for anything that cannot block time: cancelled (deleted) events,
+  # events marked "free" and malformed ones
+  if item.get("status") == "cancelled" or item.get("transparency") == "transparent":
+    return None
+  start, end = _when(item.get("start")), _when(item.get("end"))
+  if start is None or end is None or end <= start:
+    return None
+  return CachedEvent(id=item["id"], start=start, end=end, summary=item.get("summary") or "")
+
+
+def is_sync_expired(exc: BaseException) -> bool:
+  # Google answers an expired or invalidated sync token with 410 Gone
+  resp = getattr(exc, "resp", None)
+  if resp is not None and getattr(resp, "status", None) == 410:
+    return True
+  response = getattr(exc, "response", None)
+  return getattr(response, "status_code", None) == 410
+
+
+class _Calendar:
+  def __init__(self):
+    self.lock = threading.Lock()  # events and index
+    self.sync_lock = threading.Lock()  # one sync at a time (thread callers)
+    self.inflight: asyncio.Task | None = None  # the same for async callers
+    self.events: dict[str, CachedEvent] = {}
+    self.index = IntervalIndex()
+    self.sync_token: str | None = None
+    self.synced_at = 0.0
+
+  def put(self, ev: CachedEvent | None, event_id: str) -> None:
+    old = self.events.pop(event_id, None)
+    if old is not None:
+      self.index.remove(old.start, old.end, old.id)
+    if ev is not None:
+      self.events[event_id] = ev
+      self.index.add(ev.start, ev.end, ev.id)
+
+
+class CalendarCache:
+  # Busy time per calendar, kept current with Google's incremental sync: the
+  # first sync lists every event and keeps the nextSyncToken, later syncs ask
+  # only for changes since then. A calendar is synced at most once per
+  # CALENDAR_CACHE_TTL_SECONDS, so previews mostly run without any API call.
+  # Events this backend creates or deletes are written through right away.
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._calendars: dict[str, _Calendar] = {}
+
+  def _calendar(self, cal_id: str) -> _Calendar:
+    with self._lock:
+      cal = self._calendars.get(cal_id)
+      if cal is None:
+        cal = self._calendars[cal_id] = _Calendar()
+      return cal
+
+  def _fresh(self, cal: _Calendar) -> bool:
+    return cal.sync_token is not None and time.monotonic() - cal.synced_at < get_settings().calendar_cache_ttl_seconds
+
+  def synced(self, cal_id: str) -> bool:
+    return self._calendar(cal_id).sync_token is not None
+
+  def refresh(self, cal_id: str, fetch: FetchPage) -> None:
+    cal = self._calendar(cal_id)
+    if self._fresh(cal):
+      return
+    with cal.sync_lock:
+      if self._fresh(cal):
+        return
+      token = cal.sync_token
+      try:
+        self._apply(cal, token, self._pages(token, fetch))
+      except Exception as e:
+        if token is None or not is_sync_expired(e):
+          raise
+        metrics.inc("zelo_calendar_sync_total", kind="expired")
+        self._apply(cal, None, self._pages(None, fetch))
+
+  async def arefresh(self, cal_id: str, fetch: AFetchPage) -> None:
+    cal = self._calendar(cal_id)
+    if self._fresh(cal):
+      return
+    task = cal.inflight
+    if task is None or task.done():
+      task = cal.inflight = asyncio.ensure_future(self._async_sync(cal, fetch))
+    # Shielded: a cancelled preview must not abort the sync others wait on
+    await asyncio.shield(task)
+
+  async def _async_sync(self, cal: _Calendar, fetch: AFetchPage) -> None:
+    token = cal.sync_token
+    try:
+      self._apply(cal, token, await self._apages(token, fetch))
+    except Exception as e:
+      if token is None or not is_sync_expired(e):
+        raise
+      metrics.inc("zelo_calendar_sync_total", kind="expired")
+      self._apply(cal, None, await self._apages(None, fetch))
+
+  @staticmethod
+  def _pages(token: str | None, fetch: FetchPage) -> list[dict]:
+    pages = [fetch(token, None)]
+    while pages[-1].get("nextPageToken"):
+      pages.append(fetch(token, pages[-1]["nextPageToken"]))
+    return pages
+
+  @staticmethod
+  async def _apages(token: str | None, fetch: AFetchPage) -> list[dict]:
+    pages = [await fetch(token, None)]
+    while pages[-1].get("nextPageToken"):
+      pages.append(await fetch(token, pages[-1]["nextPageToken"]))
+    return pages
+
+  def _apply(self, cal: _Calendar, token: str | None, pages: list[dict]) -> None:
+    # A full sync (token None) replaces the cache; an incremental one patches
+    # it. Events that already ended are dropped either way.
+    horizon = time.time()
+    changes: dict[str, CachedEvent | None] = {}
+    for page in pages:
+      for item in page.get("items", []):
+        ev = parse_event(item)
+        changes[item["id"]] = ev if ev is not None and ev.end > horizon else None
+    next_token = pages[-1].get("nextSyncToken")
+    with cal.lock:
+      if token is None:
+        cal.events = {k: v for k, v in changes.items() if v is not None}
+        cal.index.replace([(e.start, e.end, e.id) for e in cal.events.values()])
+      elif cal.sync_token != token:
+        return  # a concurrent full sync already replaced this state
+      else:
+        for event_id, ev in changes.items():
+          cal.put(ev, event_id)
+      cal.sync_token = next_token
+      cal.synced_at = time.monotonic()
+    metrics.inc("zelo_calendar_sync_total", kind="full" if token is None else "incremental")
+
+  def record(self, cal_id: str, item: dict) -> None:
+    # Write-through for an event returned by events.insert; calendars that
+    # were never synced stay unsynced until a preview needs them
+    cal = self._calendar(cal_id)
+    with cal.lock:
+      if cal.sync_token is not None and item.get("id"):
+        cal.put(parse_event(item), item["id"])
+
+  def discard(self, cal_id: str, event_id: str) -> None:
+    cal = self._calendar(cal_id)
+    with cal.lock:
+      cal.put(None, event_id)
+
+  def conflicts(self, cal_id: str, start: float, end: float) -> list[CachedEvent]:
+    cal = self._calendar(cal_id)
+    with cal.lock:
+      return [cal.events[key] for _s, _e, key in cal.index.overlapping(start, end)]
+
+  def free_slots(self, cal_id: str, start: float, duration: float, horizon: float, limit: int) -> list[tuple[float, float]]:
+    # Earliest gaps of `duration` from `start` on, looking at most `horizon`
+    # seconds ahead. Each busy candidate jumps straight past the latest end
+    # among the events it overlaps.
+    cal = self._calendar(cal_id)
+    slots: list[tuple[float, float]] = []
+    at, stop = start, start + horizon
+    with cal.lock:
+      while len(slots) < limit and at + duration <= stop:
+        busy = cal.index.overlapping(at, at + duration)
+        if busy:
+          at = max(e for _s, e, _k in busy)
+        else:
+          slots.append((at, at + duration))
+          at += duration
+    return slots
+
+  def clear(self) -> None:
+    with self._lock:
+      self._calendars.clear()
+
+
+calendar_cache = CalendarCache()
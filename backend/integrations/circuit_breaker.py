@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import deque
+
+from backend.core.config import get_settings
+from backend.core.exceptions import ProviderUnavailable
+from backend.core.metrics import metrics
+from backend.services.log_service import add_log
+from backend.services.retry_service import POLICIES, classify
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+metrics.describe("zelo_circuit_state", "Provider circuit state (0 closed, 1 half-open, 2 open)")
+metrics.describe("zelo_circuit_rejections_total", "Calls failed fast by an open provider circuit")
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+  # Only provider health counts: 5xx, timeouts and connection errors. 4xx
+  # (bad payload, auth) and 429 (our own pacing) do not open the circuit.
+  info = classify(exc, POLICIES["default"])
+  if info.status is not None:
+    return info.status >= 500
+  return info.retryable
+
+
+class CircuitBreaker:
+  # Sliding time window of (ts, failed, slow) outcomes. The circuit opens
+  # when, with at least `min_calls` samples, the failure rate or the slow-call
+  # rate crosses its threshold. After `open_seconds` a limited number of
+  # half-open probes decide whether to close again or re-open.
+  def __init__(self, provider: str):
+    self.provider = provider
+    self.state = CLOSED
+    self._lock = threading.Lock()
+    self._window: deque[tuple[float, bool, bool]] = deque()
+    self._failures = 0
+    self._slows = 0
+    self._opened_at = 0.0
+    self._probes = 0
+    self._probe_successes = 0
+
+  def _transition(self, state: str, reason: str) -> None:
+    # Caller holds the lock
+    prev, self.state = self.state, state
+    if state == OPEN:
+      self._opened_at = time.monotonic()
+    if state in (OPEN, CLOSED):
+      self._probes = 0
+      self._probe_successes = 0
+    if state == CLOSED:
+      self._window.clear()
+      self._failures = 0
+      self._slows = 0
+    add_log(
+      "WARN" if state == OPEN else "INFO",
+      f"circuit {state}",
+      {"provider": self.provider, "from": prev, "reason": reason},
+    )
+
+  def before_call(self) -> None:
+    settings = get_settings()
+    with self._lock:
+      if self.state == OPEN:
+        remaining = settings.circuit_open_seconds - (time.monotonic() - self._opened_at)
+        if remaining > 0:
+          metrics.inc("zelo_circuit_rejections_total", provider=self.provider)
+          raise ProviderUnavailable(self.provider, retry_after=remaining)
+        self._transition(HALF_OPEN, "cool-down elapsed")
+      if self.state == HALF_OPEN:
+        if self._probes >= settings.circuit_half_open_max_calls:
+          metrics.inc("zelo_circuit_rejections_total", provider=self.provider)
+          raise ProviderUnavailable(self.provider, retry_after=1.0)
+        self._probes += 1
+
+  def release(self) -> None:
+    # The admitted call never reached the provider (rate-limit failure,
+    # cancellation): hand its half-open probe slot back
+    with self._lock:
+      if self.state == HALF_OPEN:
+        self._probes = max(0, self._probes - 1)
+
+  def record(self, latency: float, exc: BaseException | None = None) -> None:
+    settings = get_settings()
+    failed = exc is not None and is_provider_failure(exc)
+    if exc is not None and not failed:
+      # Not a health signal; just free a half-open probe slot
+      self.release()
+      return
+    slow = latency >= settings.circuit_slow_call_seconds
+    now = time.monotonic()
+    with self._lock:
+      if self.state == HALF_OPEN:
+        if failed or slow:
+          self._transition(OPEN, "half-open probe failed")
+        else:
+          self._probe_successes += 1
+          if self._probe_successes >= settings.circuit_half_open_max_calls:
+            self._transition(CLOSED, "half-open probes succeeded")
+        return
+      if self.state == OPEN:
+        return
+
+      # Running counts keep each record O(1) amortized
+      window = self._window
+      window.append((now, failed, slow))
+      self._failures += failed
+      self._slows += slow
+      cutoff = now - settings.circuit_window_seconds
+      while window and window[0][0] < cutoff:
+        _, old_failed, old_slow = window.popleft()
+        self._failures -= old_failed
+        self._slows -= old_slow
+      total = len(window)
+      if total < settings.circuit_min_calls:
+        return
+      if self._failures / total >= settings.circuit_error_rate:
+        self._transition(OPEN, f"error rate {self._failures}/{total}")
+      elif self._slows / total >= settings.circuit_slow_call_rate:
+        self._transition(OPEN, f"slow calls {self._slows}/{total}")
+
+  def snapshot(self) -> dict:
+    with self._lock:
+      return {"provider": self.provider, "state": self.state, "window": len(self._window)}
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+_LOCK = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+  breaker = _BREAKERS.get(provider)
+  if breaker is None:
+    with _LOCK:
+      breaker = _BREAKERS.setdefault(provider, CircuitBreaker(provider))
+  return breaker
+
+
+def breaker_states() -> list[dict]:
+  return [b.snapshot() for b in list(_BREAKERS.values())]
+
+
+def _collect():
+  for b in list(_BREAKERS.values()):
+    yield "zelo_circuit_state", "gauge", {"provider": b.provider}, _STATE_VALUE[b.state]
+
+
+metrics.register_collector(_collect)
+
+
+def reset_breakers() -> None:
+  with _LOCK:
+    _BREAKERS.clear()
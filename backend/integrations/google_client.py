@@ -1,39 +1,322 @@
 from __future__ import annotations
 
 import json
+import queue
+import threading
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from urllib.parse import quote, urlsplit
 
+import google_auth_httplib2
+import httplib2
+import httpx
+from google.auth.transport.requests import Request as AuthRequest
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from starlette.concurrency import run_in_threadpool
 
 from backend.core.config import get_settings
+from backend.core.timing import phase
+from backend.integrations.guard import aprovider_call, provider_call
+from backend.services.retry_service import next_delay, retry_budget
+from backend.utils.block_splitter import chunked
+
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+MAX_BATCH = 50  # Calendar API limit per batch request
+LIST_PAGE_SIZE = 2500  # events.list maximum
+
+
+def _load_credentials() -> service_account.Credentials:
+  settings = get_settings()
+  if not settings.google_service_account_json:
+    raise RuntimeError("GOOGLE_SERVICE_ACCOUNT_JSON is not set")
+  info = json.loads(settings.google_service_account_json)
+  return service_account.Credentials.from_service_account_info(info, scopes=SCOPES)
+
+
+def _calendar_id(calendar_id: str | None) -> str:
+  cal_id = calendar_id or get_settings().google_calendar_id
+  if not cal_id:
+    raise RuntimeError("GOOGLE_CALENDAR_ID is not set")
+  return cal_id
+
+
+def _discovery_doc() -> dict:
+  # Point the bundled discovery document (regular and batch URLs) at
+  # google_api_base_url, so a local stand-in can replace the real API
+  doc = json.loads(get_static_doc("calendar", "v3"))
+  url = urlsplit(get_settings().google_api_base_url)
+  doc["rootUrl"] = f"{url.scheme}://{url.netloc}/"
+  doc["servicePath"] = url.path.strip("/") + "/"
+  doc["baseUrl"] = doc["rootUrl"] + doc["servicePath"]
+  return doc
+
+
+def _list_params(sync_token: str | None, page_token: str | None) -> dict:
+  # Recurring events come expanded into instances. A sync token cannot be
+  # combined with time bounds, so the first (full) sync lists everything.
+  params = {"singleEvents": True, "maxResults": LIST_PAGE_SIZE}
+  if page_token:
+    params["pageToken"] = page_token
+  elif sync_token:
+    params["syncToken"] = sync_token
+  return params
+
+
+def _error_item(exc: BaseException) -> dict:
+  resp = getattr(exc, "resp", None)
+  return {"ok": False, "error": str(exc), "status": getattr(resp, "status", None)}
+
+
+def _event_body(title: str, start_iso: str, end_iso: str, description: str | None) -> dict:
+  return {
+    "summary": title,
+    "description": description or "",
+    "start": {"dateTime": start_iso},
+    "end": {"dateTime": end_iso},
+  }
 
 
 class GoogleClient:
+  # httplib2 connections are not thread-safe, so each worker thread borrows a
+  # calendar service (with its own keep-alive connection) from a bounded pool.
+  # Credentials are shared and refreshed ahead of expiry under a lock.
+  def __init__(self, pool_size: int = 8):
+    self._creds = _load_credentials()
+    self._creds_lock = threading.Lock()
+    self._doc = _discovery_doc()
+    self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+    self._slots = threading.BoundedSemaphore(pool_size)
+
+  def _new_service(self):
+    http = google_auth_httplib2.AuthorizedHttp(self._creds, http=httplib2.Http(timeout=30))
+    return build_from_document(self._doc, http=http)
+
+  def ensure_token(self) -> str:
+    # google-auth marks tokens expired a few minutes before the real expiry,
+    # so this refreshes proactively instead of failing a request first.
+    if not self._creds.valid:
+      with self._creds_lock:
+        if not self._creds.valid:
+          with phase("auth"):
+            self._creds.refresh(AuthRequest())
+    return self._creds.token
+
+  @contextmanager
+  def _service(self):
+    self._slots.acquire()
+    try:
+      try:
+        svc = self._pool.get_nowait()
+      except queue.Empty:
+        svc = self._new_service()
+      try:
+        yield svc
+      finally:
+        self._pool.put_nowait(svc)
+    finally:
+      self._slots.release()
+
+  def warm_up(self) -> None:
+    self.ensure_token()
+    with self._service():
+      pass
+
+  def close(self) -> None:
+    while True:
+      try:
+        svc = self._pool.get_nowait()
+      except queue.Empty:
+        return
+      svc.close()
+
+  def create_event(self, *, title: str, start_iso: str, end_iso: str, description: str | None = None, calendar_id: str | None = None) -> dict:
+    cal_id = _calendar_id(calendar_id)
+    body = _event_body(title, start_iso, end_iso, description)
+    self.ensure_token()
+
+    def _insert() -> dict:
+      with self._service() as svc:
+        return (
+          svc.events()
+          .insert(calendarId=cal_id, body=body)
+          .execute()
+        )
+
+    return provider_call("google", "events.insert", _insert, idempotent=False)
+
+  def create_events(
+    self,
+    events: list[dict],
+    calendar_id: str | None = None,
+    progress: Callable[[dict], None] | None = None,
+  ) -> list[dict]:
+    # Bulk insert through the batch endpoint, MAX_BATCH events per HTTP call.
+    # `events` hold create_event kwargs. Returns one item per event, in
+    # order: {"ok": True, "event": ...} or {"ok": False, "error", "status"}.
+    # Events the provider rejected as retryable (429, rate-limit 403) are
+    # resubmitted on their own; ambiguous failures are not, since a retried
+    # insert could duplicate the event. `progress` hears about each created
+    # or failed event and the running count after every batch.
+    report = progress or (lambda event: None)
+    cal_id = _calendar_id(calendar_id)
+    bodies = [_event_body(e["title"], e["start_iso"], e["end_iso"], e.get("description")) for e in events]
+    results: list[dict | None] = [None] * len(bodies)
+    for _ in bodies:
+      retry_budget.deposit()
+    self.ensure_token()
+    pending = list(range(len(bodies)))
+    attempt = 0
+    while pending:
+      failed: dict[int, BaseException] = {}
+      for indices in chunked(pending, MAX_BATCH):
+        failed.update(self._insert_batch(cal_id, indices, bodies, results, report))
+        done = sum(r is not None for r in results)
+        report({"event": "progress", "done": done, "total": len(bodies), "unit": "events"})
+      pending, delay = [], 0.0
+      for i, exc in sorted(failed.items()):
+        wait = next_delay("google", attempt, exc, idempotent=False)
+        if wait is None:
+          results[i] = _error_item(exc)
+          report({"event": "item_failed", "index": i, "error": results[i]["error"]})
+        else:
+          pending.append(i)
+          delay = max(delay, wait)
+      if pending:
+        time.sleep(delay)
+        attempt += 1
+    return results
+
+  def _insert_batch(
+    self,
+    cal_id: str,
+    indices,
+    bodies: list[dict],
+    results: list,
+    report: Callable[[dict], None],
+  ) -> dict[int, BaseException]:
+    failed: dict[int, BaseException] = {}
+
+    def _callback(request_id: str, response: dict, exception: BaseException | None) -> None:
+      i = int(request_id)
+      if exception is not None:
+        failed[i] = exception
+      else:
+        results[i] = {"ok": True, "event": response}
+        report({"event": "created", "index": i, "id": response.get("id"), "url": response.get("htmlLink")})
+
+    def _send() -> None:
+      with self._service() as svc:
+        batch = svc.new_batch_http_request(callback=_callback)
+        for i in indices:
+          batch.add(svc.events().insert(calendarId=cal_id, body=bodies[i]), request_id=str(i))
+        batch.execute()
+
+    try:
+      # Each inner request counts against the per-user quota
+      provider_call("google", "events.batch_insert", _send, idempotent=False, cost=len(indices))
+    except Exception as e:  # noqa: BLE001
+      # The batch as a whole failed (after safe retries): report it on every
+      # event of this batch without retrying them individually
+      for i in indices:
+        if results[i] is None:
+          results[i] = _error_item(e)
+          report({"event": "item_failed", "index": i, "error": results[i]["error"]})
+    return failed
+
+  def list_events(self, *, calendar_id: str | None = None, sync_token: str | None = None, page_token: str | None = None) -> dict:
+    # One events.list page. With a sync token only changes since that sync
+    # come back (deletions as status "cancelled"); 410 means it expired.
+    cal_id = _calendar_id(calendar_id)
+    self.ensure_token()
+    params = _list_params(sync_token, page_token)
+
+    def _list() -> dict:
+      with self._service() as svc:
+        return svc.events().list(calendarId=cal_id, **params).execute()
+
+    return provider_call("google", "events.list", _list)
+
+  def delete_event(self, *, event_id: str, calendar_id: str | None = None) -> None:
+    # Compensation for create_event. 404/410 mean it is already gone.
+    cal_id = _calendar_id(calendar_id)
+    self.ensure_token()
+
+    def _delete() -> None:
+      with self._service() as svc:
+        try:
+          svc.events().delete(calendarId=cal_id, eventId=event_id).execute()
+        except HttpError as e:
+          if e.resp.status not in (404, 410):
+            raise
+
+    provider_call("google", "events.delete", _delete)
+
+
+class AsyncGoogleClient:
+  # Calendar REST calls over a shared httpx.AsyncClient. Token minting is a
+  # blocking google-auth call, so it is offloaded and serialized by a lock.
   def __init__(self):
-    settings = get_settings()
-    if not settings.google_service_account_json:
-      raise RuntimeError("GOOGLE_SERVICE_ACCOUNT_JSON is not set")
-    info = json.loads(settings.google_service_account_json)
-    creds = service_account.Credentials.from_service_account_info(
-      info,
-      scopes=["https://www.googleapis.com/auth/calendar"],
+    self._creds = _load_credentials()
+    self._creds_lock = threading.Lock()
+    self._http = httpx.AsyncClient(
+      base_url=get_settings().google_api_base_url,
+      timeout=30,
+      limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
     )
-    self._svc = build("calendar", "v3", credentials=creds, cache_discovery=False)
-    self._settings = settings
 
-  def create_event(self, *, title: str, start_iso: str, end_iso: str, description: str | None = None, calendar_id: str | None = None) -> dict:
-    cal_id = calendar_id or self._settings.google_calendar_id
-    if not cal_id:
-      raise RuntimeError("GOOGLE_CALENDAR_ID is not set")
-
-    body = {
-      "summary": title,
-      "description": description or "",
-      "start": {"dateTime": start_iso},
-      "end": {"dateTime": end_iso},
-    }
-    return (
-      self._svc.events()
-      .insert(calendarId=cal_id, body=body)
-      .execute()
+  def _refresh(self) -> str:
+    with self._creds_lock:
+      if not self._creds.valid:
+        with phase("auth"):
+          self._creds.refresh(AuthRequest())
+      return self._creds.token
+
+  async def ensure_token(self) -> str:
+    if self._creds.valid:
+      return self._creds.token
+    return await run_in_threadpool(self._refresh)
+
+  async def aclose(self) -> None:
+    await self._http.aclose()
+
+  async def create_event(self, *, title: str, start_iso: str, end_iso: str, description: str | None = None, calendar_id: str | None = None) -> dict:
+    cal_id = _calendar_id(calendar_id)
+    body = _event_body(title, start_iso, end_iso, description)
+    return await aprovider_call(
+      "google",
+      "events.insert",
+      lambda: self._request("POST", f"/calendars/{quote(cal_id, safe='')}/events", json=body),
+      idempotent=False,
     )
+
+  async def list_events(self, *, calendar_id: str | None = None, sync_token: str | None = None, page_token: str | None = None) -> dict:
+    cal_id = _calendar_id(calendar_id)
+    params = {k: str(v).lower() if isinstance(v, bool) else v for k, v in _list_params(sync_token, page_token).items()}
+    return await aprovider_call(
+      "google",
+      "events.list",
+      lambda: self._request("GET", f"/calendars/{quote(cal_id, safe='')}/events", params=params),
+    )
+
+  async def delete_event(self, *, event_id: str, calendar_id: str | None = None) -> None:
+    cal_id = _calendar_id(calendar_id)
+    url = f"/calendars/{quote(cal_id, safe='')}/events/{quote(event_id, safe='')}"
+
+    async def _delete() -> None:
+      try:
+        await self._request("DELETE", url)
+      except httpx.HTTPStatusError as e:
+        if e.response.status_code not in (404, 410):
+          raise
+
+    await aprovider_call("google", "events.delete", _delete)
+
+  async def _request(self, method: str, url: str, **kwargs) -> dict:
+    token = await self.ensure_token()
+    res = await self._http.request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+    res.raise_for_status()
+    return res.json() if res.content else {}
@@ -0,0 +1,84 @@
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from backend.core.metrics import metrics
+from backend.core.timing import record
+from backend.integrations.circuit_breaker import get_breaker
+from backend.integrations.rate_limit import rate_limiter
+from backend.services.retry_service import acall_with_retry, call_with_retry
+
+T = TypeVar("T")
+
+metrics.describe("zelo_provider_request_duration_seconds", "Single provider API attempt latency")
+
+
+# Every outbound provider call goes through these wrappers. Each attempt
+# (retries included) is checked against the provider's circuit breaker,
+# waits for a rate-limit slot, and is timed; the whole call follows the
+# provider's retry policy. An open circuit fails fast with a 503 and is not
+# retried. `cost` is the number of rate-limit slots one attempt consumes.
+# An attempt that ends without an outcome (rate limiter error, cancellation)
+# gives its half-open probe slot back instead of holding it forever.
+def provider_call(provider: str, operation: str, fn: Callable[[], T], idempotent: bool = True, cost: int = 1) -> T:
+  breaker = get_breaker(provider)
+
+  def _attempt() -> T:
+    breaker.before_call()
+    settled = False
+    try:
+      record("ratelimit", rate_limiter.acquire(provider, cost))
+      start = time.perf_counter()
+      try:
+        result = fn()
+      except Exception as e:
+        settled = True
+        _done(provider, operation, breaker, start, e)
+        raise
+      settled = True
+      _done(provider, operation, breaker, start, None)
+      return result
+    finally:
+      if not settled:
+        breaker.release()
+
+  return call_with_retry(provider, _attempt, idempotent=idempotent)
+
+
+async def aprovider_call(
+  provider: str,
+  operation: str,
+  fn: Callable[[], Awaitable[T]],
+  idempotent: bool = True,
+  cost: int = 1,
+) -> T:
+  breaker = get_breaker(provider)
+
+  async def _attempt() -> T:
+    breaker.before_call()
+    settled = False
+    try:
+      record("ratelimit", await rate_limiter.aacquire(provider, cost))
+      start = time.perf_counter()
+      try:
+        result = await fn()
+      except Exception as e:
+        settled = True
+        _done(provider, operation, breaker, start, e)
+        raise
+      settled = True
+      _done(provider, operation, breaker, start, None)
+      return result
+    finally:
+      if not settled:
+        breaker.release()
+
+  return await acall_with_retry(provider, _attempt, idempotent=idempotent)
+
+
+def _done(provider: str, operation: str, breaker, start: float, exc: BaseException | None) -> None:
+  elapsed = time.perf_counter() - start
+  outcome = "ok" if exc is None else "error"
+  record("provider", elapsed)
+  metrics.observe("zelo_provider_request_duration_seconds", elapsed, provider=provider, operation=operation, outcome=outcome)
+  breaker.record(elapsed, exc)
@@ -1,8 +1,22 @@
 from __future__ import annotations
 
+from collections.abc import Callable
+
+import httpx
+from notion_client import APIResponseError
+from notion_client import AsyncClient as NotionAsyncSDK
 from notion_client import Client as NotionSDK
 
 from backend.core.config import get_settings
+from backend.core.timing import phase
+from backend.integrations.guard import aprovider_call, provider_call
+from backend.utils.block_splitter import chunked, split_text
+
+# Notion API limits: children per request, chars per rich_text item, and
+# rich_text items per block.
+MAX_CHILDREN = 100
+MAX_TEXT = 2000
+MAX_RICH_TEXT = 100
 
 
 class NotionClient:
@@ -10,48 +24,278 @@ class NotionClient:
     settings = get_settings()
     if not settings.notion_token:
       raise RuntimeError("NOTION_TOKEN is not set")
-    self._sdk = NotionSDK(auth=settings.notion_token)
-    self._settings = settings
+    # httpx.Client is thread-safe and keeps a keep-alive pool, so one SDK
+    # instance is shared by every request in the worker.
+    http = httpx.Client(limits=httpx.Limits(max_connections=20, max_keepalive_connections=10))
+    self._sdk = NotionSDK(auth=settings.notion_token, client=http, base_url=settings.notion_base_url)
 
-  def create_page(self, *, title: str, content: str, parent_page_id: str | None = None) -> dict:
-    parent_id = parent_page_id or self._settings.notion_parent_page_id
-    db_id = self._settings.notion_database_id
+  def warm_up(self) -> None:
+    # Nothing to mint for Notion (static bearer token); the pool fills lazily
+    return None
 
-    children = _text_to_blocks(content)
+  def close(self) -> None:
+    self._sdk.close()
 
-    if parent_id:
-      return self._sdk.pages.create(
-        parent={"page_id": parent_id},
-        properties={"title": {"title": [{"text": {"content": title}}]}},
-        children=children,
-      )
+  def create_page(self, *, title: str, content: str, parent_page_id: str | None = None, progress: Callable[[dict], None] | None = None) -> dict:
+    # The page is created with the first batch of blocks; the rest are
+    # appended in order, MAX_CHILDREN at a time.
+    with phase("blocks"):
+      blocks = text_to_blocks(content)
+    args = _page_create_args(title, blocks[:MAX_CHILDREN], parent_page_id)
+    page = provider_call("notion", "pages.create", lambda: self._sdk.pages.create(**args), idempotent=False)
+    report = _page_progress(page, len(blocks), progress)
+    for batch in chunked(blocks[MAX_CHILDREN:], MAX_CHILDREN):
+      self._append(page["id"], list(batch))
+      report(len(batch))
+    return page
 
-    if db_id:
-      # Create in database (must have a title property named "Name" or configure in payload in the future)
-      return self._sdk.pages.create(
-        parent={"database_id": db_id},
-        properties={"Name": {"title": [{"text": {"content": title}}]}},
-        children=children,
+  def _append(self, block_id: str, children: list[dict], after: str | None = None) -> dict:
+    extra = {"after": after} if after else {}
+    return provider_call(
+      "notion",
+      "blocks.children.append",
+      lambda: self._sdk.blocks.children.append(block_id=block_id, children=children, **extra),
+      idempotent=False,
+    )
+
+  def append_blocks(self, block_id: str, blocks: list[dict], after: str | None = None) -> list[str]:
+    # Inserts `blocks` after the child `after` (or at the end), in order;
+    # returns the new block ids
+    ids: list[str] = []
+    for batch in chunked(blocks, MAX_CHILDREN):
+      res = self._append(block_id, list(batch), after=ids[-1] if ids else after)
+      ids.extend(b["id"] for b in res.get("results", []))
+    return ids
+
+  def list_children(self, block_id: str) -> list[dict]:
+    children: list[dict] = []
+    cursor = None
+    while True:
+      extra = {"start_cursor": cursor} if cursor else {}
+      res = provider_call(
+        "notion",
+        "blocks.children.list",
+        lambda: self._sdk.blocks.children.list(block_id=block_id, page_size=MAX_CHILDREN, **extra),
       )
+      children.extend(res.get("results", []))
+      cursor = res.get("next_cursor")
+      if not res.get("has_more") or not cursor:
+        return children
+
+  def update_block(self, block_id: str, block: dict) -> dict:
+    kind = block["type"]
+    return provider_call("notion", "blocks.update", lambda: self._sdk.blocks.update(block_id=block_id, **{kind: block[kind]}))
 
-    raise RuntimeError("Set NOTION_PARENT_PAGE_ID or NOTION_DATABASE_ID to create pages")
+  def delete_block(self, block_id: str) -> None:
+    # 404 means it is already gone
+    def _delete() -> None:
+      try:
+        self._sdk.blocks.delete(block_id=block_id)
+      except APIResponseError as e:
+        if e.status != 404:
+          raise
+
+    provider_call("notion", "blocks.delete", _delete)
+
+  def retrieve_page(self, page_id: str) -> dict:
+    return provider_call("notion", "pages.retrieve", lambda: self._sdk.pages.retrieve(page_id=page_id))
 
   def create_db_row(self, *, database_id: str, properties: dict) -> dict:
-    return self._sdk.pages.create(parent={"database_id": database_id}, properties=properties)
+    return provider_call(
+      "notion",
+      "pages.create",
+      lambda: self._sdk.pages.create(parent={"database_id": database_id}, properties=properties),
+      idempotent=False,
+    )
+
+  def archive_page(self, *, page_id: str) -> dict:
+    # Compensation for create_page/create_db_row; safe to repeat
+    return provider_call("notion", "pages.update", lambda: self._sdk.pages.update(page_id=page_id, in_trash=True))
+
+  def database_properties(self, *, database_id: str) -> dict:
+    db = provider_call("notion", "databases.retrieve", lambda: self._sdk.databases.retrieve(database_id=database_id))
+    source_id = _data_source_id(db)
+    if source_id is None:
+      return db.get("properties") or {}
+    ds = provider_call(
+      "notion",
+      "data_sources.retrieve",
+      lambda: self._sdk.data_sources.retrieve(data_source_id=source_id),
+    )
+    return ds.get("properties") or {}
+
+
+class AsyncNotionClient:
+  # Same surface as NotionClient, on the SDK's httpx.AsyncClient so waiting on
+  # Notion does not hold a threadpool worker.
+  def __init__(self):
+    settings = get_settings()
+    if not settings.notion_token:
+      raise RuntimeError("NOTION_TOKEN is not set")
+    http = httpx.AsyncClient(limits=httpx.Limits(max_connections=100, max_keepalive_connections=20))
+    self._sdk = NotionAsyncSDK(auth=settings.notion_token, client=http, base_url=settings.notion_base_url)
+
+  async def aclose(self) -> None:
+    await self._sdk.aclose()
+
+  async def create_page(
+    self,
+    *,
+    title: str,
+    content: str,
+    parent_page_id: str | None = None,
+    progress: Callable[[dict], None] | None = None,
+  ) -> dict:
+    with phase("blocks"):
+      blocks = text_to_blocks(content)
+    args = _page_create_args(title, blocks[:MAX_CHILDREN], parent_page_id)
+    page = await aprovider_call("notion", "pages.create", lambda: self._sdk.pages.create(**args), idempotent=False)
+    report = _page_progress(page, len(blocks), progress)
+    for batch in chunked(blocks[MAX_CHILDREN:], MAX_CHILDREN):
+      await self._append(page["id"], list(batch))
+      report(len(batch))
+    return page
+
+  async def _append(self, block_id: str, children: list[dict], after: str | None = None) -> dict:
+    extra = {"after": after} if after else {}
+    return await aprovider_call(
+      "notion",
+      "blocks.children.append",
+      lambda: self._sdk.blocks.children.append(block_id=block_id, children=children, **extra),
+      idempotent=False,
+    )
+
+  async def append_blocks(self, block_id: str, blocks: list[dict], after: str | None = None) -> list[str]:
+    ids: list[str] = []
+    for batch in chunked(blocks, MAX_CHILDREN):
+      res = await self._append(block_id, list(batch), after=ids[-1] if ids else after)
+      ids.extend(b["id"] for b in res.get("results", []))
+    return ids
+
+  async def list_children(self, block_id: str) -> list[dict]:
+    children: list[dict] = []
+    cursor = None
+    while True:
+      extra = {"start_cursor": cursor} if cursor else {}
+      res = await aprovider_call(
+        "notion",
+        "blocks.children.list",
+        lambda: self._sdk.blocks.children.list(block_id=block_id, page_size=MAX_CHILDREN, **extra),
+      )
+      children.extend(res.get("results", []))
+      cursor = res.get("next_cursor")
+      if not res.get("has_more") or not cursor:
+        return children
+
+  async def update_block(self, block_id: str, block: dict) -> dict:
+    kind = block["type"]
+    return await aprovider_call("notion", "blocks.update", lambda: self._sdk.blocks.update(block_id=block_id, **{kind: block[kind]}))
+
+  async def delete_block(self, block_id: str) -> None:
+    # 404 means it is already gone
+    async def _delete() -> None:
+      try:
+        await self._sdk.blocks.delete(block_id=block_id)
+      except APIResponseError as e:
+        if e.status != 404:
+          raise
+
+    await aprovider_call("notion", "blocks.delete", _delete)
+
+  async def retrieve_page(self, page_id: str) -> dict:
+    return await aprovider_call("notion", "pages.retrieve", lambda: self._sdk.pages.retrieve(page_id=page_id))
+
+  async def create_db_row(self, *, database_id: str, properties: dict) -> dict:
+    return await aprovider_call(
+      "notion",
+      "pages.create",
+      lambda: self._sdk.pages.create(parent={"database_id": database_id}, properties=properties),
+      idempotent=False,
+    )
+
+  async def archive_page(self, *, page_id: str) -> dict:
+    return await aprovider_call("notion", "pages.update", lambda: self._sdk.pages.update(page_id=page_id, in_trash=True))
+
+  async def database_properties(self, *, database_id: str) -> dict:
+    db = await aprovider_call(
+      "notion",
+      "databases.retrieve",
+      lambda: self._sdk.databases.retrieve(database_id=database_id),
+    )
+    source_id = _data_source_id(db)
+    if source_id is None:
+      return db.get("properties") or {}
+    ds = await aprovider_call(
+      "notion",
+      "data_sources.retrieve",
+      lambda: self._sdk.data_sources.retrieve(data_source_id=source_id),
+    )
+    return ds.get("properties") or {}
+
+
+def _page_progress(page: dict, total: int, progress: Callable[[dict], None] | None) -> Callable[[int], None]:
+  # Reports the new page, then block counts as appended chunks land
+  done = min(total, MAX_CHILDREN)
+  if progress is None:
+    return lambda n: None
+  progress({"event": "created", "id": page.get("id"), "url": page.get("url")})
+  progress({"event": "progress", "done": done, "total": total, "unit": "blocks"})
 
+  def _report(n: int) -> None:
+    nonlocal done
+    done += n
+    progress({"event": "progress", "done": done, "total": total, "unit": "blocks"})
 
-def _text_to_blocks(text: str) -> list[dict]:
+  return _report
+
+
+def _data_source_id(db: dict) -> str | None:
+  # API 2025-09-03 moved the schema from the database to its data sources;
+  # older versions still return `properties` on the database itself
+  if "properties" in db:
+    return None
+  sources = db.get("data_sources") or []
+  return sources[0]["id"] if sources else None
+
+
+def _page_create_args(title: str, children: list[dict], parent_page_id: str | None) -> dict:
+  settings = get_settings()
+  parent_id = parent_page_id or settings.notion_parent_page_id
+  db_id = settings.notion_database_id
+
+  if parent_id:
+    return {
+      "parent": {"page_id": parent_id},
+      "properties": {"title": {"title": [{"text": {"content": title}}]}},
+      "children": children,
+    }
+
+  if db_id:
+    # Create in database (must have a title property named "Name" or configure in payload in the future)
+    return {
+      "parent": {"database_id": db_id},
+      "properties": {"Name": {"title": [{"text": {"content": title}}]}},
+      "children": children,
+    }
+
+  raise RuntimeError("Set NOTION_PARENT_PAGE_ID or NOTION_DATABASE_ID to create pages")
+
+
+def text_to_blocks(text: str) -> list[dict]:
+  # Long lines are split across rich_text items (MAX_TEXT chars each), and
+  # across several paragraphs if they exceed MAX_RICH_TEXT items.
   lines = [ln.rstrip() for ln in (text or "").splitlines()]
   blocks: list[dict] = []
   for ln in lines:
     if not ln.strip():
       continue
-    blocks.append(
-      {
-        "object": "block",
-        "type": "paragraph",
-        "paragraph": {"rich_text": [{"type": "text", "text": {"content": ln}}]},
-      }
-    )
+    segments = [{"type": "text", "text": {"content": part}} for part in split_text(ln, MAX_TEXT)]
+    for rich_text in chunked(segments, MAX_RICH_TEXT):
+      blocks.append(
+        {
+          "object": "block",
+          "type": "paragraph",
+          "paragraph": {"rich_text": list(rich_text)},
+        }
+      )
   return blocks
-
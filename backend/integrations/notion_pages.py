@@ -0,0 +1,141 @@
+import difflib
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+from backend.core.sqlite import connect
+from backend.utils.hash import canonical_json, sha256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+  key TEXT PRIMARY KEY,
+  page_id TEXT NOT NULL,
+  url TEXT,
+  hashes TEXT NOT NULL,
+  updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_page_id ON pages(page_id);
+"""
+
+
+@dataclass
+class PageEntry:
+  page_id: str
+  url: str | None
+  hashes: list[str]  # one per top-level block as last written, in page order
+
+
+def page_key(title: str, parent: str) -> str:
+  return sha256(canonical_json([parent, title]))
+
+
+def block_hashes(blocks: list[dict]) -> list[str]:
+  return [sha256(canonical_json(b)) for b in blocks]
+
+
+def listed_hashes(children: list[dict]) -> list[str]:
+  # Hashes of blocks as blocks.children.list returns them, reduced to the
+  # shape text_to_blocks writes (no ids, timestamps or annotations), so an
+  # untouched block hashes like the one we sent
+  reduced = []
+  for child in children:
+    kind = child.get("type")
+    rich = (child.get(kind) or {}).get("rich_text") or []
+    texts = [{"type": "text", "text": {"content": (r.get("text") or {}).get("content", r.get("plain_text", ""))}} for r in rich]
+    reduced.append({"object": "block", "type": kind, kind: {"rich_text": texts}})
+  return block_hashes(reduced)
+
+
+# Edit steps in final page order: ("keep", ids, []), ("update", [id], [block]),
+# ("delete", ids, []) and ("insert", [], blocks) - inserted after whatever
+# the previous steps left last on the page
+Step = tuple[str, list[str], list[dict]]
+
+
+def plan_blocks(ids: list[str], old: list[str], new: list[str], blocks: list[dict], kinds: list[str] | None = None) -> list[Step]:
+  # Block-level diff of the page's current blocks against the new content.
+  # Changed runs are rewritten in place where lengths allow and the block
+  # type is unchanged (`kinds`: the current blocks' types; Notion cannot
+  # turn a heading into a paragraph); the rest is deleted or inserted.
+  # Notion can only append after an existing child, so an insert in front
+  # of the first block that stays rewrites the whole page instead.
+  kinds = kinds or [None] * len(ids)
+  steps: list[Step] = []
+
+  def push(kind: str, step_ids: list[str], step_blocks: list[dict]) -> None:
+    if kind in ("delete", "insert") and steps and steps[-1][0] == kind:
+      steps[-1][1].extend(step_ids)
+      steps[-1][2].extend(step_blocks)
+    else:
+      steps.append((kind, list(step_ids), list(step_blocks)))
+
+  for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+    if tag == "equal":
+      push("keep", ids[i1:i2], [])
+      continue
+    paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+    for k in range(paired):
+      block = blocks[j1 + k]
+      if kinds[i1 + k] in (None, block.get("type")):
+        push("update", [ids[i1 + k]], [block])
+      else:
+        push("delete", [ids[i1 + k]], [])
+        push("insert", [], [block])
+    if i1 + paired < i2:
+      push("delete", ids[i1 + paired : i2], [])
+    if j1 + paired < j2:
+      push("insert", [], blocks[j1 + paired : j2])
+  anchored = False
+  for i, (kind, _ids, _blocks) in enumerate(steps):
+    if kind == "insert" and not anchored and any(k in ("keep", "update") for k, _, _ in steps[i:]):
+      return [("delete", list(ids), []), ("insert", [], list(blocks))]
+    anchored = anchored or kind != "delete"
+  return steps
+
+
+class PageIndex:
+  # Pages created through upsert, keyed by (parent, title), with the content
+  # hash of each block. SQLite WAL under STATE_DIR, so it survives restarts
+  # and is shared by the workers on one host.
+  def __init__(self):
+    self._db = None
+    self._lock = threading.Lock()
+
+  def _conn(self):
+    if self._db is None:
+      self._db = connect("pages.db")
+      self._db.executescript(_SCHEMA)
+    return self._db
+
+  def get(self, key: str) -> PageEntry | None:
+    with self._lock:
+      row = self._conn().execute("SELECT page_id, url, hashes FROM pages WHERE key = ?", (key,)).fetchone()
+    if row is None:
+      return None
+    return PageEntry(page_id=row[0], url=row[1], hashes=json.loads(row[2]))
+
+  def put(self, key: str, entry: PageEntry) -> None:
+    with self._lock:
+      self._conn().execute(
+        "INSERT OR REPLACE INTO pages (key, page_id, url, hashes, updated_at) VALUES (?, ?, ?, ?, ?)",
+        (key, entry.page_id, entry.url, json.dumps(entry.hashes), time.time()),
+      )
+
+  def forget(self, key: str) -> None:
+    with self._lock:
+      self._conn().execute("DELETE FROM pages WHERE key = ?", (key,))
+
+  def forget_page(self, page_id: str) -> None:
+    # After rollback archived the page
+    with self._lock:
+      self._conn().execute("DELETE FROM pages WHERE page_id = ?", (page_id,))
+
+  def close(self) -> None:
+    with self._lock:
+      if self._db is not None:
+        self._db.close()
+        self._db = None
+
+
+page_index = PageIndex()
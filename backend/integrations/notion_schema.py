@@ -0,0 +1,211 @@
+import difflib
+import threading
+import time
+from collections.abc import Awaitable, Callable
+
+from backend.core.config import get_settings
+from backend.core.exceptions import InvalidPayload
+from backend.core.metrics import metrics
+from backend.core.timing import phase
+
+metrics.describe("zelo_notion_schema_cache_total", "Notion database schema lookups by outcome (hit/miss)")
+
+# Computed or system-managed properties Notion rejects on write
+READ_ONLY = frozenset({
+  "formula",
+  "rollup",
+  "created_time",
+  "created_by",
+  "last_edited_time",
+  "last_edited_by",
+  "unique_id",
+  "verification",
+  "button",
+})
+
+
+class SchemaCache:
+  # database_id -> (expires_at, properties). get() reports whether the schema
+  # was just fetched so callers know if a mismatch could be a stale entry.
+  def __init__(self):
+    self._entries: dict[str, tuple[float, dict]] = {}
+    self._lock = threading.Lock()
+
+  def _lookup(self, database_id: str) -> dict | None:
+    with self._lock:
+      ent = self._entries.get(database_id)
+    hit = ent is not None and ent[0] > time.monotonic()
+    metrics.inc("zelo_notion_schema_cache_total", outcome="hit" if hit else "miss")
+    return ent[1] if hit else None
+
+  def _store(self, database_id: str, properties: dict) -> None:
+    ttl = get_settings().notion_schema_ttl_seconds
+    with self._lock:
+      self._entries[database_id] = (time.monotonic() + ttl, properties)
+
+  def get(self, database_id: str, fetch: Callable[[], dict]) -> tuple[dict, bool]:
+    schema = self._lookup(database_id)
+    if schema is not None:
+      return schema, False
+    schema = fetch()
+    self._store(database_id, schema)
+    return schema, True
+
+  async def aget(self, database_id: str, fetch: Callable[[], Awaitable[dict]]) -> tuple[dict, bool]:
+    schema = self._lookup(database_id)
+    if schema is not None:
+      return schema, False
+    schema = await fetch()
+    self._store(database_id, schema)
+    return schema, True
+
+  def invalidate(self, database_id: str) -> None:
+    with self._lock:
+      self._entries.pop(database_id, None)
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+
+
+schema_cache = SchemaCache()
+
+
+def _rich_text(value) -> list[dict]:
+  if isinstance(value, list):
+    return value
+  return [{"type": "text", "text": {"content": str(value)}}]
+
+
+def _names(value) -> list[str]:
+  if isinstance(value, str):
+    return [v.strip() for v in value.split(",") if v.strip()]
+  if isinstance(value, list):
+    return [v["name"] if isinstance(v, dict) else str(v) for v in value]
+  raise ValueError("expected a list of names")
+
+
+def _number(value):
+  if value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)):
+    return value
+  if isinstance(value, str):
+    for cast in (int, float):
+      try:
+        return cast(value)
+      except ValueError:
+        pass
+  raise ValueError(f"expected a number, got {value!r}")
+
+
+def _checkbox(value) -> bool:
+  if isinstance(value, bool):
+    return value
+  if isinstance(value, str) and value.lower() in ("true", "false", "yes", "no", "1", "0"):
+    return value.lower() in ("true", "yes", "1")
+  raise ValueError(f"expected a boolean, got {value!r}")
+
+
+def _option(prop: dict, kind: str, name: str, strict: bool) -> dict:
+  options = [o.get("name") for o in prop.get(kind, {}).get("options", [])]
+  if strict and options and name not in options:
+    raise ValueError(f"unknown option {name!r} (expected one of {options})")
+  return {"name": name}
+
+
+def _ids(value) -> list[dict]:
+  items = value if isinstance(value, list) else [value]
+  return [v if isinstance(v, dict) else {"id": str(v)} for v in items]
+
+
+def _coerce(prop: dict, value):
+  kind = prop["type"]
+  if kind in READ_ONLY:
+    raise ValueError(f"{kind} properties are read-only")
+  if isinstance(value, dict) and kind in value:
+    # Already in Notion's wire format
+    return value
+  if kind in ("title", "rich_text"):
+    return {kind: _rich_text(value)}
+  if kind == "number":
+    return {"number": _number(value)}
+  if kind == "checkbox":
+    return {"checkbox": _checkbox(value)}
+  if kind == "select":
+    return {"select": None if value is None else _option(prop, "select", str(value), strict=False)}
+  if kind == "status":
+    # Unlike select, Notion never creates status options on write
+    return {"status": None if value is None else _option(prop, "status", str(value), strict=True)}
+  if kind == "multi_select":
+    return {"multi_select": [_option(prop, "multi_select", n, strict=False) for n in _names(value)]}
+  if kind == "date":
+    if isinstance(value, dict):
+      return {"date": value}
+    return {"date": None if value is None else {"start": str(value)}}
+  if kind in ("url", "email", "phone_number"):
+    return {kind: None if value is None else str(value)}
+  if kind in ("people", "relation"):
+    return {kind: _ids(value)}
+  if kind == "files":
+    if not isinstance(value, list):
+      raise ValueError("expected a list of file objects")
+    return {"files": value}
+  raise ValueError(f"unsupported property type {kind!r}; send it in Notion format")
+
+
+def coerce_properties(schema: dict, properties: dict) -> tuple[dict, list[str]]:
+  # Map friendly values ("Done", 3, "a, b") onto Notion's property format.
+  # Returns (properties, errors); nothing is sent while errors is non-empty.
+  out: dict = {}
+  errors: list[str] = []
+  for name, value in properties.items():
+    prop = schema.get(name)
+    if prop is None:
+      close = difflib.get_close_matches(name, list(schema), n=1)
+      errors.append(f"{name}: unknown property" + (f" (did you mean {close[0]!r}?)" if close else ""))
+      continue
+    try:
+      out[name] = _coerce(prop, value)
+    except ValueError as e:
+      errors.append(f"{name}: {e}")
+  return out, errors
+
+
+def prepare_rows(client, database_id: str, rows: list[dict]) -> list[tuple[dict, list[str]]]:
+  # Validate rows against the cached schema. Errors on a cached schema are
+  # re-checked once against a fresh fetch, in case the database changed.
+  fetch = lambda: client.database_properties(database_id=database_id)  # noqa: E731
+  schema, fresh = schema_cache.get(database_id, fetch)
+  with phase("schema"):
+    results = [coerce_properties(schema, row) for row in rows]
+  if not fresh and any(errors for _, errors in results):
+    schema_cache.invalidate(database_id)
+    schema, _ = schema_cache.get(database_id, fetch)
+    with phase("schema"):
+      results = [coerce_properties(schema, row) for row in rows]
+  return results
+
+
+async def aprepare_rows(client, database_id: str, rows: list[dict]) -> list[tuple[dict, list[str]]]:
+  fetch = lambda: client.database_properties(database_id=database_id)  # noqa: E731
+  schema, fresh = await schema_cache.aget(database_id, fetch)
+  with phase("schema"):
+    results = [coerce_properties(schema, row) for row in rows]
+  if not fresh and any(errors for _, errors in results):
+    schema_cache.invalidate(database_id)
+    schema, _ = await schema_cache.aget(database_id, fetch)
+    with phase("schema"):
+      results = [coerce_properties(schema, row) for row in rows]
+  return results
+
+
+def checked(database_id: str, prepared: tuple[dict, list[str]]) -> dict:
+  properties, errors = prepared
+  if errors:
+    raise InvalidPayload({"database_id": database_id, "errors": errors})
+  return properties
+
+
+def invalidate_on_error(database_id: str, exc: BaseException) -> None:
+  # Notion answers a schema mismatch with 400 validation_error
+  if getattr(exc, "status", None) == 400:
+    schema_cache.invalidate(database_id)
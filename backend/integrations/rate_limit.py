@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import Settings, get_settings
+from backend.core.metrics import metrics
+from backend.core.sqlite import connect
+
+metrics.describe("zelo_rate_limit_wait_seconds", "Time spent queued for a provider rate-limit slot")
+
+
+# Token bucket expressed as GCRA: each provider keeps a "theoretical arrival
+# time" (TAT). A caller reserves the next slot by advancing TAT one interval
+# and sleeps until its slot; reservations are handed out in call order, so
+# waiting is FIFO and the sustained rate never exceeds `rate` while still
+# allowing `burst` back-to-back calls after an idle period. `cost` reserves
+# several slots at once (a Google batch counts each inner request).
+def _reserve(tat: float, now: float, interval: float, burst: int, cost: int = 1) -> tuple[float, float]:
+  tat = max(tat, now)
+  delay = max(0.0, tat + (cost - burst) * interval - now)
+  return tat + cost * interval, delay
+
+
+class _MemoryState:
+  # Per-process buckets
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._tat: dict[str, float] = {}
+
+  def reserve(self, provider: str, interval: float, burst: int, cost: int = 1) -> float:
+    with self._lock:
+      tat, delay = _reserve(self._tat.get(provider, 0.0), time.time(), interval, burst, cost)
+      self._tat[provider] = tat
+      return delay
+
+
+class _SqliteState:
+  # Buckets shared by every uvicorn worker on the host. BEGIN IMMEDIATE
+  # serializes reservations across processes, preserving FIFO order.
+  def __init__(self):
+    self._conn = None
+    self._lock = threading.Lock()
+
+  def _db(self):
+    if self._conn is None:
+      self._conn = connect("ratelimit.db")
+      self._conn.execute("CREATE TABLE IF NOT EXISTS buckets (provider TEXT PRIMARY KEY, tat REAL NOT NULL)")
+    return self._conn
+
+  def reserve(self, provider: str, interval: float, burst: int, cost: int = 1) -> float:
+    with self._lock:
+      db = self._db()
+      db.execute("BEGIN IMMEDIATE")
+      try:
+        row = db.execute("SELECT tat FROM buckets WHERE provider = ?", (provider,)).fetchone()
+        tat, delay = _reserve(row[0] if row else 0.0, time.time(), interval, burst, cost)
+        db.execute("INSERT OR REPLACE INTO buckets (provider, tat) VALUES (?, ?)", (provider, tat))
+        db.execute("COMMIT")
+      except BaseException:
+        db.execute("ROLLBACK")
+        raise
+      return delay
+
+  def close(self) -> None:
+    with self._lock:
+      if self._conn is not None:
+        self._conn.close()
+        self._conn = None
+
+
+def _limits(settings: Settings, provider: str) -> tuple[float, int] | None:
+  rate = {"notion": settings.notion_rate_limit_per_sec, "google": settings.google_rate_limit_per_sec}.get(provider)
+  if not rate or rate <= 0:
+    return None
+  burst = {"notion": settings.notion_rate_limit_burst, "google": settings.google_rate_limit_burst}[provider]
+  return 1.0 / rate, max(1, burst)
+
+
+class RateLimiter:
+  def __init__(self):
+    self._memory = _MemoryState()
+    self._sqlite = _SqliteState()
+
+  def _state(self, settings: Settings):
+    return self._sqlite if settings.rate_limit_backend == "sqlite" else self._memory
+
+  def acquire(self, provider: str, cost: int = 1) -> float:
+    settings = get_settings()
+    limits = _limits(settings, provider)
+    if limits is None:
+      return 0.0
+    delay = self._state(settings).reserve(provider, *limits, cost)
+    metrics.observe("zelo_rate_limit_wait_seconds", delay, provider=provider)
+    if delay > 0:
+      time.sleep(delay)
+    return delay
+
+  async def aacquire(self, provider: str, cost: int = 1) -> float:
+    settings = get_settings()
+    limits = _limits(settings, provider)
+    if limits is None:
+      return 0.0
+    state = self._state(settings)
+    if state is self._sqlite:
+      delay = await run_in_threadpool(state.reserve, provider, *limits, cost)
+    else:
+      delay = state.reserve(provider, *limits, cost)
+    metrics.observe("zelo_rate_limit_wait_seconds", delay, provider=provider)
+    if delay > 0:
+      await asyncio.sleep(delay)
+    return delay
+
+  def close(self) -> None:
+    self._sqlite.close()
+
+
+rate_limiter = RateLimiter()
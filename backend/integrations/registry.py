@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from backend.core.config import Settings, get_settings
+from backend.core.timing import phase
+
+logger = logging.getLogger("app.integrations")
+
+# name -> (credential fingerprint, client). A client is rebuilt only when the
+# settings it was built from change (e.g. token rotated via .env hot reload).
+_CLIENTS: dict[str, tuple[tuple, Any]] = {}
+_LOCK = threading.Lock()
+
+
+def _notion_key(s: Settings) -> tuple:
+  return (s.notion_token, s.notion_base_url)
+
+
+def _google_key(s: Settings) -> tuple:
+  return (s.google_service_account_json, s.google_api_base_url)
+
+
+def _supabase_key(s: Settings) -> tuple:
+  return (s.supabase_url, s.supabase_service_key)
+
+
+def _build_notion():
+  from backend.integrations.notion_client import NotionClient
+
+  return NotionClient()
+
+
+def _build_google():
+  from backend.integrations.google_client import GoogleClient
+
+  return GoogleClient()
+
+
+def _build_supabase():
+  from backend.integrations.supabase_client import SupabaseClient
+
+  return SupabaseClient()
+
+
+def _build_async_notion():
+  from backend.integrations.notion_client import AsyncNotionClient
+
+  return AsyncNotionClient()
+
+
+def _build_async_google():
+  from backend.integrations.google_client import AsyncGoogleClient
+
+  return AsyncGoogleClient()
+
+
+_FACTORIES: dict[str, tuple[Callable[[Settings], tuple], Callable[[], Any]]] = {
+  "notion": (_notion_key, _build_notion),
+  "google": (_google_key, _build_google),
+  "supabase": (_supabase_key, _build_supabase),
+}
+
+# Async clients own an httpx.AsyncClient whose connections belong to the event
+# loop they were opened on, so they are additionally keyed by the running loop.
+_ASYNC_FACTORIES: dict[str, tuple[Callable[[Settings], tuple], Callable[[], Any]]] = {
+  "notion": (_notion_key, _build_async_notion),
+  "google": (_google_key, _build_async_google),
+}
+_ASYNC_CLIENTS: dict[str, tuple[tuple, Any]] = {}
+
+
+def get_client(name: str):
+  key_fn, build = _FACTORIES[name]
+  key = key_fn(get_settings())
+  ent = _CLIENTS.get(name)
+  if ent is not None and ent[0] == key:
+    return ent[1]
+  with _LOCK:
+    ent = _CLIENTS.get(name)
+    if ent is not None and ent[0] == key:
+      return ent[1]
+    # A replaced client is not closed here: requests in flight may still hold
+    # it, and its pool is released once the last reference goes away.
+    with phase("client"):
+      client = build()
+    _CLIENTS[name] = (key, client)
+  return client
+
+
+def get_async_client(name: str):
+  key_fn, build = _ASYNC_FACTORIES[name]
+  key = (*key_fn(get_settings()), id(asyncio.get_running_loop()))
+  ent = _ASYNC_CLIENTS.get(name)
+  if ent is not None and ent[0] == key:
+    return ent[1]
+  with _LOCK:
+    ent = _ASYNC_CLIENTS.get(name)
+    if ent is not None and ent[0] == key:
+      return ent[1]
+    with phase("client"):
+      client = build()
+    _ASYNC_CLIENTS[name] = (key, client)
+  return client
+
+
+def get_notion_client():
+  return get_client("notion")
+
+
+def get_google_client():
+  return get_client("google")
+
+
+def get_supabase_client():
+  return get_client("supabase")
+
+
+def get_async_notion_client():
+  return get_async_client("notion")
+
+
+def get_async_google_client():
+  return get_async_client("google")
+
+
+def warm_up_clients(names: Iterable[str] | None = None) -> list[str]:
+  # Build every configured client (and mint Google credentials) up front so
+  # the first execute only pays for the provider round trip. `names` limits
+  # this to the given providers.
+  warmed: list[str] = []
+  settings = get_settings()
+  for name, (key_fn, _build) in _FACTORIES.items():
+    if names is not None and name not in names:
+      continue
+    if not all(key_fn(settings)):
+      continue
+    try:
+      get_client(name).warm_up()
+      warmed.append(name)
+    except Exception:  # noqa: BLE001
+      logger.exception("warm-up failed for %s client", name)
+  return warmed
+
+
+async def awarm_up_clients(names: Iterable[str] | None = None) -> list[str]:
+  warmed: list[str] = []
+  settings = get_settings()
+  for name, (key_fn, _build) in _ASYNC_FACTORIES.items():
+    if names is not None and name not in names:
+      continue
+    if not all(key_fn(settings)):
+      continue
+    try:
+      client = get_async_client(name)
+      if hasattr(client, "ensure_token"):
+        await client.ensure_token()
+      warmed.append(name)
+    except Exception:  # noqa: BLE001
+      logger.exception("warm-up failed for async %s client", name)
+  return warmed
+
+
+def close_clients() -> None:
+  with _LOCK:
+    items = list(_CLIENTS.items())
+    _CLIENTS.clear()
+  for name, (_key, client) in items:
+    _safe_close(name, client)
+
+
+async def aclose_clients() -> None:
+  with _LOCK:
+    items = list(_ASYNC_CLIENTS.items())
+    _ASYNC_CLIENTS.clear()
+  for name, (_key, client) in items:
+    try:
+      await client.aclose()
+    except Exception:  # noqa: BLE001
+      logger.warning("failed to close async %s client", name)
+
+
+def _safe_close(name: str, client) -> None:
+  try:
+    client.close()
+  except Exception:  # noqa: BLE001
+    logger.warning("failed to close %s client", name)
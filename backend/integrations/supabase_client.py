@@ -12,6 +12,12 @@ class SupabaseClient:
       raise RuntimeError("SUPABASE_URL / SUPABASE_SERVICE_KEY are not set")
     self._sb = create_client(settings.supabase_url, settings.supabase_service_key)
 
+  def warm_up(self) -> None:
+    return None
+
+  def close(self) -> None:
+    return None
+
   @property
   def client(self):
     return self._sb
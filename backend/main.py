@@ -1,15 +1,55 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 
 from backend.api.router import api_router
+from backend.core.config import get_settings
 from backend.core.logging import configure_logging
+from backend.core.state import close_state_backends
+from backend.integrations.notion_pages import page_index
+from backend.integrations.rate_limit import rate_limiter
+from backend.integrations.registry import aclose_clients, awarm_up_clients, close_clients, warm_up_clients
 from backend.middleware.error_handler import register_error_handlers
+from backend.middleware.profiler import register_profiler
 from backend.middleware.request_logger import register_request_logger
+from backend.services.audit_sink import audit_sink
+from backend.services.job_service import job_queue
+from backend.services.journal_service import journal
+from backend.services.log_service import log_writer
+from backend.tools.router import tool_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  # Tools load lazily; preloaded ones also get their provider clients built
+  # before traffic arrives
+  preloaded = await run_in_threadpool(tool_router.preload, get_settings().preload_tools)
+  providers = {tool_router.get(name).provider for name in preloaded}
+  await run_in_threadpool(warm_up_clients, providers)
+  await awarm_up_clients(providers)
+  await run_in_threadpool(job_queue.start)
+  audit_sink.start()
+  yield
+  await run_in_threadpool(job_queue.stop)
+  # Before clients close: the drain still needs the Supabase client
+  await run_in_threadpool(audit_sink.stop)
+  journal.close()
+  page_index.close()
+  await aclose_clients()
+  await run_in_threadpool(close_clients)
+  rate_limiter.close()
+  await run_in_threadpool(log_writer.stop)
+  close_state_backends()
 
 
 def create_app() -> FastAPI:
   configure_logging()
-  app = FastAPI(title="AI Agent Backend", version="0.1.0")
+  app = FastAPI(title="AI Agent Backend", version="0.1.0", lifespan=lifespan)
 
+  # The profiler sits inside the request logger, so its timings and samples
+  # cover the app rather than the logging
+  register_profiler(app)
   register_request_logger(app)
   register_error_handlers(app)
 
@@ -18,4 +58,3 @@ def create_app() -> FastAPI:
 
 
 app = create_app()
-
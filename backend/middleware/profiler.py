@@ -0,0 +1,98 @@
+import hmac
+import random
+import threading
+import time
+import uuid
+
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.core.config import Settings, get_settings
+from backend.core.profiler import Sampler
+from backend.core.timing import start_timings, stop_timings
+from backend.services.profile_service import Profile, profile_store
+
+
+def _trigger(scope: Scope, settings: Settings) -> str | None:
+  # X-Profile: 1 is honoured only with a valid API key; profile reads are
+  # never profiled themselves
+  path = scope["path"]
+  if not path.startswith("/api/") or path.startswith("/api/debug/"):
+    return None
+  if settings.api_key:
+    profile = key = None
+    for k, v in scope["headers"]:
+      if k == b"x-profile":
+        profile = v
+      elif k == b"x-api-key":
+        key = v
+    if profile == b"1" and key is not None and hmac.compare_digest(key, settings.api_key.encode()):
+      return "header"
+  if settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate:
+    return "sampled"
+  return None
+
+
+class ProfilerMiddleware:
+  # Pure ASGI. Collects the request's phase timings (services, tools and
+  # clients report into a contextvar) and sends them as Server-Timing; when
+  # triggered, also runs the sampling profiler over the request and returns
+  # the stored profile's id in X-Profile-Id.
+  def __init__(self, app: ASGIApp):
+    self.app = app
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    settings = get_settings()
+    trigger = _trigger(scope, settings)
+    if not settings.server_timing and trigger is None:
+      await self.app(scope, receive, send)
+      return
+
+    timings, token = start_timings()
+    sampler = profile_id = None
+    if trigger is not None:
+      profile_id = uuid.uuid4().hex
+      sampler = Sampler(settings.profile_interval_ms / 1000, threading.get_ident()).start()
+    status = 500
+    start = time.perf_counter()
+
+    async def _send(message: Message) -> None:
+      nonlocal status
+      if message["type"] == "http.response.start":
+        status = message["status"]
+        headers = list(message.get("headers", []))
+        if settings.server_timing:
+          headers.append((b"server-timing", timings.header(time.perf_counter() - start).encode()))
+        if profile_id is not None:
+          headers.append((b"x-profile-id", profile_id.encode()))
+        message["headers"] = headers
+      await send(message)
+
+    try:
+      await self.app(scope, receive, _send)
+    finally:
+      stop_timings(token)
+      if sampler is not None:
+        stacks = sampler.stop()
+        profile_store.add(
+          Profile(
+            id=profile_id,
+            ts=time.time(),
+            method=scope["method"],
+            path=scope["path"],
+            status=status,
+            trigger=trigger,
+            duration_ms=round((time.perf_counter() - start) * 1000, 3),
+            interval_ms=settings.profile_interval_ms,
+            samples=sampler.samples,
+            stacks=stacks,
+            timings=timings.items(),
+          )
+        )
+
+
+def register_profiler(app: FastAPI) -> None:
+  app.add_middleware(ProfilerMiddleware)
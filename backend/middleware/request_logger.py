@@ -1,23 +1,78 @@
+import re
 import time
 import uuid
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from backend.core.metrics import metrics
 from backend.services.log_service import add_log
 
 
-def register_request_logger(app: FastAPI) -> None:
-  @app.middleware("http")
-  async def _logger(request: Request, call_next):
-    rid = request.headers.get("x-request-id") or str(uuid.uuid4())
-    start = time.time()
-    response = await call_next(request)
-    elapsed_ms = int((time.time() - start) * 1000)
-    response.headers["x-request-id"] = rid
-    add_log(
-      "INFO",
-      "request",
-      {"method": request.method, "path": request.url.path, "status": response.status_code, "ms": elapsed_ms},
-    )
-    return response
+class RequestLoggerMiddleware:
+  # Pure ASGI (no BaseHTTPMiddleware task/stream wrapping): stamps
+  # x-request-id, records latency per route template and status, tracks
+  # in-flight requests and writes the request log line.
+  def __init__(self, app: ASGIApp):
+    self.app = app
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+
+    rid = None
+    for k, v in scope["headers"]:
+      if k == b"x-request-id":
+        rid = v
+        break
+    rid = rid or uuid.uuid4().hex.encode()
+    status = 500
+    start = time.perf_counter_ns()
+
+    async def _send(message: Message) -> None:
+      nonlocal status
+      if message["type"] == "http.response.start":
+        status = message["status"]
+        message["headers"] = [*message.get("headers", []), (b"x-request-id", rid)]
+      await send(message)
+
+    metrics.add_gauge("zelo_http_requests_in_flight", 1)
+    try:
+      await self.app(scope, receive, _send)
+    finally:
+      elapsed = (time.perf_counter_ns() - start) / 1e9
+      metrics.add_gauge("zelo_http_requests_in_flight", -1)
+      path = _route_template(scope)
+      method = scope["method"]
+      code = str(status)
+      metrics.inc("zelo_http_requests_total", route=path, method=method, status=code)
+      metrics.observe("zelo_http_request_duration_seconds", elapsed, route=path, method=method, status=code)
+      add_log(
+        "INFO",
+        "request",
+        {"method": method, "path": scope["path"], "status": status, "ms": round(elapsed * 1000, 3)},
+      )
+
 
+def _route_template(scope: Scope) -> str:
+  # Label by the matched route's template (e.g. /api/jobs/{job_id}) so label
+  # cardinality stays bounded; unmatched paths (404s) share one label.
+  route = scope.get("route")
+  if route is None or "endpoint" not in scope:
+    return "unmatched"
+  return _with_prefix(route, scope["path"])
+
+
+def _with_prefix(route, path: str) -> str:
+  # Newer FastAPI keeps included routes under their router, so route.path
+  # lacks the include prefix (/api); take it from the front of the path
+  # the route matched.
+  if route.path_regex.match(path):
+    return route.path
+  m = re.search(route.path_regex.pattern.removeprefix("^"), path)
+  return (path[: m.start()] if m else "") + route.path
+
+
+def register_request_logger(app: FastAPI) -> None:
+  app.add_middleware(RequestLoggerMiddleware)
@@ -22,47 +22,51 @@ class ExecuteResponse(BaseModel):
   ok: bool
   result: dict | None = None
   message: str | None = None
+  execution_id: str | None = None  # journal id, pass to /api/rollback
 
 
 class RollbackRequest(BaseModel):
-  execution_id: str
+  execution_id: str | None = None
+  execution_ids: list[str] = Field(default_factory=list)
 
+  def ids(self) -> list[str]:
+    ids = list(self.execution_ids)
+    if self.execution_id:
+      ids.insert(0, self.execution_id)
+    return list(dict.fromkeys(ids))
 
-class RollbackResponse(BaseModel):
+
+class RollbackItem(BaseModel):
+  execution_id: str
   ok: bool
   message: str
 
-from pydantic import BaseModel, Field
-
 
-class PreviewRequest(BaseModel):
-  tool: str = Field(..., examples=["notion_page", "calendar_event"])
-  payload: dict = Field(default_factory=dict)
+class RollbackResponse(BaseModel):
+  ok: bool
+  message: str
+  items: list[RollbackItem] = Field(default_factory=list)
 
 
-class PreviewResponse(BaseModel):
-  ok: bool = True
-  summary: str
-  actions: list[dict] = Field(default_factory=list)
+class BatchExecuteItem(ExecuteRequest):
+  idempotency_key: str | None = None
 
 
-class ExecuteRequest(BaseModel):
-  tool: str
-  payload: dict = Field(default_factory=dict)
-  dry_run: bool = False
+class BatchExecuteRequest(BaseModel):
+  items: list[BatchExecuteItem] = Field(..., min_length=1)
 
 
-class ExecuteResponse(BaseModel):
+class BatchItemResult(BaseModel):
+  index: int
   ok: bool
   result: dict | None = None
   message: str | None = None
+  execution_id: str | None = None
+  error: str | None = None
+  ms: float = 0.0
 
 
-class RollbackRequest(BaseModel):
-  execution_id: str
-
-
-class RollbackResponse(BaseModel):
+class BatchExecuteResponse(BaseModel):
   ok: bool
-  message: str
-
+  items: list[BatchItemResult]
+  stats: dict = Field(default_factory=dict)
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+
+
+class JobAccepted(BaseModel):
+  ok: bool = True
+  job_id: str
+  status: str
+  status_url: str
+
+
+class JobResponse(BaseModel):
+  id: str
+  status: str  # queued | running | succeeded | failed
+  tool: str
+  created_at: float
+  started_at: float | None = None
+  finished_at: float | None = None
+  result: dict | None = None
+  error: str | None = None
@@ -6,6 +6,7 @@ class ErrorResponse(BaseModel):
 
 
 class LogItem(BaseModel):
+  seq: int = 0
   ts: float
   level: str
   message: str
@@ -14,4 +15,19 @@ class LogItem(BaseModel):
 
 class LogsResponse(BaseModel):
   items: list[LogItem]
+  last_seq: int = 0  # pass back as ?after_seq= to fetch the next (oldest-first) page
 
+
+class ProfileSummary(BaseModel):
+  id: str
+  ts: float
+  method: str
+  path: str
+  status: int
+  trigger: str  # header | sampled
+  duration_ms: float
+  samples: int
+
+
+class ProfilesResponse(BaseModel):
+  items: list[ProfileSummary]
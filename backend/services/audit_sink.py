@@ -0,0 +1,237 @@
+import glob
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+
+from backend.core.config import get_settings
+from backend.core.metrics import metrics
+from backend.core.sqlite import db_path
+
+logger = logging.getLogger("app.audit")
+
+metrics.describe("zelo_audit_records_total", "Audit records by outcome (flushed/spilled/dropped/replayed/quarantined)")
+metrics.describe("zelo_audit_queue_depth", "Audit records waiting for the background flush")
+
+# Supabase table (create once in the SQL editor):
+#   create table zelo_audit (
+#     id bigserial primary key,
+#     ts double precision not null,
+#     level text not null,
+#     message text not null,
+#     context jsonb,
+#     worker text not null
+#   );
+#   create index on zelo_audit (ts);
+SPILL_PREFIX = "audit-spill"
+QUARANTINE_FILE = "audit-spill.bad"
+
+
+class AuditSink:
+  # Durable copy of add_log records in Supabase. add_log only does a
+  # put_nowait on a bounded queue; a daemon thread sends batches of
+  # AUDIT_BATCH_SIZE (or whatever arrived within AUDIT_FLUSH_SECONDS) as one
+  # insert. A full queue drops the record and counts it rather than slowing
+  # the request down. Batches Supabase does not take are appended to this
+  # worker's STATE_DIR/audit-spill.<pid>.ndjson (only the sink thread writes
+  # it) and re-sent after the next successful flush, together with spills
+  # left by workers that have exited. stop() drains the queue before the
+  # lifespan closes clients.
+  def __init__(self):
+    self._queue: queue.Queue | None = None
+    self._thread: threading.Thread | None = None
+    self._stop = threading.Event()
+    self._start_lock = threading.Lock()
+    self._worker = f"{socket.gethostname()}:{os.getpid()}"
+    self._failures = 0
+    self._retry_at = 0.0
+
+  def enabled(self) -> bool:
+    return get_settings().audit_sink == "supabase"
+
+  def start(self) -> None:
+    with self._start_lock:
+      if self._thread is not None or not self.enabled():
+        return
+      settings = get_settings()
+      self._queue = queue.Queue(maxsize=settings.audit_queue_size)
+      self._stop.clear()
+      self._failures, self._retry_at = 0, 0.0
+      self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+      self._thread.start()
+
+  def stop(self) -> None:
+    with self._start_lock:
+      thread, self._thread = self._thread, None
+    if thread is None:
+      return
+    self._stop.set()
+    thread.join(timeout=get_settings().audit_shutdown_seconds)
+    if thread.is_alive():
+      logger.warning("audit sink did not drain in time; %d records left", self._queue.qsize())
+
+  def submit(self, ts: float, level: str, message: str, context: dict | None) -> None:
+    q = self._queue
+    if q is None or self._thread is None:
+      return
+    try:
+      q.put_nowait({"ts": ts, "level": level, "message": message, "context": context, "worker": self._worker})
+    except queue.Full:
+      metrics.inc("zelo_audit_records_total", outcome="dropped")
+
+  def depth(self) -> int:
+    return self._queue.qsize() if self._queue is not None else 0
+
+  def _write(self, rows: list[dict]) -> None:
+    from backend.integrations.registry import get_supabase_client
+
+    rows = json.loads(json.dumps(rows, default=str))
+    get_supabase_client().client.table(get_settings().audit_table).insert(rows).execute()
+
+  def _run(self) -> None:
+    settings = get_settings()
+    size, interval = settings.audit_batch_size, settings.audit_flush_seconds
+    q = self._queue
+    while True:
+      batch = self._take(q, size, interval)
+      if batch:
+        try:
+          self._flush(batch)
+        except Exception:  # noqa: BLE001
+          logger.exception("audit flush failed")  # the thread must outlive any one batch
+      elif self._stop.is_set():
+        return
+
+  def _take(self, q: queue.Queue, size: int, interval: float) -> list[dict]:
+    # Up to `size` records, waiting at most `interval` after the first one.
+    # Once stopping, only what is already queued is taken.
+    batch: list[dict] = []
+    deadline = None
+    while len(batch) < size:
+      if self._stop.is_set():
+        timeout = 0.0
+      elif deadline is None:
+        timeout = 0.1  # re-check the stop flag while idle
+      else:
+        timeout = max(0.0, deadline - time.monotonic())
+      try:
+        batch.append(q.get(timeout=timeout) if timeout else q.get_nowait())
+      except queue.Empty:
+        if batch or self._stop.is_set():
+          return batch
+        continue
+      if deadline is None:
+        deadline = time.monotonic() + interval
+    return batch
+
+  def _flush(self, batch: list[dict]) -> None:
+    # After a failure Supabase is left alone for a while (doubling up to a
+    # minute) and batches go straight to the spill file, so an outage does
+    # not stall the queue on connect timeouts
+    if time.monotonic() < self._retry_at:
+      self._spill(batch)
+      return
+    try:
+      self._write(batch)
+    except Exception:  # noqa: BLE001
+      logger.warning("audit flush of %d records failed; spilling to disk", len(batch), exc_info=True)
+      self._failures += 1
+      self._retry_at = time.monotonic() + min(60.0, 2.0 ** (self._failures - 1))
+      self._spill(batch)
+      return
+    self._failures = 0
+    metrics.inc("zelo_audit_records_total", value=len(batch), outcome="flushed")
+    self._replay()
+
+  def _spill(self, rows: list[dict]) -> None:
+    data = "".join(json.dumps(r, default=str) + "\n" for r in rows)
+    try:
+      with open(spill_path(os.getpid()), "a", encoding="utf-8") as f:
+        f.write(data)
+    except OSError:
+      logger.exception("audit spill failed; dropping %d records", len(rows))
+      metrics.inc("zelo_audit_records_total", value=len(rows), outcome="dropped")
+      return
+    metrics.inc("zelo_audit_records_total", value=len(rows), outcome="spilled")
+
+  def _replay(self) -> None:
+    # Supabase is reachable again: send this worker's spill and any a dead
+    # worker left behind (spilled or half replayed). Each file is first
+    # renamed to <pid>.replay, so two workers never send the same one.
+    pid = os.getpid()
+    claimed = db_path(f"{SPILL_PREFIX}.{pid}.replay")
+    for path in _spill_files():
+      try:
+        owner = int(path.rsplit(".", 2)[1])
+      except ValueError:
+        continue
+      if owner != pid and _alive(owner):
+        continue
+      if path != claimed:
+        try:
+          os.replace(path, claimed)
+        except FileNotFoundError:
+          continue  # another worker took it
+      if not self._send(claimed):
+        return
+
+  def _send(self, claimed: str) -> bool:
+    rows, bad = [], []
+    with open(claimed, encoding="utf-8") as f:
+      for line in f:
+        if not line.strip():
+          continue
+        try:
+          rows.append(json.loads(line))
+        except ValueError:
+          bad.append(line if line.endswith("\n") else line + "\n")  # torn by a crash mid-write
+    if bad:
+      logger.warning("audit spill had %d unreadable lines; moved to %s", len(bad), QUARANTINE_FILE)
+      with open(db_path(QUARANTINE_FILE), "a", encoding="utf-8") as f:
+        f.write("".join(bad))
+      metrics.inc("zelo_audit_records_total", value=len(bad), outcome="quarantined")
+    size = get_settings().audit_batch_size
+    for i in range(0, len(rows), size):
+      try:
+        self._write(rows[i : i + size])
+      except Exception:  # noqa: BLE001
+        logger.warning("audit spill replay failed; keeping %d records", len(rows) - i, exc_info=True)
+        self._spill(rows[i:])
+        os.remove(claimed)
+        return False
+      metrics.inc("zelo_audit_records_total", value=len(rows[i : i + size]), outcome="replayed")
+    os.remove(claimed)
+    return True
+
+
+def spill_path(pid: int) -> str:
+  return db_path(f"{SPILL_PREFIX}.{pid}.ndjson")
+
+
+def _spill_files() -> list[str]:
+  # Half-finished replays first, so their records keep their order
+  prefix = db_path(SPILL_PREFIX)
+  return sorted(glob.glob(prefix + ".*.replay")) + sorted(glob.glob(prefix + ".*.ndjson"))
+
+
+def _alive(pid: int) -> bool:
+  try:
+    os.kill(pid, 0)
+  except ProcessLookupError:
+    return False
+  except PermissionError:
+    return True
+  return True
+
+
+audit_sink = AuditSink()
+
+
+def _collect():
+  yield "zelo_audit_queue_depth", "gauge", {}, audit_sink.depth()
+
+
+metrics.register_collector(_collect)
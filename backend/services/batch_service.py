@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+
+from fastapi import HTTPException
+
+from backend.core.config import get_settings
+from backend.core.idempotency import as_dict, idempotency_store
+from backend.schemas.execution import BatchExecuteItem, BatchItemResult
+from backend.services.execution_service import aexecute_action
+from backend.services.log_service import add_log
+
+
+class _Limits:
+  # One global semaphore plus one per tool, created per batch
+  def __init__(self):
+    settings = get_settings()
+    self.shared = asyncio.Semaphore(settings.batch_max_concurrency)
+    self._per_tool: dict[str, asyncio.Semaphore] = {}
+    self._default = settings.batch_per_tool_concurrency
+    self._overrides = settings.batch_tool_concurrency
+
+  def tool(self, name: str) -> asyncio.Semaphore:
+    sem = self._per_tool.get(name)
+    if sem is None:
+      sem = self._per_tool[name] = asyncio.Semaphore(self._overrides.get(name, self._default))
+    return sem
+
+
+async def _run_item(index: int, item: BatchExecuteItem, limits: _Limits) -> BatchItemResult:
+  # Take the per-tool slot first so a saturated tool does not hog global slots
+  async with limits.tool(item.tool), limits.shared:
+    start = time.perf_counter()
+    try:
+      if item.idempotency_key:
+        async def _run() -> dict:
+          return (await aexecute_action(item)).model_dump()
+
+        res = as_dict(await idempotency_store.arun(item.idempotency_key, _run))
+      else:
+        res = (await aexecute_action(item)).model_dump()
+      return BatchItemResult(
+        index=index,
+        ok=res["ok"],
+        result=res.get("result"),
+        message=res.get("message"),
+        execution_id=res.get("execution_id"),
+        ms=_ms(start),
+      )
+    except HTTPException as e:
+      return BatchItemResult(index=index, ok=False, error=str(e.detail), ms=_ms(start))
+    except Exception as e:  # noqa: BLE001
+      return BatchItemResult(index=index, ok=False, error=f"{type(e).__name__}: {e}", ms=_ms(start))
+
+
+def _ms(start: float) -> float:
+  return round((time.perf_counter() - start) * 1000, 3)
+
+
+def check_batch_size(items: list[BatchExecuteItem]) -> None:
+  max_items = get_settings().batch_max_items
+  if len(items) > max_items:
+    raise HTTPException(status_code=413, detail=f"batch exceeds {max_items} items")
+
+
+async def iter_batch(items: list[BatchExecuteItem]) -> AsyncIterator[BatchItemResult]:
+  # Yields per-item results in completion order; logs batch timing at the end
+  limits = _Limits()
+  start = time.perf_counter()
+  add_log("INFO", "batch requested", {"items": len(items)})
+  tasks = [asyncio.create_task(_run_item(i, item, limits)) for i, item in enumerate(items)]
+  done: list[BatchItemResult] = []
+  try:
+    for fut in asyncio.as_completed(tasks):
+      res = await fut
+      done.append(res)
+      yield res
+  finally:
+    for t in tasks:
+      t.cancel()
+    add_log("INFO", "batch completed", batch_stats(done, start))
+
+
+def batch_stats(results: list[BatchItemResult], start: float) -> dict:
+  lat = sorted(r.ms for r in results)
+  total_ms = _ms(start)
+  return {
+    "items": len(results),
+    "ok": sum(1 for r in results if r.ok),
+    "failed": sum(1 for r in results if not r.ok),
+    "ms": total_ms,
+    "p50_ms": lat[len(lat) // 2] if lat else 0.0,
+    "max_ms": lat[-1] if lat else 0.0,
+    "items_per_sec": round(len(results) / (total_ms / 1000), 2) if total_ms else 0.0,
+  }
+
+
+async def run_batch(items: list[BatchExecuteItem]) -> tuple[list[BatchItemResult], dict]:
+  start = time.perf_counter()
+  results = [r async for r in iter_batch(items)]
+  results.sort(key=lambda r: r.index)
+  return results, batch_stats(results, start)
@@ -1,18 +1,59 @@
+import asyncio
+import logging
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import get_settings
+from backend.core.metrics import metrics
+from backend.core.timing import phase
 from backend.schemas.execution import (
   ExecuteRequest,
   ExecuteResponse,
   PreviewRequest,
   PreviewResponse,
+  RollbackItem,
   RollbackRequest,
   RollbackResponse,
 )
+from backend.services.journal_service import journal
 from backend.services.log_service import add_log
+from backend.services.preview_cache import preview_cache, preview_key
+from backend.tools.base import Progress
 from backend.tools.router import tool_router
 
+logger = logging.getLogger("app.execution")
+
+metrics.describe("zelo_journal_failures_total", "Executes that succeeded but could not be journaled, by tool")
+
+
+def _preview(tool, name: str, payload: dict) -> tuple[str, list[dict]]:
+  with phase("preview"):
+    if not tool.cacheable_preview:
+      return tool.preview(payload)
+    key = preview_key(name, payload)
+    cached = preview_cache.get(name, key)
+    if cached is None:
+      cached = tool.preview(payload)
+      preview_cache.put(key, *cached)
+    return cached
+
+
+async def _apreview(tool, name: str, payload: dict) -> tuple[str, list[dict]]:
+  with phase("preview"):
+    if not tool.cacheable_preview:
+      return await tool.apreview(payload)
+    key = preview_key(name, payload)
+    cached = preview_cache.get(name, key)
+    if cached is None:
+      cached = await tool.apreview(payload)
+      preview_cache.put(key, *cached)
+    return cached
+
 
 def build_preview(req: PreviewRequest) -> PreviewResponse:
   tool = tool_router.get(req.tool)
-  summary, actions = tool.preview(req.payload)
+  summary, actions = _preview(tool, req.tool, req.payload)
   return PreviewResponse(summary=summary, actions=actions)
 
 
@@ -20,15 +61,92 @@ def execute_action(req: ExecuteRequest) -> ExecuteResponse:
   tool = tool_router.get(req.tool)
   add_log("INFO", "execute requested", {"tool": req.tool, "dry_run": req.dry_run})
   if req.dry_run:
-    summary, actions = tool.preview(req.payload)
+    summary, actions = _preview(tool, req.tool, req.payload)
     return ExecuteResponse(ok=True, result={"preview": {"summary": summary, "actions": actions}})
-  result = tool.execute(req.payload)
-  add_log("INFO", "execute completed", {"tool": req.tool})
-  return ExecuteResponse(ok=True, result=result)
+  with phase("tool"), metrics.timer("zelo_tool_execute_duration_seconds", tool=req.tool, provider=tool.provider):
+    result = tool.execute(req.payload)
+  with phase("journal"):
+    execution_id = _journal(tool, req, result)
+  add_log("INFO", "execute completed", {"tool": req.tool, "execution_id": execution_id})
+  with phase("validate"):
+    return ExecuteResponse(ok=True, result=result, execution_id=execution_id)
+
+
+async def abuild_preview(req: PreviewRequest) -> PreviewResponse:
+  tool = tool_router.get(req.tool)
+  summary, actions = await _apreview(tool, req.tool, req.payload)
+  return PreviewResponse(summary=summary, actions=actions)
+
+
+async def aexecute_action(req: ExecuteRequest, progress: Progress | None = None) -> ExecuteResponse:
+  # `progress` (streaming executes) receives the tool's intermediate events
+  tool = tool_router.get(req.tool)
+  add_log("INFO", "execute requested", {"tool": req.tool, "dry_run": req.dry_run})
+  if req.dry_run:
+    summary, actions = await _apreview(tool, req.tool, req.payload)
+    return ExecuteResponse(ok=True, result={"preview": {"summary": summary, "actions": actions}})
+  with phase("tool"), metrics.timer("zelo_tool_execute_duration_seconds", tool=req.tool, provider=tool.provider):
+    if progress is None:
+      result = await tool.aexecute(req.payload)
+    else:
+      result = await tool.aexecute_with_progress(req.payload, progress)
+  with phase("journal"):
+    execution_id = await run_in_threadpool(_journal, tool, req, result)
+  add_log("INFO", "execute completed", {"tool": req.tool, "execution_id": execution_id})
+  with phase("validate"):
+    return ExecuteResponse(ok=True, result=result, execution_id=execution_id)
+
+
+def _journal(tool, req: ExecuteRequest, result: dict) -> str | None:
+  # Every real execute gets a journal entry; the compensation (if any) is
+  # what /rollback replays later. The provider object already exists, so a
+  # journal failure is logged and the execute still succeeds (without an
+  # execution_id) rather than inviting a retry that creates it twice.
+  try:
+    return journal.append(req.tool, tool.provider, result.get("id"), tool.compensation(req.payload, result))
+  except Exception:  # noqa: BLE001
+    logger.exception("journal append failed for %s", req.tool)
+    metrics.inc("zelo_journal_failures_total", tool=req.tool)
+    return None
+
 
+async def _rollback_one(execution_id: str, sem: asyncio.Semaphore) -> RollbackItem:
+  entry = await run_in_threadpool(journal.get, execution_id)
+  if entry is None:
+    return RollbackItem(execution_id=execution_id, ok=False, message="unknown execution id")
+  if entry.status == "rolled_back":
+    return RollbackItem(execution_id=execution_id, ok=True, message="already rolled back")
+  if entry.compensation is None:
+    return RollbackItem(execution_id=execution_id, ok=False, message=f"{entry.tool} has nothing to roll back")
+  tool = tool_router.get(entry.tool)
+  try:
+    # Provider pacing, retries and circuit breaking apply inside the clients
+    async with sem:
+      await tool.acompensate(entry.compensation)
+  except Exception as e:  # noqa: BLE001
+    await run_in_threadpool(journal.mark, execution_id, "rollback_failed", str(e))
+    add_log("ERROR", "rollback failed", {"execution_id": execution_id, "tool": entry.tool, "error": str(e)})
+    return RollbackItem(execution_id=execution_id, ok=False, message=str(e))
+  await run_in_threadpool(journal.mark, execution_id, "rolled_back")
+  return RollbackItem(execution_id=execution_id, ok=True, message=entry.compensation["action"])
 
-def rollback_action(req: RollbackRequest) -> RollbackResponse:
-  # Minimal placeholder: in real implementation, map execution_id -> compensating action
-  add_log("WARN", "rollback requested", {"execution_id": req.execution_id})
-  return RollbackResponse(ok=True, message=f"rollback queued for {req.execution_id}")
 
+async def arollback_action(req: RollbackRequest) -> RollbackResponse:
+  ids = req.ids()
+  settings = get_settings()
+  if not ids:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="execution_id or execution_ids required")
+  if len(ids) > settings.max_rollback_ids:
+    raise HTTPException(
+      status_code=413,
+      detail=f"at most {settings.max_rollback_ids} ids per rollback",
+    )
+  add_log("WARN", "rollback requested", {"count": len(ids)})
+  sem = asyncio.Semaphore(max(1, settings.rollback_concurrency))
+  items = await asyncio.gather(*(_rollback_one(i, sem) for i in ids))
+  failed = sum(not item.ok for item in items)
+  return RollbackResponse(
+    ok=failed == 0,
+    message=f"rolled back {len(items) - failed}/{len(items)}",
+    items=list(items),
+  )
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import get_settings
+from backend.core.idempotency import CachedResponse, idempotency_store
+from backend.core.sqlite import connect
+from backend.schemas.execution import ExecuteRequest
+from backend.schemas.job import JobResponse
+from backend.services.execution_service import aexecute_action
+from backend.services.log_service import add_log
+
+logger = logging.getLogger("app.jobs")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+  id TEXT PRIMARY KEY,
+  status TEXT NOT NULL,
+  tool TEXT NOT NULL,
+  request TEXT NOT NULL,
+  idem_key TEXT UNIQUE,
+  result TEXT,
+  error TEXT,
+  created_at REAL NOT NULL,
+  started_at REAL,
+  finished_at REAL,
+  owner TEXT,
+  lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+"""
+# Columns added after the first release; older jobs.db files get them on open
+_MIGRATIONS = {"owner": "ALTER TABLE jobs ADD COLUMN owner TEXT", "lease_until": "ALTER TABLE jobs ADD COLUMN lease_until REAL"}
+
+_DONE = {"succeeded", "failed"}
+
+
+class JobQueue:
+  # Jobs are persisted in SQLite and executed by N asyncio workers on a
+  # dedicated event-loop thread, so they outlive the request that queued them
+  # (and, via the table, a restart). Long-poll waiters park on futures that
+  # the worker loop resolves thread-safely.
+  #
+  # Every uvicorn worker shares jobs.db, so a job runs only after its queue
+  # claims it with a conditional UPDATE (queued -> running). The claim holds
+  # a lease the owner keeps renewing; running jobs whose lease lapsed (their
+  # worker died) go back to queued, live workers' jobs are left alone.
+  def __init__(self):
+    self._db = None
+    self._db_lock = threading.Lock()
+    self._loop: asyncio.AbstractEventLoop | None = None
+    self._queue: asyncio.Queue | None = None
+    self._thread: threading.Thread | None = None
+    self._start_lock = threading.Lock()
+    self._waiters: dict[str, list] = {}
+    self._waiters_lock = threading.Lock()
+    self._owner = ""
+
+  def _conn(self):
+    if self._db is None:
+      self._db = connect("jobs.db")
+      self._db.executescript(_SCHEMA)
+      columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+      for column, ddl in _MIGRATIONS.items():
+        if column not in columns:
+          self._db.execute(ddl)
+    return self._db
+
+  def _exec(self, sql: str, args: tuple = ()) -> list[tuple]:
+    with self._db_lock:
+      return self._conn().execute(sql, args).fetchall()
+
+  def _update(self, sql: str, args: tuple = ()) -> int:
+    with self._db_lock:
+      return self._conn().execute(sql, args).rowcount
+
+  def start(self) -> None:
+    with self._start_lock:
+      if self._thread is not None:
+        return
+      self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+      ready = threading.Event()
+      self._thread = threading.Thread(target=self._run_loop, args=(ready,), name="job-workers", daemon=True)
+      self._thread.start()
+      ready.wait()
+    self._recover()
+
+  def _run_loop(self, ready: threading.Event) -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    self._loop = loop
+    self._queue = asyncio.Queue()
+    workers = [loop.create_task(self._worker()) for _ in range(get_settings().job_workers)]
+    workers.append(loop.create_task(self._heartbeat()))
+    ready.set()
+    try:
+      loop.run_forever()
+    finally:
+      for w in workers:
+        w.cancel()
+      loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+      loop.close()
+
+  def stop(self) -> None:
+    # Queued jobs stay in the table; jobs this queue was running are handed
+    # back so another worker (or the next start) runs them again
+    with self._start_lock:
+      thread, loop = self._thread, self._loop
+      self._thread = None
+      self._loop = None
+    if thread is not None and loop is not None:
+      loop.call_soon_threadsafe(loop.stop)
+      thread.join(timeout=5)
+      self._update(
+        "UPDATE jobs SET status = 'queued', owner = NULL, lease_until = NULL WHERE status = 'running' AND owner = ?",
+        (self._owner,),
+      )
+    with self._db_lock:
+      if self._db is not None:
+        self._db.close()
+        self._db = None
+
+  def _recover(self) -> None:
+    # Queued jobs and those whose worker died mid-flight run again. Every
+    # queue may enqueue the same queued id; only one claim succeeds.
+    cutoff = time.time() - get_settings().job_retention_seconds
+    self._exec("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+    reclaimed = self._reclaim_stale()
+    rows = self._exec("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at")
+    for (job_id,) in rows:
+      self._enqueue(job_id)
+    if rows:
+      add_log("INFO", "jobs recovered", {"count": len(rows), "reclaimed": reclaimed})
+
+  def _reclaim_stale(self) -> int:
+    return self._update(
+      "UPDATE jobs SET status = 'queued', owner = NULL, lease_until = NULL WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+      (time.time(),),
+    )
+
+  def _claim(self, job_id: str) -> bool:
+    lease = get_settings().job_lease_seconds
+    now = time.time()
+    return (
+      self._update(
+        "UPDATE jobs SET status = 'running', started_at = ?, owner = ?, lease_until = ? WHERE id = ? AND status = 'queued'",
+        (now, self._owner, now + lease, job_id),
+      )
+      == 1
+    )
+
+  async def _heartbeat(self) -> None:
+    # Renews this queue's leases and picks up jobs orphaned by dead workers
+    lease = get_settings().job_lease_seconds
+    while True:
+      await asyncio.sleep(lease / 3)
+      try:
+        self._update(
+          "UPDATE jobs SET lease_until = ? WHERE status = 'running' AND owner = ?",
+          (time.time() + lease, self._owner),
+        )
+        if self._reclaim_stale():
+          for (job_id,) in self._exec("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"):
+            self._queue.put_nowait(job_id)
+      except Exception:  # noqa: BLE001
+        logger.exception("job lease renewal failed")
+
+  def _enqueue(self, job_id: str) -> None:
+    self._loop.call_soon_threadsafe(self._queue.put_nowait, job_id)
+
+  def submit(self, req: ExecuteRequest, idem_key: str | None = None) -> str:
+    # Blocking (SQLite); call it from a thread. With an idempotency key the
+    # insert yields to whichever worker stored the key first.
+    self.start()
+    job_id = uuid.uuid4().hex
+    inserted = self._update(
+      "INSERT INTO jobs (id, status, tool, request, idem_key, created_at) VALUES (?, 'queued', ?, ?, ?, ?) "
+      "ON CONFLICT(idem_key) DO NOTHING",
+      (job_id, req.tool, req.model_dump_json(), idem_key, time.time()),
+    )
+    if not inserted:
+      return self._exec("SELECT id FROM jobs WHERE idem_key = ?", (idem_key,))[0][0]
+    self._enqueue(job_id)
+    add_log("INFO", "job queued", {"job_id": job_id, "tool": req.tool})
+    return job_id
+
+  async def _worker(self) -> None:
+    while True:
+      job_id = await self._queue.get()
+      try:
+        await self._process(job_id)
+      except Exception:  # noqa: BLE001
+        logger.exception("job %s crashed", job_id)
+
+  async def _process(self, job_id: str) -> None:
+    # Another worker may have claimed (or finished) it already
+    if not self._claim(job_id):
+      return
+    rows = self._exec("SELECT request, idem_key FROM jobs WHERE id = ?", (job_id,))
+    req = ExecuteRequest.model_validate_json(rows[0][0])
+    idem_key = rows[0][1]
+
+    async def _run() -> dict:
+      return (await aexecute_action(req)).model_dump()
+
+    try:
+      result = await (idempotency_store.arun(idem_key, _run) if idem_key else _run())
+      # A value stored by /execute is already encoded
+      encoded = result.body.decode() if isinstance(result, CachedResponse) else json.dumps(result)
+      self._exec(
+        "UPDATE jobs SET status = 'succeeded', result = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+        (encoded, time.time(), job_id),
+      )
+    except Exception as e:  # noqa: BLE001
+      detail = e.detail if isinstance(e, HTTPException) else f"{type(e).__name__}: {e}"
+      self._exec(
+        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+        (str(detail), time.time(), job_id),
+      )
+      add_log("ERROR", "job failed", {"job_id": job_id, "tool": req.tool, "error": str(detail)})
+    self._notify(job_id)
+
+  def _notify(self, job_id: str) -> None:
+    with self._waiters_lock:
+      waiters = self._waiters.pop(job_id, [])
+    for loop, fut in waiters:
+      loop.call_soon_threadsafe(_resolve, fut)
+
+  def get(self, job_id: str) -> JobResponse:
+    rows = self._exec(
+      "SELECT id, status, tool, created_at, started_at, finished_at, result, error FROM jobs WHERE id = ?",
+      (job_id,),
+    )
+    if not rows:
+      raise HTTPException(status_code=404, detail=f"unknown job: {job_id}")
+    r = rows[0]
+    return JobResponse(
+      id=r[0],
+      status=r[1],
+      tool=r[2],
+      created_at=r[3],
+      started_at=r[4],
+      finished_at=r[5],
+      result=json.loads(r[6]) if r[6] else None,
+      error=r[7],
+    )
+
+  async def wait(self, job_id: str, timeout: float) -> JobResponse:
+    # Long-poll: register interest before re-reading to avoid a lost wake-up
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    with self._waiters_lock:
+      self._waiters.setdefault(job_id, []).append((loop, fut))
+    try:
+      deadline = time.monotonic() + timeout
+      poll = get_settings().job_poll_seconds
+      while True:
+        job = await run_in_threadpool(self.get, job_id)
+        left = deadline - time.monotonic()
+        if job.status in _DONE or left <= 0:
+          return job
+        # Woken at once when this process finishes the job; otherwise
+        # re-read, as another worker process may be running it
+        if fut.done():
+          await asyncio.sleep(min(poll, left))
+          continue
+        try:
+          await asyncio.wait_for(asyncio.shield(fut), min(poll, left))
+        except asyncio.TimeoutError:
+          pass
+    finally:
+      with self._waiters_lock:
+        pending = self._waiters.get(job_id)
+        if pending and (loop, fut) in pending:
+          pending.remove((loop, fut))
+          if not pending:
+            self._waiters.pop(job_id, None)
+
+
+def _resolve(fut: asyncio.Future) -> None:
+  if not fut.done():
+    fut.set_result(None)
+
+
+job_queue = JobQueue()
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from backend.core.sqlite import connect
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+  id TEXT PRIMARY KEY,
+  ts REAL NOT NULL,
+  tool TEXT NOT NULL,
+  provider TEXT NOT NULL,
+  object_id TEXT,
+  compensation TEXT,
+  status TEXT NOT NULL DEFAULT 'done',
+  rolled_back_at REAL,
+  error TEXT
+);
+CREATE INDEX IF NOT EXISTS executions_ts ON executions(ts);
+"""
+
+
+@dataclass
+class JournalEntry:
+  id: str
+  ts: float
+  tool: str
+  provider: str
+  object_id: str | None
+  compensation: dict | None
+  status: str  # done | rolled_back | rollback_failed
+
+
+class ExecutionJournal:
+  # Durable record of what execute created, in SQLite WAL under STATE_DIR.
+  # The execution id is the primary key, so rollback lookups are a single
+  # index probe.
+  def __init__(self):
+    self._db = None
+    self._lock = threading.Lock()
+
+  def _conn(self):
+    if self._db is None:
+      self._db = connect("journal.db")
+      self._db.executescript(_SCHEMA)
+    return self._db
+
+  def append(self, tool: str, provider: str, object_id: str | None, compensation: dict | None) -> str:
+    execution_id = uuid.uuid4().hex
+    with self._lock:
+      self._conn().execute(
+        "INSERT INTO executions (id, ts, tool, provider, object_id, compensation) VALUES (?, ?, ?, ?, ?, ?)",
+        (execution_id, time.time(), tool, provider, object_id, json.dumps(compensation) if compensation else None),
+      )
+    return execution_id
+
+  def get(self, execution_id: str) -> JournalEntry | None:
+    with self._lock:
+      row = self._conn().execute(
+        "SELECT id, ts, tool, provider, object_id, compensation, status FROM executions WHERE id = ?",
+        (execution_id,),
+      ).fetchone()
+    if row is None:
+      return None
+    return JournalEntry(
+      id=row[0],
+      ts=row[1],
+      tool=row[2],
+      provider=row[3],
+      object_id=row[4],
+      compensation=json.loads(row[5]) if row[5] else None,
+      status=row[6],
+    )
+
+  def mark(self, execution_id: str, status: str, error: str | None = None) -> None:
+    with self._lock:
+      self._conn().execute(
+        "UPDATE executions SET status = ?, rolled_back_at = ?, error = ? WHERE id = ?",
+        (status, time.time(), error, execution_id),
+      )
+
+  def close(self) -> None:
+    with self._lock:
+      if self._db is not None:
+        self._db.close()
+        self._db = None
+
+
+journal = ExecutionJournal()
@@ -1,17 +1,204 @@
+import json
+import logging
+import queue
+import threading
 import time
 
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import get_settings
+from backend.core.metrics import metrics
+from backend.core.state import LogRecord, StateBackend, get_state_backend
 from backend.schemas.response import LogItem
+from backend.services.audit_sink import audit_sink
+
+logger = logging.getLogger("app.logs")
+
+metrics.describe("zelo_log_records_total", "Log records added by this worker")
+metrics.describe("zelo_log_write_failures_total", "Log records a shared state backend did not take, by reason")
+
+LOG_QUEUE_SIZE = 10_000
+
+
+def _collect():
+  yield "zelo_log_capacity", "gauge", {}, get_settings().log_capacity
+
+
+metrics.register_collector(_collect)
+
+
+class LogWriter:
+  # Appends to a shared state backend (an SQLite write or a Supabase insert)
+  # are handed to a daemon thread, so add_log never blocks the event loop
+  # and a backend outage never fails the request that logged. A full queue
+  # drops the record and counts it.
+  def __init__(self):
+    self._queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    self._thread: threading.Thread | None = None
+    self._lock = threading.Lock()
+    self._idle = threading.Condition()
+    self._pending = 0
+
+  def submit(self, backend: StateBackend, record: tuple) -> None:
+    self._ensure_thread()
+    with self._idle:
+      self._pending += 1
+    try:
+      self._queue.put_nowait((backend, record))
+    except queue.Full:
+      self._done()
+      metrics.inc("zelo_log_write_failures_total", reason="dropped")
+
+  def _ensure_thread(self) -> None:
+    if self._thread is not None:
+      return
+    with self._lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+  def _run(self) -> None:
+    while True:
+      item = self._queue.get()
+      if item is None:
+        return
+      backend, (ts, level, message, context) = item
+      try:
+        backend.append_log(ts, level, message, context, get_settings().log_capacity)
+      except Exception:  # noqa: BLE001
+        logger.warning("log append to %s failed", backend.name, exc_info=True)
+        metrics.inc("zelo_log_write_failures_total", reason="error")
+      finally:
+        self._done()
+
+  def _done(self) -> None:
+    with self._idle:
+      self._pending -= 1
+      if self._pending == 0:
+        self._idle.notify_all()
 
-_LOGS: list[LogItem] = []
+  def flush(self, timeout: float = 5.0) -> bool:
+    # Waits until everything submitted so far has been written
+    with self._idle:
+      return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+  def stop(self, timeout: float = 5.0) -> None:
+    with self._lock:
+      thread, self._thread = self._thread, None
+    if thread is None:
+      return
+    self.flush(timeout)
+    self._queue.put(None)
+    thread.join(timeout)
+
+
+log_writer = LogWriter()
 
 
 def add_log(level: str, message: str, context: dict | None = None) -> None:
-  _LOGS.append(LogItem(ts=time.time(), level=level.upper(), message=message, context=context))
-  # keep last 500
-  if len(_LOGS) > 500:
-    del _LOGS[: len(_LOGS) - 500]
+  # With a shared state backend every worker appends to (and reads from) the
+  # same log, so /api/logs is not limited to one worker's slice. Logging
+  # never raises into the caller.
+  ts, level = time.time(), level.upper()
+  metrics.inc("zelo_log_records_total")
+  audit_sink.submit(ts, level, message, context)
+  try:
+    backend = get_state_backend()
+    if backend.shared:
+      log_writer.submit(backend, (ts, level, message, context))
+    else:
+      backend.append_log(ts, level, message, context, get_settings().log_capacity)
+  except Exception:  # noqa: BLE001
+    logger.warning("add_log failed", exc_info=True)
+    metrics.inc("zelo_log_write_failures_total", reason="error")
+
+
+def _to_item(rec: LogRecord) -> LogItem:
+  return LogItem(seq=rec[0], ts=rec[1], level=rec[2], message=rec[3], context=rec[4])
+
+
+def _matches(rec: LogRecord, level: str | None, message: str | None, tool: str | None, until_ts: float | None) -> bool:
+  if level is not None and rec[2] != level:
+    return False
+  if message is not None and message not in rec[3]:
+    return False
+  if tool is not None and (rec[4] or {}).get("tool") != tool:
+    return False
+  if until_ts is not None and rec[1] > until_ts:
+    return False
+  return True
+
+
+def list_logs(
+  level: str | None = None,
+  message: str | None = None,
+  tool: str | None = None,
+  since_ts: float | None = None,
+  until_ts: float | None = None,
+  after_seq: int | None = None,
+  limit: int | None = None,
+) -> list[LogItem]:
+  return page_logs(level, message, tool, since_ts, until_ts, after_seq, limit)[0]
+
+
+def page_logs(
+  level: str | None = None,
+  message: str | None = None,
+  tool: str | None = None,
+  since_ts: float | None = None,
+  until_ts: float | None = None,
+  after_seq: int | None = None,
+  limit: int | None = None,
+) -> tuple[list[LogItem], int]:
+  # Without a cursor: newest first, like the original list-backed store,
+  # and the newest seq to poll from. With after_seq: oldest first from the
+  # cursor, and the last seq returned to pass back as the next cursor.
+  level = level.upper() if level else None
+  backend = get_state_backend()
+  items: list[LogItem] = []
+  if after_seq is None:
+    cursor = backend.last_log_seq()
+    records = backend.logs(0, since_ts, get_settings().log_capacity)
+    for rec in reversed(records):
+      if _matches(rec, level, message, tool, until_ts):
+        items.append(_to_item(rec))
+        if limit is not None and len(items) >= limit:
+          break
+    return items, cursor
+  for rec in backend.logs(after_seq, since_ts, get_settings().log_capacity):
+    if _matches(rec, level, message, tool, until_ts):
+      items.append(_to_item(rec))
+      if limit is not None and len(items) >= limit:
+        break
+  return items, items[-1].seq if items else after_seq
+
+
+def last_seq() -> int:
+  return get_state_backend().last_log_seq()
+
 
+def store_stats() -> dict:
+  # Rough footprint of the retained records (message + context payload bytes)
+  capacity = get_settings().log_capacity
+  recs = get_state_backend().logs(capacity=capacity)
+  size = sum(len(r[3]) + (len(json.dumps(r[4], default=str)) if r[4] else 0) for r in recs)
+  return {"records": len(recs), "capacity": capacity, "payload_bytes": size}
 
-def list_logs() -> list[LogItem]:
-  return list(reversed(_LOGS))
 
+async def tail_logs(
+  after_seq: int,
+  level: str | None = None,
+  tool: str | None = None,
+  timeout: float = 15.0,
+) -> tuple[list[LogItem], int]:
+  # Oldest-first records newer than after_seq (waiting up to `timeout` for
+  # some), plus the cursor to pass on the next call.
+  backend = get_state_backend()
+  await backend.wait_logs(after_seq, timeout)
+  level = level.upper() if level else None
+  if backend.shared:
+    recs = await run_in_threadpool(backend.logs, after_seq, None, get_settings().log_capacity)
+  else:
+    recs = backend.logs(after_seq)
+  cursor = recs[-1][0] if recs else after_seq
+  return [_to_item(rec) for rec in recs if _matches(rec, level, None, tool, None)], cursor
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+
+from backend.core.config import get_settings
+from backend.core.metrics import metrics
+from backend.utils.hash import canonical_hash
+
+metrics.describe("zelo_preview_cache_total", "Preview cache lookups by tool and outcome (hit/miss)")
+metrics.describe("zelo_preview_cache_entries", "Previews currently cached")
+
+
+def preview_key(tool: str, payload: dict) -> str:
+  return f"{tool}:{canonical_hash(payload)}"
+
+
+class PreviewCache:
+  # Bounded LRU with a per-entry TTL. Previews are small and cheap to
+  # rebuild, so expired entries are simply dropped on lookup and the LRU
+  # cap bounds memory.
+  def __init__(self):
+    self._entries: OrderedDict[str, tuple[float, str, list[dict]]] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, tool: str, key: str) -> tuple[str, list[dict]] | None:
+    now = time.monotonic()
+    with self._lock:
+      ent = self._entries.get(key)
+      if ent is not None and ent[0] <= now:
+        del self._entries[key]
+        ent = None
+      if ent is not None:
+        self._entries.move_to_end(key)
+    metrics.inc("zelo_preview_cache_total", tool=tool, outcome="miss" if ent is None else "hit")
+    return None if ent is None else (ent[1], ent[2])
+
+  def put(self, key: str, summary: str, actions: list[dict]) -> None:
+    settings = get_settings()
+    if settings.preview_cache_max_entries <= 0:
+      return
+    expires_at = time.monotonic() + settings.preview_cache_ttl_seconds
+    with self._lock:
+      self._entries[key] = (expires_at, summary, actions)
+      self._entries.move_to_end(key)
+      while len(self._entries) > settings.preview_cache_max_entries:
+        self._entries.popitem(last=False)
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+
+
+preview_cache = PreviewCache()
+
+
+def _collect():
+  yield "zelo_preview_cache_entries", "gauge", {}, len(preview_cache)
+
+
+metrics.register_collector(_collect)
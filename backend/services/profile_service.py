@@ -0,0 +1,70 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from backend.core.config import get_settings
+from backend.core.metrics import metrics
+
+metrics.describe("zelo_profiles_captured_total", "Requests profiled, by trigger (header or sampled)")
+
+
+@dataclass
+class Profile:
+  id: str
+  ts: float
+  method: str
+  path: str
+  status: int
+  trigger: str  # header | sampled
+  duration_ms: float
+  interval_ms: float
+  samples: int
+  stacks: dict[str, int]  # folded stack -> sample count
+  timings: list[tuple[str, float, int]]  # Server-Timing phases (name, seconds, count)
+
+  def summary(self) -> dict:
+    return {
+      "id": self.id,
+      "ts": self.ts,
+      "method": self.method,
+      "path": self.path,
+      "status": self.status,
+      "trigger": self.trigger,
+      "duration_ms": self.duration_ms,
+      "samples": self.samples,
+    }
+
+  def folded(self) -> str:
+    # Brendan Gregg's folded format: flamegraph.pl, speedscope, inferno
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class ProfileStore:
+  # The newest PROFILE_MAX_ENTRIES profiles, oldest dropped first
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._profiles: OrderedDict[str, Profile] = OrderedDict()
+
+  def add(self, profile: Profile) -> None:
+    limit = max(1, get_settings().profile_max_entries)
+    with self._lock:
+      self._profiles[profile.id] = profile
+      while len(self._profiles) > limit:
+        self._profiles.popitem(last=False)
+    metrics.inc("zelo_profiles_captured_total", trigger=profile.trigger)
+
+  def get(self, profile_id: str) -> Profile | None:
+    with self._lock:
+      return self._profiles.get(profile_id)
+
+  def list(self) -> list[Profile]:
+    # Newest first
+    with self._lock:
+      return list(reversed(self._profiles.values()))
+
+  def clear(self) -> None:
+    with self._lock:
+      self._profiles.clear()
+
+
+profile_store = ProfileStore()
@@ -1,16 +1,241 @@
+import asyncio
+import email.utils
+import random
+import threading
 import time
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
 
+from backend.core.config import get_settings
+from backend.core.metrics import metrics
 
-def with_backoff(fn: Callable[[], object], retries: int = 3, base_sleep: float = 0.25):
-  last_err: Exception | None = None
-  for i in range(retries):
+T = TypeVar("T")
+
+metrics.describe("zelo_retry_attempts_total", "Provider call attempts by provider and outcome")
+metrics.describe("zelo_retry_giveups_total", "Calls that stopped retrying, by provider and reason")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+  max_attempts: int = 3
+  base_delay: float = 0.25
+  max_delay: float = 8.0
+  # Longest Retry-After we are willing to sleep through inside a request
+  max_retry_after: float = 30.0
+  # Statuses worth retrying for idempotent calls
+  retry_statuses: frozenset[int] = frozenset({408, 429, 500, 502, 503, 504})
+  # Statuses that mean "not applied, try again" and are safe even for creates
+  safe_statuses: frozenset[int] = frozenset({429})
+  # Google reports per-user quota as 403 with these reasons
+  retry_reasons: frozenset[str] = frozenset()
+
+
+POLICIES: dict[str, RetryPolicy] = {
+  "default": RetryPolicy(),
+  # Notion: 409 conflict_error is documented as retryable and never applied
+  "notion": RetryPolicy(
+    retry_statuses=frozenset({409, 429, 500, 502, 503, 504}),
+    safe_statuses=frozenset({409, 429}),
+  ),
+  "google": RetryPolicy(
+    retry_statuses=frozenset({429, 500, 502, 503, 504}),
+    retry_reasons=frozenset({"rateLimitExceeded", "userRateLimitExceeded"}),
+  ),
+}
+
+
+@dataclass(frozen=True)
+class Classified:
+  retryable: bool
+  safe: bool  # the provider certainly did not apply the request
+  status: int | None = None
+  retry_after: float | None = None
+
+
+def _status_and_headers(exc: BaseException) -> tuple[int | None, object]:
+  # Duck-typed so this module never imports the provider SDKs:
+  # notion_client errors (.status/.headers), googleapiclient HttpError
+  # (.resp is an httplib2 Response dict) and httpx.HTTPStatusError (.response).
+  status = getattr(exc, "status", None)
+  if isinstance(status, int):
+    return status, getattr(exc, "headers", None) or {}
+  resp = getattr(exc, "resp", None)
+  if resp is not None and isinstance(getattr(resp, "status", None), int):
+    return resp.status, resp
+  response = getattr(exc, "response", None)
+  if response is not None and isinstance(getattr(response, "status_code", None), int):
+    return response.status_code, response.headers
+  return None, {}
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+  if not value:
+    return None
+  try:
+    return max(0.0, float(value))
+  except ValueError:
+    pass
+  try:
+    when = email.utils.parsedate_to_datetime(value)
+  except (TypeError, ValueError):
+    return None
+  return max(0.0, when.timestamp() - time.time())
+
+
+def _google_reason(exc: BaseException) -> str | None:
+  # HttpError exposes error_details; raw httpx responses carry the same
+  # {"error": {"errors": [{"reason": ...}]}} body
+  details = getattr(exc, "error_details", None)
+  if not isinstance(details, list):
     try:
-      return fn()
+      details = exc.response.json()["error"]["errors"]
+    except Exception:  # noqa: BLE001
+      return None
+  for d in details:
+    if isinstance(d, dict) and d.get("reason"):
+      return d["reason"]
+  return None
+
+
+def classify(exc: BaseException, policy: RetryPolicy) -> Classified:
+  status, headers = _status_and_headers(exc)
+  if status is not None:
+    retry_after = _parse_retry_after(headers.get("retry-after") or headers.get("Retry-After")) if headers else None
+    if status == 403 and _google_reason(exc) in policy.retry_reasons:
+      return Classified(True, True, status, retry_after)
+    return Classified(status in policy.retry_statuses, status in policy.safe_statuses, status, retry_after)
+
+  name = type(exc).__name__
+  # Connection never established: nothing was sent, always safe to retry
+  if name in {"ConnectError", "ConnectTimeout"} or isinstance(exc, ConnectionRefusedError):
+    return Classified(True, True)
+  # Timeouts and dropped connections: the request may have been applied
+  if isinstance(exc, (TimeoutError, ConnectionError)) or name in {
+    "RequestTimeoutError",
+    "ReadTimeout",
+    "WriteTimeout",
+    "PoolTimeout",
+    "RemoteProtocolError",
+    "ReadError",
+  }:
+    return Classified(True, False)
+  return Classified(False, False)
+
+
+class RetryBudget:
+  # Caps retries at `ratio` of call volume: each first attempt deposits
+  # `ratio` tokens, each retry spends one. A small per-second floor keeps low
+  # traffic able to retry at all. Shared by every provider in the process so
+  # an outage cannot multiply load.
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._tokens = 10.0
+    self._last = time.monotonic()
+
+  def _refill(self, now: float) -> None:
+    settings = get_settings()
+    cap = max(settings.retry_budget_min_per_sec * 10, 10.0)
+    self._tokens = min(cap, self._tokens + (now - self._last) * settings.retry_budget_min_per_sec)
+    self._last = now
+
+  def deposit(self) -> None:
+    ratio = get_settings().retry_budget_ratio
+    with self._lock:
+      self._refill(time.monotonic())
+      self._tokens += ratio
+
+  def try_spend(self) -> bool:
+    with self._lock:
+      self._refill(time.monotonic())
+      if self._tokens >= 1.0:
+        self._tokens -= 1.0
+        return True
+      return False
+
+
+retry_budget = RetryBudget()
+
+
+def _delay(policy: RetryPolicy, attempt: int, info: Classified) -> float:
+  # Full jitter: uniform(0, min(cap, base * 2^attempt)); Retry-After is a floor
+  if info.retry_after is not None:
+    return info.retry_after + random.uniform(0, policy.base_delay)
+  return random.uniform(0, min(policy.max_delay, policy.base_delay * (2**attempt)))
+
+
+def _next_delay(provider: str, policy: RetryPolicy, attempt: int, exc: BaseException, idempotent: bool) -> float | None:
+  # Returns the sleep before the next attempt, or None to give up
+  info = classify(exc, policy)
+  reason = None
+  if not info.retryable or (not idempotent and not info.safe):
+    reason = "non_retryable"
+  elif attempt + 1 >= policy.max_attempts:
+    reason = "exhausted"
+  elif info.retry_after is not None and info.retry_after > policy.max_retry_after:
+    reason = "retry_after_too_long"
+  elif not retry_budget.try_spend():
+    reason = "budget"
+  if reason is not None:
+    metrics.inc("zelo_retry_attempts_total", provider=provider, outcome="failed")
+    metrics.inc("zelo_retry_giveups_total", provider=provider, reason=reason)
+    return None
+  metrics.inc("zelo_retry_attempts_total", provider=provider, outcome="retry")
+  return _delay(policy, attempt, info)
+
+
+def next_delay(provider: str, attempt: int, exc: BaseException, idempotent: bool = True) -> float | None:
+  # For callers that retry parts of a request themselves (e.g. failed items
+  # of a provider batch): same policy, budget and metrics as call_with_retry
+  return _next_delay(provider, POLICIES.get(provider, POLICIES["default"]), attempt, exc, idempotent)
+
+
+def call_with_retry(provider: str, fn: Callable[[], T], idempotent: bool = True, policy: RetryPolicy | None = None) -> T:
+  # Non-idempotent calls (creates) are only retried when the provider
+  # certainly rejected them (e.g. 429), never after an ambiguous timeout/5xx.
+  policy = policy or POLICIES.get(provider, POLICIES["default"])
+  retry_budget.deposit()
+  attempt = 0
+  while True:
+    try:
+      result = fn()
+    except Exception as e:  # noqa: BLE001
+      delay = _next_delay(provider, policy, attempt, e, idempotent)
+      if delay is None:
+        raise
+      time.sleep(delay)
+      attempt += 1
+      continue
+    metrics.inc("zelo_retry_attempts_total", provider=provider, outcome="success")
+    return result
+
+
+async def acall_with_retry(
+  provider: str,
+  fn: Callable[[], Awaitable[T]],
+  idempotent: bool = True,
+  policy: RetryPolicy | None = None,
+) -> T:
+  policy = policy or POLICIES.get(provider, POLICIES["default"])
+  retry_budget.deposit()
+  attempt = 0
+  while True:
+    try:
+      result = await fn()
     except Exception as e:  # noqa: BLE001
-      last_err = e
-      time.sleep(base_sleep * (2**i))
-  if last_err:
-    raise last_err
-  raise RuntimeError("retry failed")
+      delay = _next_delay(provider, policy, attempt, e, idempotent)
+      if delay is None:
+        raise
+      await asyncio.sleep(delay)
+      attempt += 1
+      continue
+    metrics.inc("zelo_retry_attempts_total", provider=provider, outcome="success")
+    return result
+
+
+def with_backoff(fn: Callable[[], object], retries: int = 3, base_sleep: float = 0.25):
+  return call_with_retry("default", fn, policy=RetryPolicy(max_attempts=retries, base_delay=base_sleep))
+
 
+async def awith_backoff(fn: Callable[[], Awaitable[object]], retries: int = 3, base_sleep: float = 0.25):
+  return await acall_with_retry("default", fn, policy=RetryPolicy(max_attempts=retries, base_delay=base_sleep))
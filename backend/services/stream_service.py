@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+
+from fastapi import HTTPException
+
+from backend.core.idempotency import CachedResponse, as_dict, idempotency_store
+from backend.schemas.execution import ExecuteRequest
+from backend.services.execution_service import aexecute_action
+
+logger = logging.getLogger("app.stream")
+
+KEEPALIVE_SECONDS = 15.0
+
+_DONE = object()
+# Executions outlive a disconnected stream; hold them until they finish
+_RUNNING: set[asyncio.Task] = set()
+
+
+async def iter_execute_events(req: ExecuteRequest, idem_key: str | None) -> AsyncIterator[dict | None]:
+  # Yields "queued", "started", the tool's progress events and finally
+  # "result" (or "error"); None means nothing happened for KEEPALIVE_SECONDS.
+  # The execution runs as its own task, so a client that disconnects and
+  # retries with the same idempotency key gets the stored result instead of
+  # a second execution. Replays and coalesced retries only see "result".
+  loop = asyncio.get_running_loop()
+  queue: asyncio.Queue = asyncio.Queue()
+
+  def progress(event: dict) -> None:
+    loop.call_soon_threadsafe(queue.put_nowait, event)
+
+  async def _run() -> CachedResponse:
+    progress({"event": "started", "tool": req.tool})
+    res = await aexecute_action(req, progress)
+    return CachedResponse(body=res.model_dump_json().encode())
+
+  async def _execute() -> tuple[dict | CachedResponse, bool]:
+    if idem_key:
+      return await idempotency_store.arun_tracked(idem_key, _run)
+    return await _run(), False
+
+  yield {"event": "queued", "tool": req.tool, "idempotency_key": idem_key}
+  task = asyncio.create_task(_execute())
+  _RUNNING.add(task)
+  task.add_done_callback(_RUNNING.discard)
+  task.add_done_callback(lambda _t: queue.put_nowait(_DONE))
+
+  while True:
+    try:
+      event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+    except asyncio.TimeoutError:
+      yield None
+      continue
+    if event is _DONE:
+      break
+    yield event
+
+  try:
+    value, replayed = task.result()
+  except HTTPException as e:
+    yield {"event": "error", "status": e.status_code, "detail": e.detail}
+    return
+  except Exception as e:  # noqa: BLE001
+    logger.exception("streamed execute of %s failed", req.tool)
+    yield {"event": "error", "status": 500, "detail": f"{type(e).__name__}: {e}"}
+    return
+  yield {"event": "result", "replayed": replayed, "response": as_dict(value)}
@@ -0,0 +1,42 @@
+import pytest
+
+from backend.core.config import reload_settings
+from backend.core.idempotency import idempotency_store
+from backend.core.state import close_state_backends
+from backend.integrations.calendar_cache import calendar_cache
+from backend.integrations.circuit_breaker import reset_breakers
+from backend.integrations.notion_pages import page_index
+from backend.integrations.notion_schema import schema_cache
+from backend.integrations.rate_limit import rate_limiter
+from backend.integrations.registry import close_clients
+from backend.services.audit_sink import audit_sink
+from backend.services.job_service import job_queue
+from backend.services.journal_service import journal
+from backend.services.log_service import log_writer
+from backend.services.preview_cache import preview_cache
+from backend.services.profile_service import profile_store
+
+
+@pytest.fixture(autouse=True)
+def _fresh_settings(tmp_path, monkeypatch):
+  # Tests tweak env vars; make sure no snapshot, client or state file leaks
+  # across tests
+  monkeypatch.setenv("STATE_DIR", str(tmp_path / "state"))
+  reload_settings()
+  yield
+  job_queue.stop()
+  audit_sink.stop()
+  journal.close()
+  page_index.close()
+  rate_limiter.close()
+  log_writer.stop()
+  close_state_backends()
+  reset_breakers()
+  close_clients()
+  idempotency_store.clear()
+  preview_cache.clear()
+  profile_store.clear()
+  schema_cache.clear()
+  calendar_cache.clear()
+  monkeypatch.undo()
+  reload_settings()
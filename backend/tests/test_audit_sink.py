@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+
+from backend.core.config import reload_settings
+from backend.core.metrics import metrics
+from backend.core.sqlite import db_path
+from backend.services import audit_sink as audit_module
+from backend.services.audit_sink import QUARANTINE_FILE, audit_sink, spill_path
+from backend.services.log_service import add_log
+
+
+def _enable(monkeypatch, **env):
+  monkeypatch.setenv("AUDIT_SINK", "supabase")
+  monkeypatch.setenv("AUDIT_FLUSH_SECONDS", "0.05")
+  for k, v in env.items():
+    monkeypatch.setenv(k, v)
+  reload_settings()
+
+
+def test_records_are_batched_spilled_while_down_and_replayed(monkeypatch):
+  _enable(monkeypatch, AUDIT_BATCH_SIZE="3")
+  written, up = [], threading.Event()
+
+  def write(rows):
+    if not up.is_set():
+      raise ConnectionError("supabase unreachable")
+    written.append(rows)
+
+  monkeypatch.setattr(audit_sink, "_write", write)
+  audit_sink.start()
+  for i in range(4):
+    add_log("INFO", f"down {i}", {"i": i})
+  audit_sink.stop()
+  with open(spill_path(os.getpid())) as f:
+    assert [json.loads(line)["message"] for line in f] == [f"down {i}" for i in range(4)]
+
+  up.set()
+  audit_sink.start()
+  add_log("warn", "back up")
+  audit_sink.stop()
+  assert written[0] == [{"ts": written[0][0]["ts"], "level": "WARN", "message": "back up", "context": None, "worker": written[0][0]["worker"]}]
+  assert [len(b) for b in written[1:]] == [3, 1]  # the spill, in batches
+  assert not os.path.exists(spill_path(os.getpid()))
+
+
+def test_dead_workers_spills_are_replayed_and_torn_lines_quarantined(monkeypatch):
+  _enable(monkeypatch, AUDIT_BATCH_SIZE="10")
+  written = []
+  monkeypatch.setattr(audit_sink, "_write", written.append)
+  monkeypatch.setattr(audit_module, "_alive", lambda pid: False)
+  with open(spill_path(999999), "w") as f:
+    f.write(json.dumps({"message": "orphan"}) + "\n" + '{"message": "to')  # died mid-write
+  audit_sink.start()
+  add_log("INFO", "live")
+  audit_sink.stop()
+  assert [[r["message"] for r in b] for b in written] == [["live"], ["orphan"]]
+  assert not os.path.exists(spill_path(999999))
+  with open(db_path(QUARANTINE_FILE)) as f:
+    assert f.read() == '{"message": "to\n'
+
+
+def test_spill_and_replay_errors_do_not_stop_the_thread(monkeypatch):
+  _enable(monkeypatch, AUDIT_BATCH_SIZE="1")
+  written = []
+
+  def replay():
+    raise OSError("disk gone")
+
+  monkeypatch.setattr(audit_sink, "_write", written.append)
+  monkeypatch.setattr(audit_sink, "_replay", replay)
+  audit_sink.start()
+  add_log("INFO", "a")
+  add_log("INFO", "b")
+  audit_sink.stop()
+  assert [r["message"] for b in written for r in b] == ["a", "b"]
+
+  def down(rows):
+    raise ConnectionError("supabase unreachable")
+
+  def disk_full(*args, **kwargs):
+    raise OSError("disk full")
+
+  monkeypatch.setattr(audit_sink, "_write", down)
+  monkeypatch.setattr(audit_module, "open", disk_full, raising=False)
+  before = metrics.counter_value("zelo_audit_records_total", outcome="dropped")
+  audit_sink.start()
+  add_log("INFO", "lost")
+  audit_sink.stop()
+  assert metrics.counter_value("zelo_audit_records_total", outcome="dropped") - before == 1
+
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch):
+  _enable(monkeypatch, AUDIT_QUEUE_SIZE="2", AUDIT_BATCH_SIZE="1")
+  release = threading.Event()
+  monkeypatch.setattr(audit_sink, "_write", lambda rows: release.wait(5))
+  before = metrics.counter_value("zelo_audit_records_total", outcome="dropped")
+  audit_sink.start()
+  for i in range(10):
+    add_log("INFO", f"r{i}")
+  # One record is being written, two wait in the queue, the rest are dropped
+  assert metrics.counter_value("zelo_audit_records_total", outcome="dropped") - before >= 7
+  release.set()
+  audit_sink.stop()
+
+
+def test_disabled_sink_ignores_records():
+  audit_sink.start()
+  add_log("INFO", "not shipped")
+  assert audit_sink.depth() == 0
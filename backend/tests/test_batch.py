@@ -0,0 +1,26 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.main import create_app
+
+
+def test_batch_execute_reports_per_item_results():
+  client = TestClient(create_app())
+  items = [
+    {"tool": "notion_page", "payload": {"title": "a"}, "dry_run": True},
+    {"tool": "calendar_event", "payload": {"title": "b"}, "dry_run": True, "idempotency_key": "batch-k1"},
+    {"tool": "nope", "payload": {}},
+  ]
+  r = client.post("/api/execute/batch", headers={"X-Approved": "true"}, json={"items": items})
+  assert r.status_code == 200
+  body = r.json()
+  assert body["ok"] is False
+  assert [i["index"] for i in body["items"]] == [0, 1, 2]
+  assert body["items"][0]["ok"] and body["items"][1]["ok"]
+  assert "unknown tool" in body["items"][2]["error"]
+  assert body["stats"]["items"] == 3
+
+  r2 = client.post("/api/execute/batch?stream=true", headers={"X-Approved": "true"}, json={"items": items[:2]})
+  lines = [json.loads(ln) for ln in r2.text.splitlines()]
+  assert sorted(ln["index"] for ln in lines) == [0, 1]
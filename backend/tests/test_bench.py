@@ -0,0 +1,36 @@
+from backend.bench.fakes import Faults
+from backend.bench.runner import BenchConfig, compare, run_bench
+from backend.bench.state import run as run_state_bench
+
+
+def test_bench_runs_offline_against_fakes():
+  config = BenchConfig(
+    concurrency=[2],
+    requests=6,
+    batch_size=3,
+    workloads=["preview", "execute_notion", "execute_calendar", "batch", "replay"],
+    faults=Faults(latency_ms=1),
+  )
+  report = run_bench(config)
+  by_workload = {r["workload"]: r for r in report["results"]}
+  assert set(by_workload) == set(config.workloads)
+  for r in report["results"]:
+    assert r["errors"] == 0, r
+    assert r["latency_ms"]["p50"] <= r["latency_ms"]["p99"]
+    assert "idempotency_bytes" in r["memory"]["growth"]
+  assert by_workload["batch"]["requests"] == 2
+  # replays never reach the provider: one create for the priming request
+  assert report["fakes"]["notion"]["calls"] == 6 + 6 + 1
+
+  slower = {"results": [{**r, "throughput_rps": r["throughput_rps"] * 0.5} for r in report["results"]]}
+  assert compare(slower, report)
+  assert compare(report, report) == []
+
+
+def test_state_bench_checks_claim_atomicity():
+  report = run_state_bench(["memory", "sqlite", "supabase"], ops=40, threads=4)
+  by_backend = {r["backend"]: r for r in report["results"]}
+  assert "skipped" in by_backend["supabase"]
+  for name in ("memory", "sqlite"):
+    claims = by_backend[name]["contended_claims"]
+    assert claims["keys_with_one_winner"] == claims["keys"]
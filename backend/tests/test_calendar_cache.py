@@ -0,0 +1,102 @@
+import asyncio
+import random
+
+import httpx
+
+from backend.core.config import reload_settings
+from backend.integrations.calendar_cache import calendar_cache, parse_time
+from backend.tools import calendar_tool
+from backend.tools.calendar_tool import CalendarTool
+from backend.utils.intervals import IntervalIndex
+
+
+def test_interval_index_matches_brute_force():
+  rng = random.Random(7)
+  items = []
+  for i in range(300):
+    start = rng.uniform(0, 1000)
+    items.append((start, start + rng.uniform(0.5, 50), f"e{i}"))
+  index = IntervalIndex()
+  index.replace(items[:200])
+  for item in items[200:]:
+    index.add(*item)
+  index.remove(*items[0])
+  live = sorted(items[1:])
+  for _ in range(200):
+    a = rng.uniform(-10, 1010)
+    b = a + rng.uniform(0.1, 30)
+    assert index.overlapping(a, b) == [i for i in live if i[0] < b and i[1] > a]
+
+
+def _event(event_id: str, start: str, end: str, **extra) -> dict:
+  return {"id": event_id, "summary": event_id, "start": {"dateTime": start}, "end": {"dateTime": end}, **extra}
+
+
+class FakeGoogle:
+  # events.list: the first call is a full sync, later ones return `changes`
+  def __init__(self, events):
+    self.events = events
+    self.changes: list[dict] = []
+    self.calls: list[tuple] = []
+    self.expire = False
+
+  async def list_events(self, *, calendar_id, sync_token=None, page_token=None):
+    self.calls.append((sync_token, page_token))
+    if sync_token and self.expire and page_token is None:
+      self.expire = False
+      raise httpx.HTTPStatusError("gone", request=httpx.Request("GET", "http://x"), response=httpx.Response(410))
+    if sync_token:
+      return {"items": self.changes, "nextSyncToken": f"t{len(self.calls)}"}
+    if page_token is None:
+      return {"items": self.events[:1], "nextPageToken": "p2"}
+    return {"items": self.events[1:], "nextSyncToken": f"t{len(self.calls)}"}
+
+
+def test_preview_reports_conflicts_and_suggests_free_slots(monkeypatch):
+  monkeypatch.setenv("GOOGLE_SERVICE_ACCOUNT_JSON", "{}")
+  monkeypatch.setenv("GOOGLE_CALENDAR_ID", "cal")
+  monkeypatch.setenv("CALENDAR_CACHE_TTL_SECONDS", "0")
+  reload_settings()
+  fake = FakeGoogle([
+    _event("a", "2099-01-01T10:00:00+09:00", "2099-01-01T11:00:00+09:00"),
+    _event("b", "2099-01-01T10:30:00+09:00", "2099-01-01T12:00:00+09:00"),
+    _event("free", "2099-01-01T12:00:00+09:00", "2099-01-01T13:00:00+09:00", transparency="transparent"),
+    _event("past", "2000-01-01T10:00:00Z", "2000-01-01T11:00:00Z"),
+  ])
+  monkeypatch.setattr(calendar_tool, "get_async_google_client", lambda: fake)
+  tool = CalendarTool()
+  payload = {"title": "sync", "start_iso": "2099-01-01T10:15:00+09:00", "end_iso": "2099-01-01T11:15:00+09:00"}
+
+  summary, [action] = asyncio.run(tool.apreview(payload))
+  assert "겹치는 일정 2개" in summary
+  assert [c["id"] for c in action["conflicts"]] == ["a", "b"]
+  assert action["suggestions"][0] == {"start_iso": "2099-01-01T12:00:00+09:00", "end_iso": "2099-01-01T13:00:00+09:00"}
+  assert len(action["suggestions"]) == 3
+  assert fake.calls == [(None, None), (None, "p2")]
+
+  # Incremental sync: "a" deleted, "c" added
+  fake.changes = [{"id": "a", "status": "cancelled"}, _event("c", "2099-01-01T09:00:00+09:00", "2099-01-01T10:30:00+09:00")]
+  _, [action] = asyncio.run(tool.apreview(payload))
+  assert [c["id"] for c in action["conflicts"]] == ["c", "b"]
+  assert fake.calls[-1] == ("t2", None)
+
+  # An expired sync token falls back to a full sync
+  fake.expire = True
+  _, [action] = asyncio.run(tool.apreview(payload))
+  assert [c["id"] for c in action["conflicts"]] == ["a", "b"]
+  assert fake.calls[-2:] == [(None, None), (None, "p2")]
+
+  # Created events are written through without another listing
+  calendar_cache.record("cal", _event("new", "2099-01-01T11:00:00+09:00", "2099-01-01T11:10:00+09:00"))
+  assert [e.id for e in calendar_cache.conflicts("cal", *_window("2099-01-01T11:05:00+09:00"))] == ["b", "new"]
+
+
+def _window(iso: str) -> tuple[float, float]:
+  t = parse_time(iso)
+  return t, t + 60
+
+
+def test_preview_without_google_stays_payload_only():
+  summary, [action] = CalendarTool().preview({"title": "x", "start_iso": "2099-01-01T10:00:00Z", "end_iso": "2099-01-01T11:00:00Z"})
+  assert summary == "캘린더 이벤트 생성: x"
+  assert "conflicts" not in action
@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.core.config import reload_settings
+from backend.core.exceptions import ProviderUnavailable
+from backend.integrations.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker
+from backend.integrations.guard import aprovider_call
+
+
+def _error(status: int) -> httpx.HTTPStatusError:
+  req = httpx.Request("POST", "https://example.test")
+  return httpx.HTTPStatusError("boom", request=req, response=httpx.Response(status, request=req))
+
+
+def test_breaker_opens_fails_fast_and_recovers(monkeypatch):
+  monkeypatch.setenv("CIRCUIT_MIN_CALLS", "4")
+  monkeypatch.setenv("CIRCUIT_OPEN_SECONDS", "0")
+  monkeypatch.setenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1")
+  reload_settings()
+  breaker = CircuitBreaker("notion")
+
+  # validation errors are not a provider health signal
+  for _ in range(4):
+    breaker.before_call()
+    breaker.record(0.01, _error(400))
+  assert breaker.state == CLOSED
+
+  for _ in range(4):
+    breaker.before_call()
+    breaker.record(0.01, _error(503))
+  assert breaker.state == OPEN
+
+  # cool-down elapsed (0s): one half-open probe is admitted, the next is rejected
+  breaker.before_call()
+  with pytest.raises(ProviderUnavailable) as exc:
+    breaker.before_call()
+  assert exc.value.status_code == 503
+  breaker.record(0.01)
+  assert breaker.state == CLOSED
+
+
+def test_cancelled_half_open_probe_frees_its_slot(monkeypatch):
+  monkeypatch.setenv("CIRCUIT_MIN_CALLS", "2")
+  monkeypatch.setenv("CIRCUIT_OPEN_SECONDS", "0")
+  monkeypatch.setenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1")
+  monkeypatch.setenv("NOTION_RATE_LIMIT_PER_SEC", "0")
+  reload_settings()
+  breaker = get_breaker("notion")
+  for _ in range(2):
+    breaker.before_call()
+    breaker.record(0.01, _error(503))
+  assert breaker.state == OPEN
+
+  async def main():
+    started = asyncio.Event()
+
+    async def _hang():
+      started.set()
+      await asyncio.sleep(60)
+
+    probe = asyncio.create_task(aprovider_call("notion", "pages.create", _hang))
+    await started.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+      await probe
+
+  asyncio.run(main())
+  assert breaker.state == HALF_OPEN
+  breaker.before_call()  # the slot is free again
+  breaker.record(0.01)
+  assert breaker.state == CLOSED
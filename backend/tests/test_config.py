@@ -0,0 +1,20 @@
+import os
+
+from backend.core import config
+
+
+def test_settings_snapshot_is_shared_and_hot_reloads(tmp_path, monkeypatch):
+  monkeypatch.chdir(tmp_path)
+  monkeypatch.delenv("LOG_LEVEL", raising=False)
+  (tmp_path / ".env").write_text("LOG_LEVEL=DEBUG\nSETTINGS_RELOAD_INTERVAL_SECONDS=0\n")
+  s1 = config.reload_settings()
+  assert config.get_settings() is s1
+  assert s1.log_level == "DEBUG"
+
+  env = tmp_path / ".env"
+  env.write_text("LOG_LEVEL=WARNING\nSETTINGS_RELOAD_INTERVAL_SECONDS=0\n")
+  st = env.stat()
+  os.utime(env, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+  s2 = config.get_settings()
+  assert s2 is not s1
+  assert s2.log_level == "WARNING"
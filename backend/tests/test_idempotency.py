@@ -1,6 +1,12 @@
+import asyncio
+import threading
+import time
+
 from fastapi.testclient import TestClient
 
+from backend.core.idempotency import IdempotencyStore
 from backend.main import create_app
+from backend.schemas.execution import ExecuteResponse
 
 
 def test_idempotency_cache():
@@ -14,3 +20,73 @@ def test_idempotency_cache():
   assert r2.status_code == 200
   assert r1.json() == r2.json()
 
+
+
+def test_store_evicts_lru_and_counts():
+  store = IdempotencyStore(max_entries=2, max_bytes=1024)
+  store.put("a", {"v": 1})
+  store.put("b", {"v": 2})
+  assert store.get("a") == {"v": 1}
+  store.put("c", {"v": 3})
+  assert store.get("b") is None
+  assert store.get("a") == {"v": 1}
+  stats = store.stats()
+  assert stats["entries"] == 2
+  assert stats["evictions"] == 1
+  assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_store_coalesces_concurrent_calls():
+  store = IdempotencyStore()
+  calls = []
+  gate = threading.Event()
+
+  def slow():
+    calls.append(1)
+    gate.wait(2)
+    return {"ok": True}
+
+  results = []
+  threads = [threading.Thread(target=lambda: results.append(store.run("k", slow))) for _ in range(5)]
+  for t in threads:
+    t.start()
+  time.sleep(0.05)
+  gate.set()
+  for t in threads:
+    t.join()
+  assert len(calls) == 1
+  assert results == [{"ok": True}] * 5
+
+
+def test_store_coalesces_async_calls():
+  store = IdempotencyStore()
+  calls = []
+
+  async def slow():
+    calls.append(1)
+    await asyncio.sleep(0.05)
+    return {"ok": True}
+
+  async def main():
+    return await asyncio.gather(*(store.arun("k", slow) for _ in range(5)))
+
+  assert asyncio.run(main()) == [{"ok": True}] * 5
+  assert len(calls) == 1
+
+
+def test_replay_returns_stored_bytes_without_revalidation(monkeypatch):
+  client = TestClient(create_app())
+  headers = {"X-Approved": "true", "X-Idempotency-Key": "raw-1"}
+  body = {"tool": "notion_page", "payload": {"title": "t"}, "dry_run": True}
+  r1 = client.post("/api/execute", headers=headers, json=body)
+  assert r1.status_code == 200
+  assert "idempotent-replay" not in r1.headers
+
+  def _boom(*args, **kwargs):
+    raise AssertionError("replay must not validate")
+
+  monkeypatch.setattr(ExecuteResponse, "model_validate", _boom)
+  r2 = client.post("/api/execute", headers=headers, json=body)
+  assert r2.headers["idempotent-replay"] == "true"
+  assert r2.content == r1.content
+  assert r2.headers["content-type"] == "application/json"
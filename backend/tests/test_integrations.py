@@ -0,0 +1,109 @@
+import json
+from contextlib import contextmanager
+
+import httplib2
+import httpx
+from googleapiclient.errors import HttpError
+
+from backend.core.config import reload_settings
+from backend.integrations.google_client import MAX_BATCH, GoogleClient
+from backend.integrations.notion_client import MAX_TEXT, NotionClient, text_to_blocks
+from backend.integrations.registry import get_notion_client, warm_up_clients
+
+
+def test_notion_client_is_reused_until_token_changes(monkeypatch):
+  monkeypatch.setenv("NOTION_TOKEN", "secret-a")
+  reload_settings()
+  c1 = get_notion_client()
+  assert get_notion_client() is c1
+  assert "notion" in warm_up_clients()
+
+  monkeypatch.setenv("NOTION_TOKEN", "secret-b")
+  reload_settings()
+  assert get_notion_client() is not c1
+
+
+def testtext_to_blocks_respects_notion_limits():
+  long_line = "word " * 1000  # ~5000 chars
+  blocks = text_to_blocks("\n".join([long_line] + [f"line {i}" for i in range(150)]))
+  assert len(blocks) == 151
+  rich = blocks[0]["paragraph"]["rich_text"]
+  assert len(rich) == 3
+  assert all(len(r["text"]["content"]) <= MAX_TEXT for r in rich)
+  assert "".join(r["text"]["content"] for r in rich) == long_line.rstrip()
+
+
+def test_create_page_appends_remaining_blocks_in_batches(monkeypatch):
+  monkeypatch.setenv("NOTION_TOKEN", "secret")
+  monkeypatch.setenv("NOTION_PARENT_PAGE_ID", "parent")
+  reload_settings()
+  client = NotionClient()
+  calls = []
+
+  def handler(req: httpx.Request) -> httpx.Response:
+    body = json.loads(req.content)
+    calls.append((req.method, req.url.path, len(body["children"])))
+    return httpx.Response(200, json={"object": "page", "id": "page-1", "url": "u"})
+
+  client._sdk.client._transport = httpx.MockTransport(handler)
+  page = client.create_page(title="t", content="\n".join(f"l{i}" for i in range(250)))
+  assert page["id"] == "page-1"
+  assert calls == [
+    ("POST", "/v1/pages", 100),
+    ("PATCH", "/v1/blocks/page-1/children", 100),
+    ("PATCH", "/v1/blocks/page-1/children", 50),
+  ]
+
+
+def test_google_create_events_batches_and_retries_only_failed_events(monkeypatch):
+  monkeypatch.setenv("GOOGLE_CALENDAR_ID", "cal")
+  monkeypatch.setenv("GOOGLE_RATE_LIMIT_PER_SEC", "0")
+  reload_settings()
+  batches: list[list[str]] = []
+  throttled = {"3"}  # event 3 gets a 429 once, event 4 a permanent 400
+
+  class FakeBatch:
+    def __init__(self, callback):
+      self.callback = callback
+      self.requests = []
+
+    def add(self, request, request_id):
+      self.requests.append((request_id, request))
+
+    def execute(self):
+      batches.append([rid for rid, _ in self.requests])
+      for rid, body in self.requests:
+        if rid in throttled:
+          throttled.discard(rid)
+          self.callback(rid, None, HttpError(httplib2.Response({"status": 429}), b"slow down"))
+        elif rid == "4":
+          self.callback(rid, None, HttpError(httplib2.Response({"status": 400}), b"bad"))
+        else:
+          self.callback(rid, {"id": f"ev{rid}", **body}, None)
+
+  class FakeService:
+    def new_batch_http_request(self, callback):
+      return FakeBatch(callback)
+
+    def events(self):
+      return self
+
+    def insert(self, calendarId, body):
+      return body
+
+  @contextmanager
+  def fake_service():
+    yield FakeService()
+
+  client = GoogleClient.__new__(GoogleClient)
+  monkeypatch.setattr(client, "ensure_token", lambda: "token", raising=False)
+  monkeypatch.setattr(client, "_service", fake_service, raising=False)
+
+  events = [{"title": f"e{i}", "start_iso": "2024-01-01T10:00:00Z", "end_iso": "2024-01-01T11:00:00Z"} for i in range(60)]
+  items = client.create_events(events)
+
+  assert [len(b) for b in batches] == [MAX_BATCH, 60 - MAX_BATCH, 1]
+  assert batches[-1] == ["3"]
+  assert items[3]["ok"] is True and items[3]["event"]["id"] == "ev3"
+  assert items[4]["ok"] is False and items[4]["status"] == 400
+  assert sum(i["ok"] for i in items) == 59
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from backend.core.config import reload_settings
+from backend.main import create_app
+from backend.schemas.execution import ExecuteRequest
+from backend.services.job_service import JobQueue
+
+
+def test_async_execute_returns_job_and_can_be_polled():
+  client = TestClient(create_app())
+  headers = {"X-Approved": "true"}
+  body = {"tool": "notion_page", "payload": {"title": "t"}, "dry_run": True}
+
+  r = client.post("/api/execute?mode=async", headers=headers, json=body)
+  assert r.status_code == 202
+  job_id = r.json()["job_id"]
+
+  r2 = client.get(f"/api/jobs/{job_id}?wait=5")
+  assert r2.status_code == 200
+  job = r2.json()
+  assert job["status"] == "succeeded"
+  assert job["result"]["ok"] is True
+
+  assert client.get("/api/jobs/missing").status_code == 404
+
+
+def test_async_execute_dedupes_on_idempotency_key():
+  client = TestClient(create_app())
+  headers = {"X-Approved": "true", "Prefer": "respond-async", "X-Idempotency-Key": "job-k"}
+  body = {"tool": "notion_page", "payload": {"title": "t"}, "dry_run": True}
+  j1 = client.post("/api/execute", headers=headers, json=body).json()["job_id"]
+  j2 = client.post("/api/execute", headers=headers, json=body).json()["job_id"]
+  assert j1 == j2
+
+
+def test_jobs_are_claimed_once_and_only_stale_leases_are_reclaimed():
+  a, b = JobQueue(), JobQueue()
+  try:
+    a.start()
+    b.start()
+    req = ExecuteRequest(tool="notion_page", payload={"title": "t"}, dry_run=True)
+    with ThreadPoolExecutor(8) as pool:
+      ids = set(pool.map(lambda q: q.submit(req, "shared-key"), [a, b] * 4))
+    assert len(ids) == 1
+
+    a._exec(
+      "INSERT INTO jobs (id, status, tool, request, created_at) VALUES ('j1', 'queued', 'notion_page', ?, 0)",
+      (req.model_dump_json(),),
+    )
+    assert a._claim("j1") and not b._claim("j1")
+
+    # j1 belongs to a live owner; j2's owner stopped renewing
+    a._exec(
+      "INSERT INTO jobs (id, status, tool, request, created_at, owner, lease_until) VALUES ('j2', 'running', 'notion_page', ?, 0, 'gone', 1)",
+      (req.model_dump_json(),),
+    )
+    assert b._reclaim_stale() == 1
+    assert b.get("j1").status == "running"
+    assert b.get("j2").status == "queued"
+  finally:
+    a.stop()
+    b.stop()
+
+
+def test_wait_sees_a_job_finished_by_another_worker(monkeypatch):
+  monkeypatch.setenv("JOB_POLL_SECONDS", "0.05")
+  reload_settings()
+  a, b = JobQueue(), JobQueue()
+  a._exec("INSERT INTO jobs (id, status, tool, request, created_at) VALUES ('j3', 'running', 'notion_page', '{}', 0)")
+
+  async def main():
+    waiter = asyncio.create_task(b.wait("j3", 5))
+    await asyncio.sleep(0.1)
+    # Finished in "another process": b's waiters are never notified
+    a._exec("UPDATE jobs SET status = 'succeeded', finished_at = 1 WHERE id = 'j3'")
+    return await waiter
+
+  started = time.monotonic()
+  try:
+    assert asyncio.run(main()).status == "succeeded"
+  finally:
+    a.stop()
+    b.stop()
+  assert time.monotonic() - started < 2
@@ -0,0 +1,66 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from backend.core.state import LogRing
+from backend.main import create_app
+from backend.services.log_service import add_log, last_seq, tail_logs
+
+
+def test_ring_keeps_newest_records():
+  ring = LogRing(3)
+  for i in range(5):
+    ring.append(float(i), "INFO", f"m{i}", None)
+  assert [r[3] for r in ring.records()] == ["m2", "m3", "m4"]
+  assert [r[3] for r in ring.records(after_seq=4)] == ["m4"]
+  assert [r[3] for r in ring.records(since_ts=3.0)] == ["m3", "m4"]
+  ring.resize(2)
+  assert [r[3] for r in ring.records()] == ["m3", "m4"]
+
+
+def test_logs_endpoint_filters_and_cursor():
+  client = TestClient(create_app())
+  add_log("INFO", "execute requested", {"tool": "notion_page"})
+  add_log("ERROR", "boom", {"tool": "calendar_event"})
+
+  r = client.get("/api/logs", params={"level": "error", "tool": "calendar_event"})
+  body = r.json()
+  assert [i["message"] for i in body["items"]][:1] == ["boom"]
+  assert all(i["level"] == "ERROR" for i in body["items"])
+
+  cursor = body["last_seq"]
+  add_log("INFO", "after cursor")
+  r2 = client.get("/api/logs", params={"after_seq": cursor})
+  messages = [i["message"] for i in r2.json()["items"]]
+  assert "after cursor" in messages and "boom" not in messages
+
+
+def test_logs_cursor_pages_oldest_first():
+  client = TestClient(create_app())
+  start = last_seq()
+  for i in range(10):
+    add_log("INFO", f"page {i}")
+
+  seen, cursor = [], start
+  while True:
+    body = client.get("/api/logs", params={"message": "page", "after_seq": cursor, "limit": 3}).json()
+    if not body["items"]:
+      break
+    assert body["last_seq"] == body["items"][-1]["seq"]
+    seen += [i["message"] for i in body["items"]]
+    cursor = body["last_seq"]
+  assert seen == [f"page {i}" for i in range(10)]
+
+
+def test_tail_returns_new_entries():
+  cursor = last_seq()
+
+  async def main():
+    waiter = asyncio.create_task(tail_logs(cursor, timeout=2))
+    await asyncio.sleep(0.01)
+    add_log("INFO", "tailed")
+    return await waiter
+
+  items, new_cursor = asyncio.run(main())
+  assert [i.message for i in items] == ["tailed"]
+  assert new_cursor == cursor + 1
@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+
+from backend.core.metrics import Histogram
+from backend.main import create_app
+
+
+def test_histogram_quantiles():
+  h = Histogram(buckets=(0.01, 0.1, 1.0))
+  for _ in range(90):
+    h.observe(0.005)
+  for _ in range(10):
+    h.observe(0.5)
+  assert h.quantile(0.5) <= 0.01
+  assert 0.1 < h.quantile(0.99) <= 1.0
+
+
+def test_metrics_endpoint_exposes_request_histograms():
+  client = TestClient(create_app())
+  r = client.post("/api/preview", json={"tool": "notion_page", "payload": {"title": "t"}})
+  assert r.headers["x-request-id"]
+  text = client.get("/api/metrics").text
+  assert "# TYPE zelo_http_request_duration_seconds histogram" in text
+  assert 'route="/api/preview"' in text
+
+  client.get("/api/jobs/api")  # a param value equal to a path segment
+  text = client.get("/api/metrics").text
+  assert 'route="/api/jobs/{job_id}"' in text
+  assert 'route="/{job_id}' not in text
+  assert "zelo_idempotency_hits_total" in text
+
+  summary = client.get("/api/metrics?format=json").json()
+  assert "zelo_http_request_duration_seconds" in summary
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from backend.core.exceptions import InvalidPayload
+from backend.integrations.notion_schema import coerce_properties
+from backend.tools import notion_db_tool
+from backend.tools.notion_db_tool import NotionDbTool
+
+SCHEMA = {
+  "Name": {"type": "title"},
+  "Points": {"type": "number"},
+  "Done": {"type": "checkbox"},
+  "Tags": {"type": "multi_select", "multi_select": {"options": []}},
+  "Stage": {"type": "status", "status": {"options": [{"name": "Todo"}, {"name": "Done"}]}},
+}
+
+
+class FakeNotion:
+  def __init__(self, schemas):
+    self.schemas = list(schemas)
+    self.fetches = 0
+    self.created = []
+
+  async def database_properties(self, *, database_id: str) -> dict:
+    self.fetches += 1
+    return self.schemas[min(self.fetches, len(self.schemas)) - 1]
+
+  async def create_db_row(self, *, database_id: str, properties: dict) -> dict:
+    if properties["Name"]["title"][0]["text"]["content"] == "boom":
+      raise RuntimeError("notion down")
+    self.created.append(properties)
+    return {"id": f"p{len(self.created)}", "url": "u"}
+
+
+def test_coerce_properties_maps_friendly_values_and_reports_errors():
+  props, errors = coerce_properties(SCHEMA, {"Name": "x", "Points": "3", "Done": "yes", "Tags": "a, b"})
+  assert errors == []
+  assert props["Points"] == {"number": 3}
+  assert props["Done"] == {"checkbox": True}
+  assert props["Tags"] == {"multi_select": [{"name": "a"}, {"name": "b"}]}
+
+  _, errors = coerce_properties(SCHEMA, {"Nmae": "x", "Stage": "Doing", "Points": "many"})
+  assert len(errors) == 3
+  assert "did you mean 'Name'" in errors[0]
+
+
+def test_invalid_row_fails_before_any_write_and_stale_schema_is_refreshed(monkeypatch):
+  renamed = {**SCHEMA, "Owner": {"type": "rich_text"}}
+  fake = FakeNotion([SCHEMA, renamed])
+  monkeypatch.setattr(notion_db_tool, "get_async_notion_client", lambda: fake)
+  tool = NotionDbTool()
+
+  with pytest.raises(InvalidPayload):
+    asyncio.run(tool.aexecute({"database_id": "db", "properties": {"Name": "x", "Points": "many"}}))
+  assert fake.created == [] and fake.fetches == 1
+
+  # "Owner" is unknown to the cached schema, so it is refetched once
+  res = asyncio.run(tool.aexecute({"database_id": "db", "properties": {"Name": "x", "Owner": "me"}}))
+  assert res["id"] == "p1"
+  assert fake.fetches == 2
+
+
+def test_bulk_rows_report_per_row(monkeypatch):
+  fake = FakeNotion([SCHEMA])
+  monkeypatch.setattr(notion_db_tool, "get_async_notion_client", lambda: fake)
+  rows = [{"Name": f"r{i}", "Points": i} for i in range(5)] + [{"Name": "boom"}, {"Name": "bad", "Done": "maybe"}]
+
+  res = asyncio.run(NotionDbTool().aexecute({"database_id": "db", "rows": rows}))
+  assert res["created"] == 5 and res["failed"] == 2
+  assert [i["ok"] for i in res["items"]] == [True] * 5 + [False, False]
+  assert "errors" in res["items"][6]
+  assert fake.fetches == 1
+  assert NotionDbTool().compensation({}, res)["page_ids"] == [f"p{i}" for i in range(1, 6)]
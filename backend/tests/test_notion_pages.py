@@ -0,0 +1,193 @@
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from backend.core.config import reload_settings
+from backend.integrations.notion_client import NotionClient
+from backend.integrations.notion_pages import plan_blocks
+from backend.tools import notion_page_tool
+from backend.tools.notion_page_tool import NotionPageTool
+
+
+class FakePage:
+  # One Notion page's children behind httpx.MockTransport
+  def __init__(self):
+    self.blocks: list[dict] = []
+    self.calls: list[str] = []
+    self._ids = itertools.count()
+    self.page: dict | None = None
+    self.create_delay = 0.0
+
+  def _new(self, children: list[dict]) -> list[dict]:
+    return [{**c, "id": f"b{next(self._ids)}"} for c in children]
+
+  def text(self) -> list[str]:
+    return ["".join(r["text"]["content"] for r in b[b["type"]]["rich_text"]) for b in self.blocks]
+
+  def __call__(self, req: httpx.Request) -> httpx.Response:
+    path = req.url.path.removeprefix("/v1/")
+    self.calls.append(f"{req.method} {path.split('/')[0]}")
+    body = json.loads(req.content) if req.content else {}
+    if path == "pages":
+      time.sleep(self.create_delay)
+      self.blocks = self._new(body["children"])
+      self.page = {"object": "page", "id": f"page-{next(self._ids)}", "url": "u", "in_trash": False}
+      return httpx.Response(200, json=self.page)
+    if path.startswith("pages/"):
+      return httpx.Response(200, json=self.page)
+    if self.page is None or self.page["in_trash"]:
+      return _not_found()
+    if req.method == "GET":
+      return httpx.Response(200, json={"results": self.blocks, "has_more": False, "next_cursor": None})
+    if path.endswith("/children"):
+      new = self._new(body["children"])
+      at = next(i + 1 for i, b in enumerate(self.blocks) if b["id"] == body["after"]) if "after" in body else len(self.blocks)
+      self.blocks[at:at] = new
+      return httpx.Response(200, json={"results": new})
+    block_id = path.split("/")[1]
+    i = next((i for i, b in enumerate(self.blocks) if b["id"] == block_id), None)
+    if i is None:
+      return _not_found()
+    kind = self.blocks[i]["type"]
+    if req.method == "DELETE":
+      del self.blocks[i]
+    elif kind not in body:
+      # Like Notion: an update cannot change the block's type
+      return httpx.Response(400, json={"object": "error", "status": 400, "code": "validation_error", "message": f"body.{kind} should be defined"})
+    else:
+      self.blocks[i] = {**self.blocks[i], kind: body[kind]}
+    return httpx.Response(200, json={"object": "block", "id": block_id})
+
+
+def _not_found() -> httpx.Response:
+  return httpx.Response(404, json={"object": "error", "status": 404, "code": "object_not_found", "message": "not found"})
+
+
+def _tool(monkeypatch) -> tuple[NotionPageTool, FakePage]:
+  monkeypatch.setenv("NOTION_TOKEN", "secret")
+  monkeypatch.setenv("NOTION_PARENT_PAGE_ID", "parent")
+  monkeypatch.setenv("NOTION_RATE_LIMIT_PER_SEC", "0")
+  reload_settings()
+  client = NotionClient()
+  fake = FakePage()
+  client._sdk.client._transport = httpx.MockTransport(fake)
+  monkeypatch.setattr(notion_page_tool, "get_notion_client", lambda: client)
+  return NotionPageTool(), fake
+
+
+def test_upsert_creates_then_skips_then_rewrites_only_changed_blocks(monkeypatch):
+  tool, fake = _tool(monkeypatch)
+
+  def publish(lines):
+    fake.calls.clear()
+    return tool.execute({"title": "notes", "content": "\n".join(lines), "upsert": True})
+
+  lines = [f"line {i}" for i in range(10)]
+  res = publish(lines)
+  page_id = fake.page["id"]
+  assert (res["outcome"], res["id"], fake.calls) == ("created", page_id, ["POST pages"])
+  assert tool.compensation({}, res) == {"action": "notion.archive_page", "page_id": page_id}
+
+  assert publish(lines)["outcome"] == "unchanged"
+  assert fake.calls == []
+
+  # One edit and one new line: list the page, update + insert
+  lines[3] = "line three"
+  lines.insert(7, "new line")
+  res = publish(lines)
+  assert (res["outcome"], res["blocks_written"]) == ("updated", 2)
+  assert fake.calls == ["GET blocks", "PATCH blocks", "PATCH blocks"]
+  assert fake.text() == lines
+  assert tool.compensation({}, res) is None
+
+  del lines[0]
+  publish(lines)
+  assert fake.calls == ["GET blocks", "DELETE blocks"]
+  assert fake.text() == lines
+
+  # A line added at the very top rewrites the page
+  lines.insert(0, "top")
+  publish(lines)
+  assert fake.text() == lines
+
+
+def test_upsert_replaces_a_heading_with_a_paragraph(monkeypatch):
+  tool, fake = _tool(monkeypatch)
+  publish = lambda lines: tool.execute({"title": "notes", "content": "\n".join(lines), "upsert": True})
+  lines = ["intro", "Title", "body"]
+  publish(lines)
+  # Turned into a heading in Notion
+  fake.blocks[1] = {"id": fake.blocks[1]["id"], "object": "block", "type": "heading_1", "heading_1": fake.blocks[1]["paragraph"]}
+
+  fake.calls.clear()
+  lines[1] = "no longer a title"
+  res = publish(lines)
+  assert res["outcome"] == "updated"
+  assert fake.calls == ["GET blocks", "DELETE blocks", "PATCH blocks"]  # delete + insert after "intro"
+  assert fake.text() == lines and {b["type"] for b in fake.blocks} == {"paragraph"}
+
+  # Even a plan that still tries the in-place update recovers with a rewrite
+  fake.blocks[0] = {**fake.blocks[0], "type": "heading_2", "heading_2": fake.blocks[0]["paragraph"]}
+  monkeypatch.setattr(notion_page_tool, "listed_hashes", lambda children: ["?"] * len(children))
+  real = notion_page_tool.plan_blocks
+  monkeypatch.setattr(notion_page_tool, "plan_blocks", lambda ids, old, new, blocks, kinds: real(ids, old, new, blocks))
+  lines[0] = "new intro"
+  assert publish(lines)["outcome"] == "updated"
+  assert fake.text() == lines
+
+
+def test_concurrent_first_upserts_create_one_page(monkeypatch):
+  tool, fake = _tool(monkeypatch)
+  fake.create_delay = 0.05
+  payload = {"title": "race", "content": "hello", "upsert": True}
+  with ThreadPoolExecutor(4) as pool:
+    results = list(pool.map(lambda _: tool.execute(payload), range(4)))
+  assert sorted(r["outcome"] for r in results) == ["created", "unchanged", "unchanged", "unchanged"]
+  assert len({r["id"] for r in results}) == 1
+
+
+def test_plan_blocks_pairs_replacements_and_keeps_equal_runs():
+  steps = plan_blocks(["i0", "i1", "i2"], ["a", "b", "c"], ["a", "x", "y", "c"], [{"n": n} for n in "axyc"])
+  assert steps == [
+    ("keep", ["i0"], []),
+    ("update", ["i1"], [{"n": "x"}]),
+    ("insert", [], [{"n": "y"}]),
+    ("keep", ["i2"], []),
+  ]
+
+
+def test_upsert_diffs_against_the_page_and_recreates_only_when_it_is_gone(monkeypatch):
+  tool, fake = _tool(monkeypatch)
+  publish = lambda lines: tool.execute({"title": "notes", "content": "\n".join(lines), "upsert": True})
+  lines = [f"line {i}" for i in range(5)]
+  first = publish(lines)["id"]
+
+  # Someone edited the page in Notion: a block was deleted and one reworded
+  del fake.blocks[1]
+  fake.blocks[2] = {**fake.blocks[2], "paragraph": {"rich_text": [{"type": "text", "text": {"content": "edited"}}]}}
+  lines[4] = "line four"
+  res = publish(lines)
+  assert (res["outcome"], res["id"]) == ("updated", first)
+  assert fake.text() == lines
+
+  # A block that vanishes mid-edit falls back to a full rewrite of the same page
+  real = notion_page_tool._diff
+  def stale(children, blocks):
+    return real([{**children[0], "id": "gone"}] + children[1:], blocks)
+  monkeypatch.setattr(notion_page_tool, "_diff", stale)
+  lines = ["only"] + lines[1:]
+  fake.calls.clear()
+  res = publish(lines)
+  assert fake.calls[:3] == ["GET blocks", "PATCH blocks", "GET blocks"]
+  monkeypatch.setattr(notion_page_tool, "_diff", real)
+  assert (res["outcome"], res["id"]) == ("updated", first)
+  assert fake.text() == lines
+
+  # The page itself in the trash: a new one is created
+  fake.page["in_trash"] = True
+  res = publish(["again"])
+  assert res["outcome"] == "created" and res["id"] != first
+  assert fake.text() == ["again"]
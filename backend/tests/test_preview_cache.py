@@ -0,0 +1,71 @@
+from fastapi.testclient import TestClient
+
+from backend.core.config import reload_settings
+from backend.core.metrics import metrics
+from backend.main import create_app
+from backend.tools.base import BaseTool
+from backend.tools.router import tool_router
+from backend.utils.hash import canonical_hash
+
+
+class CountingTool(BaseTool):
+  name = "counting"
+  cacheable_preview = True
+
+  def __init__(self):
+    self.previews = 0
+    self.executions = 0
+
+  def preview(self, payload: dict) -> tuple[str, list[dict]]:
+    self.previews += 1
+    return ("count", [payload])
+
+  def execute(self, payload: dict) -> dict:
+    self.executions += 1
+    return {"n": self.executions}
+
+
+def test_canonical_hash_ignores_key_order():
+  assert canonical_hash({"a": 1, "b": [1, {"x": 2, "y": 3}]}) == canonical_hash({"b": [1, {"y": 3, "x": 2}], "a": 1})
+
+
+def test_preview_is_cached_per_canonical_payload(monkeypatch):
+  tool = CountingTool()
+  monkeypatch.setitem(tool_router._tools, "counting", tool)
+  client = TestClient(create_app())
+  hits = metrics.counter_value("zelo_preview_cache_total", tool="counting", outcome="hit")
+
+  client.post("/api/preview", json={"tool": "counting", "payload": {"a": 1, "b": 2}})
+  r = client.post("/api/preview", json={"tool": "counting", "payload": {"b": 2, "a": 1}})
+  assert r.json()["actions"] == [{"a": 1, "b": 2}]
+  assert tool.previews == 1
+  assert metrics.counter_value("zelo_preview_cache_total", tool="counting", outcome="hit") == hits + 1
+
+  monkeypatch.setattr(CountingTool, "cacheable_preview", False)
+  client.post("/api/preview", json={"tool": "counting", "payload": {"a": 1, "b": 2}})
+  assert tool.previews == 2
+
+
+def test_execute_without_key_uses_derived_idempotency_key(monkeypatch):
+  monkeypatch.setenv("AUTO_IDEMPOTENCY_KEY", "true")
+  reload_settings()
+  tool = CountingTool()
+  monkeypatch.setitem(tool_router._tools, "counting", tool)
+  client = TestClient(create_app())
+  headers = {"X-Approved": "true"}
+
+  r1 = client.post("/api/execute", headers=headers, json={"tool": "counting", "payload": {"a": 1}})
+  r2 = client.post("/api/execute", headers=headers, json={"tool": "counting", "payload": {"a": 1}})
+  assert r1.json() == r2.json()
+  assert tool.executions == 1
+
+  # Dry runs of tools with live previews are not replayed
+  monkeypatch.setattr(CountingTool, "cacheable_preview", False)
+  client.post("/api/execute", headers=headers, json={"tool": "counting", "payload": {"a": 1}, "dry_run": True})
+  client.post("/api/execute", headers=headers, json={"tool": "counting", "payload": {"a": 1}, "dry_run": True})
+  assert tool.previews == 2
+
+  monkeypatch.setenv("AUTO_IDEMPOTENCY_KEY", "false")
+  reload_settings()
+  client.post("/api/execute", headers=headers, json={"tool": "counting", "payload": {"a": 1}})
+  assert tool.executions == 2
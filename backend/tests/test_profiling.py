@@ -0,0 +1,67 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.core.config import reload_settings
+from backend.main import create_app
+from backend.tools.base import BaseTool
+from backend.tools.router import tool_router
+
+
+class SlowTool(BaseTool):
+  name = "slow"
+
+  def preview(self, payload: dict) -> tuple[str, list[dict]]:
+    return "slow", []
+
+  def execute(self, payload: dict) -> dict:
+    _busy(0.05)
+    return {"id": None}
+
+
+def _busy(seconds: float) -> None:
+  end = time.perf_counter() + seconds
+  while time.perf_counter() < end:
+    pass
+
+
+def test_server_timing_reports_execute_phases(monkeypatch):
+  monkeypatch.setitem(tool_router._tools, "slow", SlowTool())
+  client = TestClient(create_app())
+  headers = {"X-Approved": "true", "X-Idempotency-Key": "timing"}
+  r = client.post("/api/execute", headers=headers, json={"tool": "slow", "payload": {}})
+  assert r.status_code == 200
+  phases = {p.split(";")[0].strip(): p for p in r.headers["server-timing"].split(",")}
+  assert {"tool", "journal", "validate", "serialize", "total"} <= set(phases)
+  assert float(phases["tool"].split("dur=")[1]) >= 50
+  assert "x-profile-id" not in r.headers
+
+
+def test_profile_header_needs_api_key_and_is_downloadable(monkeypatch):
+  monkeypatch.setitem(tool_router._tools, "slow", SlowTool())
+  monkeypatch.setenv("PROFILE_INTERVAL_MS", "1")
+  monkeypatch.setenv("PROFILE_MAX_ENTRIES", "1")
+  reload_settings()
+  client = TestClient(create_app())
+  body = {"tool": "slow", "payload": {}}
+
+  # Without API_KEY configured the header is ignored
+  r = client.post("/api/execute", headers={"X-Approved": "true", "X-Profile": "1"}, json=body)
+  assert "x-profile-id" not in r.headers
+
+  monkeypatch.setenv("API_KEY", "secret")
+  reload_settings()
+  headers = {"X-Approved": "true", "X-Profile": "1", "X-API-Key": "secret"}
+  first = client.post("/api/execute", headers=headers, json={**body, "payload": {"n": 1}}).headers["x-profile-id"]
+  pid = client.post("/api/execute", headers=headers, json={**body, "payload": {"n": 2}}).headers["x-profile-id"]
+
+  listed = client.get("/api/debug/profiles", headers={"X-API-Key": "secret"}).json()["items"]
+  assert [p["id"] for p in listed] == [pid]
+  assert client.get(f"/api/debug/profiles/{first}", headers={"X-API-Key": "secret"}).status_code == 404
+
+  folded = client.get(f"/api/debug/profiles/{pid}", headers={"X-API-Key": "secret"})
+  assert "attachment" in folded.headers["content-disposition"]
+  assert "_busy" in folded.text
+  detail = client.get(f"/api/debug/profiles/{pid}", params={"format": "json"}, headers={"X-API-Key": "secret"}).json()
+  assert detail["samples"] > 0 and any(t["phase"] == "tool" for t in detail["timings"])
+  assert client.get("/api/debug/profiles").status_code == 401
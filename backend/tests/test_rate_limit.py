@@ -0,0 +1,25 @@
+from backend.integrations.rate_limit import _MemoryState, _SqliteState
+
+
+def test_gcra_allows_burst_then_spaces_calls():
+  state = _MemoryState()
+  delays = [state.reserve("notion", 0.5, 2) for _ in range(4)]
+  assert delays[0] == 0.0 and delays[1] == 0.0
+  assert 0.4 < delays[2] <= 0.5
+  assert 0.9 < delays[3] <= 1.0
+
+
+def test_sqlite_state_is_shared_between_instances():
+  a, b = _SqliteState(), _SqliteState()
+  try:
+    assert a.reserve("notion", 1.0, 1) == 0.0
+    assert b.reserve("notion", 1.0, 1) > 0.9
+  finally:
+    a.close()
+    b.close()
+
+
+def test_gcra_cost_reserves_several_slots():
+  state = _MemoryState()
+  assert state.reserve("google", 0.1, 10, cost=10) == 0.0
+  assert 0.9 < state.reserve("google", 0.1, 10, cost=10) <= 1.0
@@ -0,0 +1,44 @@
+import httpx
+import pytest
+
+from backend.services import retry_service
+from backend.services.retry_service import POLICIES, call_with_retry, classify
+
+
+def _status_error(status: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+  req = httpx.Request("POST", "https://example.test")
+  res = httpx.Response(status, headers=headers or {}, request=req)
+  return httpx.HTTPStatusError("boom", request=req, response=res)
+
+
+def test_classify_honors_retry_after_and_4xx():
+  info = classify(_status_error(429, {"Retry-After": "2"}), POLICIES["notion"])
+  assert info.retryable and info.safe and info.retry_after == 2.0
+  assert not classify(_status_error(400), POLICIES["notion"]).retryable
+  assert not classify(RuntimeError("payload.database_id is required"), POLICIES["notion"]).retryable
+
+
+def test_call_with_retry_retries_only_what_is_safe(monkeypatch):
+  sleeps = []
+  monkeypatch.setattr(retry_service.time, "sleep", sleeps.append)
+
+  errors = [_status_error(429, {"Retry-After": "1"}), _status_error(503)]
+
+  def flaky():
+    if errors:
+      raise errors.pop(0)
+    return "ok"
+
+  assert call_with_retry("notion", flaky) == "ok"
+  assert len(sleeps) == 2 and sleeps[0] >= 1.0
+
+  # a create that hit an ambiguous 5xx is not replayed
+  calls = []
+
+  def create():
+    calls.append(1)
+    raise _status_error(502)
+
+  with pytest.raises(httpx.HTTPStatusError):
+    call_with_retry("notion", create, idempotent=False)
+  assert len(calls) == 1
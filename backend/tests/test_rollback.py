@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+
+from backend.core.metrics import metrics
+from backend.main import create_app
+from backend.services.journal_service import journal
+from backend.tools.base import BaseTool
+from backend.tools.router import tool_router
+
+
+class FakeTool(BaseTool):
+  name = "fake"
+  provider = "none"
+
+  def __init__(self):
+    self.undone = []
+
+  def preview(self, payload: dict) -> tuple[str, list[dict]]:
+    return ("fake", [payload])
+
+  def execute(self, payload: dict) -> dict:
+    return {"id": payload["id"]}
+
+  def compensation(self, payload: dict, result: dict) -> dict | None:
+    return {"action": "fake.delete", "id": result["id"]}
+
+  def compensate(self, action: dict) -> None:
+    if action["id"] == "boom":
+      raise RuntimeError("provider said no")
+    self.undone.append(action["id"])
+
+
+def test_execute_journals_and_rollback_compensates(monkeypatch):
+  tool = FakeTool()
+  monkeypatch.setitem(tool_router._tools, "fake", tool)
+  client = TestClient(create_app())
+  headers = {"X-Approved": "true"}
+
+  ids = []
+  for obj in ("a", "b", "boom"):
+    r = client.post("/api/execute", headers=headers, json={"tool": "fake", "payload": {"id": obj}})
+    assert r.status_code == 200
+    ids.append(r.json()["execution_id"])
+  assert journal.get(ids[0]).object_id == "a"
+
+  r = client.post("/api/rollback", headers=headers, json={"execution_ids": ids + ["missing"]})
+  body = r.json()
+  assert body["ok"] is False
+  assert [i["ok"] for i in body["items"]] == [True, True, False, False]
+  assert sorted(tool.undone) == ["a", "b"]
+  assert journal.get(ids[0]).status == "rolled_back"
+  assert journal.get(ids[2]).status == "rollback_failed"
+
+  # Second rollback is a no-op for entries already undone
+  r = client.post("/api/rollback", headers=headers, json={"execution_id": ids[0]})
+  assert r.json()["items"][0]["message"] == "already rolled back"
+  assert sorted(tool.undone) == ["a", "b"]
+
+  assert client.post("/api/rollback", headers=headers, json={}).status_code == 400
+
+
+def test_journal_failure_does_not_fail_the_execute(monkeypatch):
+  monkeypatch.setitem(tool_router._tools, "fake", FakeTool())
+
+  def broken(*args, **kwargs):
+    raise OSError("database is locked")
+
+  monkeypatch.setattr(journal, "append", broken)
+  before = metrics.counter_value("zelo_journal_failures_total", tool="fake")
+  r = TestClient(create_app()).post("/api/execute", headers={"X-Approved": "true"}, json={"tool": "fake", "payload": {"id": "a"}})
+  assert r.status_code == 200
+  assert r.json()["result"] == {"id": "a"} and r.json()["execution_id"] is None
+  assert metrics.counter_value("zelo_journal_failures_total", tool="fake") == before + 1
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend.core.config import reload_settings
+from backend.core.idempotency import CachedResponse, IdempotencyStore
+from backend.core.state import MemoryStateBackend, SqliteStateBackend
+from backend.services.log_service import add_log, list_logs, log_writer
+
+
+@pytest.mark.parametrize("cls", [MemoryStateBackend, SqliteStateBackend])
+def test_set_if_absent_claims_once_until_expiry(cls):
+  backend = cls()
+  try:
+    assert backend.set_if_absent("k", b"a", 0.2)
+    assert not backend.set_if_absent("k", b"b", 10)
+    backend.release("k", b"other")
+    assert backend.get("k") == b"a"
+    time.sleep(0.25)
+    assert backend.get("k") is None
+    assert backend.set_if_absent("k", b"c", 10)
+    backend.release("k", b"c")
+    assert backend.get("k") is None
+  finally:
+    backend.close()
+
+
+def test_sqlite_claim_is_atomic_across_connections():
+  backends = [SqliteStateBackend() for _ in range(8)]
+  wins = []
+  barrier = threading.Barrier(len(backends))
+
+  def _claim(b):
+    barrier.wait()
+    wins.append(b.set_if_absent("race", b"x", 10))
+
+  threads = [threading.Thread(target=_claim, args=(b,)) for b in backends]
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  for b in backends:
+    b.close()
+  assert sorted(wins) == [False] * 7 + [True]
+
+
+def test_workers_share_idempotent_results_and_logs(monkeypatch):
+  monkeypatch.setenv("STATE_BACKEND", "sqlite")
+  monkeypatch.setenv("STATE_POLL_INTERVAL_SECONDS", "0.01")
+  reload_settings()
+  # Two stores stand in for two uvicorn workers
+  a, b = IdempotencyStore(), IdempotencyStore()
+  calls = []
+
+  async def _run():
+    calls.append(1)
+    await asyncio.sleep(0.1)
+    return CachedResponse(body=b'{"ok":true}', headers=(("X-Trace", "1"),))
+
+  async def main():
+    return await asyncio.gather(a.arun_tracked("k", _run), b.arun_tracked("k", _run))
+
+  (va, ra), (vb, rb) = asyncio.run(main())
+  assert len(calls) == 1
+  assert va == vb and sorted([ra, rb]) == [False, True]
+  assert IdempotencyStore().get("k") == va
+  assert a.stats()["shared_hits"] + b.stats()["shared_hits"] == 1
+
+  add_log("INFO", "from worker a")
+  assert log_writer.flush()
+  assert [i.message for i in list_logs()][:1] == ["from worker a"]
+  other = SqliteStateBackend()
+  assert other.last_log_seq() >= 1
+  other.close()
+
+
+def test_failed_claim_is_released_for_other_workers(monkeypatch):
+  monkeypatch.setenv("STATE_BACKEND", "sqlite")
+  reload_settings()
+  store = IdempotencyStore()
+
+  def _boom():
+    raise RuntimeError("provider down")
+
+  with pytest.raises(RuntimeError):
+    store.run("k", _boom)
+  assert IdempotencyStore().run("k", lambda: {"v": 1}) == {"v": 1}
+
+
+def test_shared_log_append_failure_does_not_fail_the_caller(monkeypatch):
+  monkeypatch.setenv("STATE_BACKEND", "sqlite")
+  reload_settings()
+
+  def _down(*args):
+    raise OSError("disk full")
+
+  monkeypatch.setattr(SqliteStateBackend, "append_log", _down)
+  add_log("INFO", "execute completed")
+  assert log_writer.flush()
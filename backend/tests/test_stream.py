@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from backend.core.config import reload_settings
+from backend.integrations.notion_client import AsyncNotionClient
+from backend.main import create_app
+from backend.tools.base import BaseTool, Progress
+from backend.tools.router import tool_router
+
+APPROVED = {"X-Approved": "true"}
+
+
+class StepTool(BaseTool):
+  name = "steps"
+
+  def __init__(self):
+    self.runs = 0
+
+  def preview(self, payload: dict) -> tuple[str, list[dict]]:
+    return "steps", []
+
+  def execute(self, payload: dict) -> dict:
+    self.runs += 1
+    return {"id": "obj-1"}
+
+  async def aexecute_with_progress(self, payload: dict, progress: Progress) -> dict:
+    for i in range(payload["n"]):
+      progress({"event": "progress", "done": i + 1, "total": payload["n"], "unit": "steps"})
+    progress({"event": "created", "id": "obj-1"})
+    return await self.aexecute(payload)
+
+
+def _ndjson(res) -> list[dict]:
+  return [json.loads(line) for line in res.text.splitlines() if line.strip()]
+
+
+def test_stream_emits_progress_then_result_and_replays(monkeypatch):
+  monkeypatch.setenv("AUTO_IDEMPOTENCY_KEY", "true")
+  reload_settings()
+  tool = StepTool()
+  monkeypatch.setitem(tool_router._tools, "steps", tool)
+  client = TestClient(create_app())
+  body = {"tool": "steps", "payload": {"n": 3}}
+
+  res = client.post("/api/execute/stream", params={"format": "ndjson"}, headers=APPROVED, json=body)
+  events = _ndjson(res)
+  assert [e["event"] for e in events] == ["queued", "started", "progress", "progress", "progress", "created", "result"]
+  assert events[-1]["replayed"] is False
+  assert events[-1]["response"]["result"] == {"id": "obj-1"}
+
+  # The derived key is shared with /execute: both replay the stored result
+  again = _ndjson(client.post("/api/execute/stream", params={"format": "ndjson"}, headers=APPROVED, json=body))
+  assert [e["event"] for e in again] == ["queued", "result"]
+  assert again[-1]["replayed"] is True and again[-1]["response"] == events[-1]["response"]
+  plain = client.post("/api/execute", headers=APPROVED, json=body)
+  assert plain.headers["idempotent-replay"] == "true"
+  assert tool.runs == 1
+
+
+def test_stream_sse_format_and_errors(monkeypatch):
+  monkeypatch.setitem(tool_router._tools, "steps", StepTool())
+  client = TestClient(create_app())
+  res = client.post("/api/execute/stream", headers=APPROVED, json={"tool": "steps", "payload": {"n": 1}})
+  assert res.headers["content-type"].startswith("text/event-stream")
+  blocks = [b for b in res.text.split("\n\n") if b]
+  assert blocks[0].startswith("id: 1\nevent: queued\ndata: ")
+  assert blocks[-1].split("\n")[1] == "event: result"
+
+  # A payload the tool rejects fails in-band, after the stream has started
+  failed = _ndjson(client.post("/api/execute/stream", params={"format": "ndjson"}, headers=APPROVED, json={"tool": "steps", "payload": {}}))
+  assert failed[-1]["event"] == "error" and failed[-1]["status"] == 500
+  assert client.post("/api/execute/stream", headers=APPROVED, json={"tool": "nope", "payload": {}}).status_code == 400
+
+
+def test_notion_create_page_reports_block_progress(monkeypatch):
+  monkeypatch.setenv("NOTION_TOKEN", "secret")
+  monkeypatch.setenv("NOTION_PARENT_PAGE_ID", "parent")
+  monkeypatch.setenv("NOTION_RATE_LIMIT_PER_SEC", "0")
+  reload_settings()
+
+  def handler(req: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"object": "page", "id": "page-1", "url": "u"})
+
+  async def main():
+    client = AsyncNotionClient()
+    client._sdk.client._transport = httpx.MockTransport(handler)
+    events = []
+    await client.create_page(title="t", content="\n".join(f"l{i}" for i in range(250)), progress=events.append)
+    await client.aclose()
+    return events
+
+  events = asyncio.run(main())
+  assert events[0] == {"event": "created", "id": "page-1", "url": "u"}
+  assert [e["done"] for e in events[1:]] == [100, 200, 250]
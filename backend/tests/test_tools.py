@@ -1,3 +1,7 @@
+import asyncio
+import threading
+
+from backend.tools.base import BaseTool
 from backend.tools.router import tool_router
 
 
@@ -7,3 +11,57 @@ def test_tool_router_known_tool():
   assert "Notion" in summary
   assert actions
 
+
+
+def test_sync_tool_runs_through_async_fallback():
+  class EchoTool(BaseTool):
+    name = "echo"
+
+    def preview(self, payload: dict) -> tuple[str, list[dict]]:
+      return ("echo", [payload])
+
+    def execute(self, payload: dict) -> dict:
+      return {"thread": threading.current_thread().name, **payload}
+
+  tool = EchoTool()
+  res = asyncio.run(tool.aexecute({"x": 1}))
+  assert res["x"] == 1
+  assert res["thread"] != threading.main_thread().name
+  assert asyncio.run(tool.apreview({"x": 1})) == ("echo", [{"x": 1}])
+
+
+class _Ep:
+  def __init__(self, name: str, value: str):
+    self.name = name
+    self.value = value
+
+
+def test_router_imports_tools_on_first_use_and_discovers_plugins(monkeypatch):
+  from backend.tools import router as router_module
+  from backend.tools.router import ToolRouter
+
+  monkeypatch.setattr(
+    router_module,
+    "entry_points",
+    lambda group: [_Ep("plugin_echo", "backend.tests.test_tools:PluginTool"), _Ep("notion_page", "x:Y")],
+  )
+  router = ToolRouter({"notion_page": "backend.tools.notion_page_tool:NotionPageTool"})
+  assert router._tools == {}
+
+  assert router.get("plugin_echo").name == "plugin_echo"
+  # built-in names cannot be taken over by plugins
+  assert type(router.get("notion_page")).__name__ == "NotionPageTool"
+  assert set(router.load_seconds) == {"plugin_echo", "notion_page"}
+  assert router.names() == ["notion_page", "plugin_echo"]
+  assert router.preload(["*"]) == ["notion_page", "plugin_echo"]
+  assert router.preload(["missing"]) == []
+
+
+class PluginTool(BaseTool):
+  name = "plugin_echo"
+
+  def preview(self, payload: dict) -> tuple[str, list[dict]]:
+    return ("plugin", [payload])
+
+  def execute(self, payload: dict) -> dict:
+    return payload
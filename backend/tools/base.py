@@ -1,10 +1,23 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from collections.abc import Callable
+
+from starlette.concurrency import run_in_threadpool
+
+# Progress callback for streaming executes. Events are dicts with an "event"
+# key: "progress" ({"done", "total", "unit"}), "created" (a provider object,
+# {"id", "url", "index"}) or "item_failed" ({"index", "error"}). Safe to call
+# from any thread.
+Progress = Callable[[dict], None]
 
 
 class BaseTool(ABC):
   name: str
+  provider: str = "none"  # integration the tool talks to (metrics label)
+  # True when preview() is a pure function of the payload, so identical
+  # payloads can be served from the preview cache
+  cacheable_preview: bool = False
 
   @abstractmethod
   def preview(self, payload: dict) -> tuple[str, list[dict]]:
@@ -14,3 +27,27 @@ class BaseTool(ABC):
   def execute(self, payload: dict) -> dict:
     raise NotImplementedError
 
+  # Async variants used by the API. Tools with a native async client override
+  # these; sync-only tools keep working through a threadpool offload.
+  async def apreview(self, payload: dict) -> tuple[str, list[dict]]:
+    return await run_in_threadpool(self.preview, payload)
+
+  async def aexecute(self, payload: dict) -> dict:
+    return await run_in_threadpool(self.execute, payload)
+
+  # Streaming execute (/api/execute/stream). Tools that can report steps as
+  # they go override this; the default runs aexecute with no progress.
+  async def aexecute_with_progress(self, payload: dict, progress: Progress) -> dict:
+    return await self.aexecute(payload)
+
+  # Rollback support. compensation() turns an execute result into a JSON
+  # action stored in the execution journal; compensate() undoes it later.
+  # Tools without side effects to undo keep the defaults.
+  def compensation(self, payload: dict, result: dict) -> dict | None:
+    return None
+
+  def compensate(self, action: dict) -> None:
+    raise NotImplementedError(f"{self.name} does not support rollback")
+
+  async def acompensate(self, action: dict) -> None:
+    await run_in_threadpool(self.compensate, action)
@@ -1,29 +1,223 @@
-from backend.tools.base import BaseTool
-from backend.integrations.google_client import GoogleClient
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import get_settings
+from backend.tools.base import BaseTool, Progress
+from backend.integrations.calendar_cache import calendar_cache, parse_time, to_iso
+from backend.integrations.registry import get_async_google_client, get_google_client
+
+logger = logging.getLogger("app.calendar")
 
 
 class CalendarTool(BaseTool):
   name = "calendar_event"
+  provider = "google"
+  # Previews look at the calendar's current events, which change
+  cacheable_preview = False
 
+  # Bulk mode: {"events": [{title, start_iso, end_iso, description}, ...],
+  # "calendar_id": ...} inserts every event through Google batch requests.
+  # When Google is configured, previews list the events each new one would
+  # overlap and, for a single event, suggest free slots of the same length.
   def preview(self, payload: dict) -> tuple[str, list[dict]]:
-    title = payload.get("title") or "(no title)"
-    return (f"캘린더 이벤트 생성: {title}", [{"action": "calendar.create_event", "payload": payload}])
+    cal_id = _checked_calendar(payload)
+    if cal_id is not None and not _sync(cal_id):
+      cal_id = None
+    return _preview(payload, cal_id)
+
+  async def apreview(self, payload: dict) -> tuple[str, list[dict]]:
+    cal_id = _checked_calendar(payload)
+    if cal_id is not None and not await _async_sync(cal_id):
+      cal_id = None
+    return _preview(payload, cal_id)
 
   def execute(self, payload: dict) -> dict:
-    title = payload.get("title") or "Untitled"
-    start_iso = payload.get("start_iso")
-    end_iso = payload.get("end_iso")
-    description = payload.get("description")
-    calendar_id = payload.get("calendar_id")
-    if not start_iso or not end_iso:
-      raise RuntimeError("start_iso and end_iso are required")
-    g = GoogleClient()
-    ev = g.create_event(
-      title=title,
-      start_iso=start_iso,
-      end_iso=end_iso,
-      description=description,
-      calendar_id=calendar_id,
+    g = get_google_client()
+    if "events" in payload:
+      items = g.create_events(_bulk_events(payload), calendar_id=payload.get("calendar_id"))
+      _record_items(payload, items)
+      return _bulk_result(items)
+    ev = g.create_event(**_event_args(payload))
+    calendar_cache.record(_calendar_id(payload), ev)
+    return _result(ev)
+
+  async def aexecute(self, payload: dict) -> dict:
+    if "events" in payload:
+      # The batch endpoint is multipart; reuse the sync googleapiclient path
+      return await run_in_threadpool(self.execute, payload)
+    g = get_async_google_client()
+    ev = await g.create_event(**_event_args(payload))
+    calendar_cache.record(_calendar_id(payload), ev)
+    return _result(ev)
+
+  async def aexecute_with_progress(self, payload: dict, progress: Progress) -> dict:
+    if "events" in payload:
+      g = get_google_client()
+      items = await run_in_threadpool(g.create_events, _bulk_events(payload), payload.get("calendar_id"), progress)
+      _record_items(payload, items)
+      return _bulk_result(items)
+    result = await self.aexecute(payload)
+    progress({"event": "created", "id": result["id"], "url": result["htmlLink"]})
+    return result
+
+  def compensation(self, payload: dict, result: dict) -> dict | None:
+    if "items" in result:
+      ids = [i["id"] for i in result["items"] if i.get("id")]
+      if not ids:
+        return None
+      return {"action": "calendar.delete_events", "event_ids": ids, "calendar_id": payload.get("calendar_id")}
+    if not result.get("id"):
+      return None
+    return {"action": "calendar.delete_event", "event_id": result["id"], "calendar_id": payload.get("calendar_id")}
+
+  def compensate(self, action: dict) -> None:
+    g = get_google_client()
+    for event_id in _compensated_ids(action):
+      g.delete_event(event_id=event_id, calendar_id=action.get("calendar_id"))
+      calendar_cache.discard(_calendar_id(action), event_id)
+
+  async def acompensate(self, action: dict) -> None:
+    g = get_async_google_client()
+    await asyncio.gather(
+      *(g.delete_event(event_id=event_id, calendar_id=action.get("calendar_id")) for event_id in _compensated_ids(action))
     )
-    return {"provider": "google_calendar", "action": "create_event", "id": ev.get("id"), "htmlLink": ev.get("htmlLink")}
+    for event_id in _compensated_ids(action):
+      calendar_cache.discard(_calendar_id(action), event_id)
+
+
+def _calendar_id(payload: dict) -> str | None:
+  return payload.get("calendar_id") or get_settings().google_calendar_id
+
+
+def _checked_calendar(payload: dict) -> str | None:
+  # Without Google credentials previews stay payload-only
+  if not get_settings().google_service_account_json:
+    return None
+  return _calendar_id(payload)
+
+
+def _sync(cal_id: str) -> bool:
+  # A failed sync falls back to whatever the cache already holds
+  try:
+    g = get_google_client()
+    calendar_cache.refresh(cal_id, lambda token, page: g.list_events(calendar_id=cal_id, sync_token=token, page_token=page))
+  except Exception:  # noqa: BLE001
+    logger.warning("calendar %s sync failed; previewing against cached events", cal_id, exc_info=True)
+  return calendar_cache.synced(cal_id)
+
+
+async def _async_sync(cal_id: str) -> bool:
+  try:
+    g = get_async_google_client()
+    await calendar_cache.arefresh(cal_id, lambda token, page: g.list_events(calendar_id=cal_id, sync_token=token, page_token=page))
+  except Exception:  # noqa: BLE001
+    logger.warning("calendar %s sync failed; previewing against cached events", cal_id, exc_info=True)
+  return calendar_cache.synced(cal_id)
+
+
+def _preview(payload: dict, cal_id: str | None) -> tuple[str, list[dict]]:
+  if "events" in payload:
+    events = _bulk_events(payload)
+    actions = [{"action": "calendar.create_event", "payload": e} for e in events]
+    summary = f"캘린더 이벤트 {len(events)}개 생성"
+    if cal_id is not None:
+      clashing = sum(_check(a, cal_id, suggest=False) > 0 for a in actions)
+      if clashing:
+        summary += f" (일정이 겹치는 이벤트 {clashing}개)"
+    return summary, actions
+  title = payload.get("title") or "(no title)"
+  action = {"action": "calendar.create_event", "payload": payload}
+  summary = f"캘린더 이벤트 생성: {title}"
+  if cal_id is not None and (n := _check(action, cal_id, suggest=True)):
+    summary += f" (겹치는 일정 {n}개)"
+  return summary, [action]
+
+
+def _check(action: dict, cal_id: str, suggest: bool) -> int:
+  # Adds "conflicts" (and "suggestions") to the action; returns the number
+  # of conflicts. Payloads without parseable times are left as they are.
+  ev = action["payload"]
+  try:
+    start, end = parse_time(ev["start_iso"]), parse_time(ev["end_iso"])
+    tz = datetime.fromisoformat(ev["start_iso"]).tzinfo or timezone.utc
+  except (KeyError, TypeError, ValueError):
+    return 0
+  if end <= start:
+    return 0
+  conflicts = calendar_cache.conflicts(cal_id, start, end)
+  action["conflicts"] = [c.as_dict(tz) for c in conflicts]
+  if suggest:
+    settings = get_settings()
+    slots = []
+    if conflicts:
+      slots = calendar_cache.free_slots(
+        cal_id, start, end - start, settings.calendar_suggest_horizon_hours * 3600, settings.calendar_suggestions
+      )
+    action["suggestions"] = [{"start_iso": to_iso(a, tz), "end_iso": to_iso(b, tz)} for a, b in slots]
+  return len(conflicts)
+
+
+def _record_items(payload: dict, items: list[dict]) -> None:
+  cal_id = _calendar_id(payload)
+  for item in items:
+    if item["ok"]:
+      calendar_cache.record(cal_id, item["event"])
+
+
+def _event_args(payload: dict) -> dict:
+  start_iso = payload.get("start_iso")
+  end_iso = payload.get("end_iso")
+  if not start_iso or not end_iso:
+    raise RuntimeError("start_iso and end_iso are required")
+  return {
+    "title": payload.get("title") or "Untitled",
+    "start_iso": start_iso,
+    "end_iso": end_iso,
+    "description": payload.get("description"),
+    "calendar_id": payload.get("calendar_id"),
+  }
+
+
+def _bulk_events(payload: dict) -> list[dict]:
+  events = payload.get("events")
+  if not isinstance(events, list) or not events:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="events must be a non-empty list")
+  limit = get_settings().batch_max_items
+  if len(events) > limit:
+    raise HTTPException(status_code=413, detail=f"at most {limit} events")
+  args = []
+  for e in events:
+    a = _event_args(e)
+    a.pop("calendar_id")
+    args.append(a)
+  return args
+
+
+def _bulk_result(items: list[dict]) -> dict:
+  out = []
+  for index, item in enumerate(items):
+    if item["ok"]:
+      ev = item["event"]
+      out.append({"index": index, "ok": True, "id": ev.get("id"), "htmlLink": ev.get("htmlLink")})
+    else:
+      out.append({"index": index, "ok": False, "error": item["error"], "status": item["status"]})
+  created = sum(i["ok"] for i in out)
+  return {
+    "provider": "google_calendar",
+    "action": "create_events",
+    "created": created,
+    "failed": len(out) - created,
+    "items": out,
+  }
+
+
+def _compensated_ids(action: dict) -> list[str]:
+  return action["event_ids"] if "event_ids" in action else [action["event_id"]]
+
 
+def _result(ev: dict) -> dict:
+  return {"provider": "google_calendar", "action": "create_event", "id": ev.get("id"), "htmlLink": ev.get("htmlLink")}
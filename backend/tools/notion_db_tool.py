@@ -1,19 +1,170 @@
-from backend.tools.base import BaseTool
-from backend.integrations.notion_client import NotionClient
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from backend.core.config import get_settings
+from backend.tools.base import BaseTool, Progress
+from backend.integrations.notion_schema import aprepare_rows, checked, invalidate_on_error, prepare_rows
+from backend.integrations.registry import get_async_notion_client, get_notion_client
 
 
 class NotionDbTool(BaseTool):
   name = "notion_db"
+  provider = "notion"
+  cacheable_preview = True
 
+  # Properties are validated and coerced against the database schema before
+  # anything is sent. Bulk mode: {"database_id": ..., "rows": [{...}, ...]}
+  # inserts rows concurrently and reports each one.
   def preview(self, payload: dict) -> tuple[str, list[dict]]:
+    if "rows" in payload:
+      rows = _bulk_rows(payload)
+      return (f"Notion DB 작업: {len(rows)}행 추가", [{"action": "notion.db", "payload": payload}])
     return ("Notion DB 작업", [{"action": "notion.db", "payload": payload}])
 
+  async def apreview(self, payload: dict) -> tuple[str, list[dict]]:
+    return self.preview(payload)
+
   def execute(self, payload: dict) -> dict:
-    database_id = payload.get("database_id")
-    properties = payload.get("properties") or {}
-    if not database_id:
-      raise RuntimeError("payload.database_id is required")
-    notion = NotionClient()
-    page = notion.create_db_row(database_id=database_id, properties=properties)
-    return {"provider": "notion", "action": "db_insert", "id": page.get("id"), "url": page.get("url")}
+    notion = get_notion_client()
+    database_id = _database_id(payload)
+    if "rows" in payload:
+      return self._execute_bulk(notion, database_id, _bulk_rows(payload))
+    [prepared] = prepare_rows(notion, database_id, [payload.get("properties") or {}])
+    properties = checked(database_id, prepared)
+    try:
+      page = notion.create_db_row(database_id=database_id, properties=properties)
+    except Exception as e:
+      invalidate_on_error(database_id, e)
+      raise
+    return _result(page)
+
+  async def aexecute(self, payload: dict) -> dict:
+    notion = get_async_notion_client()
+    database_id = _database_id(payload)
+    if "rows" in payload:
+      return await self._aexecute_bulk(notion, database_id, _bulk_rows(payload))
+    [prepared] = await aprepare_rows(notion, database_id, [payload.get("properties") or {}])
+    properties = checked(database_id, prepared)
+    try:
+      page = await notion.create_db_row(database_id=database_id, properties=properties)
+    except Exception as e:
+      invalidate_on_error(database_id, e)
+      raise
+    return _result(page)
+
+  async def aexecute_with_progress(self, payload: dict, progress: Progress) -> dict:
+    if "rows" in payload:
+      notion = get_async_notion_client()
+      return await self._aexecute_bulk(notion, _database_id(payload), _bulk_rows(payload), progress)
+    result = await self.aexecute(payload)
+    progress({"event": "created", "id": result["id"], "url": result["url"]})
+    return result
+
+  def _execute_bulk(self, notion, database_id: str, rows: list[dict]) -> dict:
+    prepared = prepare_rows(notion, database_id, rows)
+
+    def _insert(index: int) -> dict:
+      properties, errors = prepared[index]
+      if errors:
+        return {"index": index, "ok": False, "errors": errors}
+      try:
+        page = notion.create_db_row(database_id=database_id, properties=properties)
+      except Exception as e:  # noqa: BLE001
+        invalidate_on_error(database_id, e)
+        return {"index": index, "ok": False, "error": str(e)}
+      return {"index": index, "ok": True, "id": page.get("id"), "url": page.get("url")}
+
+    with ThreadPoolExecutor(max_workers=_concurrency()) as pool:
+      items = list(pool.map(_insert, range(len(rows))))
+    return _bulk_result(items)
+
+  async def _aexecute_bulk(self, notion, database_id: str, rows: list[dict], progress: Progress | None = None) -> dict:
+    prepared = await aprepare_rows(notion, database_id, rows)
+    sem = asyncio.Semaphore(_concurrency())
+    done = 0
+
+    async def _insert(index: int) -> dict:
+      nonlocal done
+      item = await _insert_one(index)
+      if progress is not None:
+        done += 1
+        if item["ok"]:
+          progress({"event": "created", "index": index, "id": item["id"], "url": item["url"]})
+        else:
+          progress({"event": "item_failed", "index": index, "error": item.get("error") or item.get("errors")})
+        progress({"event": "progress", "done": done, "total": len(rows), "unit": "rows"})
+      return item
+
+    async def _insert_one(index: int) -> dict:
+      properties, errors = prepared[index]
+      if errors:
+        return {"index": index, "ok": False, "errors": errors}
+      try:
+        # Pacing comes from the Notion rate limiter; the semaphore only caps
+        # requests in flight
+        async with sem:
+          page = await notion.create_db_row(database_id=database_id, properties=properties)
+      except Exception as e:  # noqa: BLE001
+        invalidate_on_error(database_id, e)
+        return {"index": index, "ok": False, "error": str(e)}
+      return {"index": index, "ok": True, "id": page.get("id"), "url": page.get("url")}
+
+    items = await asyncio.gather(*(_insert(i) for i in range(len(rows))))
+    return _bulk_result(list(items))
+
+  def compensation(self, payload: dict, result: dict) -> dict | None:
+    if "items" in result:
+      ids = [i["id"] for i in result["items"] if i.get("id")]
+      return {"action": "notion.archive_pages", "page_ids": ids} if ids else None
+    return {"action": "notion.archive_page", "page_id": result["id"]} if result.get("id") else None
+
+  def compensate(self, action: dict) -> None:
+    notion = get_notion_client()
+    for page_id in _compensated_ids(action):
+      notion.archive_page(page_id=page_id)
+
+  async def acompensate(self, action: dict) -> None:
+    notion = get_async_notion_client()
+    await asyncio.gather(*(notion.archive_page(page_id=page_id) for page_id in _compensated_ids(action)))
+
+
+def _database_id(payload: dict) -> str:
+  database_id = payload.get("database_id")
+  if not database_id:
+    raise RuntimeError("payload.database_id is required")
+  return database_id
+
+
+def _bulk_rows(payload: dict) -> list[dict]:
+  rows = payload.get("rows")
+  if not isinstance(rows, list) or not rows or not all(isinstance(r, dict) for r in rows):
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="rows must be a non-empty list of objects")
+  limit = get_settings().batch_max_items
+  if len(rows) > limit:
+    raise HTTPException(status_code=413, detail=f"at most {limit} rows")
+  return rows
+
+
+def _concurrency() -> int:
+  return max(1, get_settings().notion_bulk_concurrency)
+
+
+def _compensated_ids(action: dict) -> list[str]:
+  return action["page_ids"] if "page_ids" in action else [action["page_id"]]
+
+
+def _bulk_result(items: list[dict]) -> dict:
+  created = sum(i["ok"] for i in items)
+  return {
+    "provider": "notion",
+    "action": "db_insert_many",
+    "created": created,
+    "failed": len(items) - created,
+    "items": items,
+  }
+
 
+def _result(page: dict) -> dict:
+  return {"provider": "notion", "action": "db_insert", "id": page.get("id"), "url": page.get("url")}
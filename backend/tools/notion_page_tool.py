@@ -1,19 +1,286 @@
-from backend.tools.base import BaseTool
-from backend.integrations.notion_client import NotionClient
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import get_settings
+from backend.core.state import get_state_backend
+from backend.core.timing import phase
+from backend.tools.base import BaseTool, Progress
+from backend.integrations.notion_client import text_to_blocks
+from backend.integrations.notion_pages import PageEntry, Step, block_hashes, listed_hashes, page_index, page_key, plan_blocks
+from backend.integrations.registry import get_async_notion_client, get_notion_client
+
+_LOCK_PREFIX = "notion-page:"  # state backend key claimed while upserting a page
 
 
 class NotionPageTool(BaseTool):
   name = "notion_page"
+  provider = "notion"
+  cacheable_preview = True
 
+  # {"upsert": true} publishes into the page an earlier upsert created under
+  # the same parent and title: unchanged content makes no Notion call, changed
+  # content rewrites only the blocks that differ, and a new key creates it.
   def preview(self, payload: dict) -> tuple[str, list[dict]]:
     title = payload.get("title") or "(no title)"
+    if payload.get("upsert"):
+      return (f"Notion 페이지 생성/갱신: {title}", [{"action": "notion.upsert_page", "payload": payload}])
     return (f"Notion 페이지 생성: {title}", [{"action": "notion.create_page", "payload": payload}])
 
+  async def apreview(self, payload: dict) -> tuple[str, list[dict]]:
+    return self.preview(payload)
+
   def execute(self, payload: dict) -> dict:
-    title = payload.get("title") or "Untitled"
-    content = payload.get("content") or ""
-    parent_page_id = payload.get("parent_page_id")
-    notion = NotionClient()
-    page = notion.create_page(title=title, content=content, parent_page_id=parent_page_id)
-    return {"provider": "notion", "action": "create_page", "id": page.get("id"), "url": page.get("url")}
+    notion = get_notion_client()
+    if payload.get("upsert"):
+      return _upsert(notion, payload)
+    page = notion.create_page(**_page_args(payload))
+    return _result(page)
+
+  async def aexecute(self, payload: dict) -> dict:
+    notion = get_async_notion_client()
+    if payload.get("upsert"):
+      return await _aupsert(notion, payload)
+    page = await notion.create_page(**_page_args(payload))
+    return _result(page)
+
+  async def aexecute_with_progress(self, payload: dict, progress: Progress) -> dict:
+    # Long content is appended in chunks after the page exists
+    notion = get_async_notion_client()
+    if payload.get("upsert"):
+      return await _aupsert(notion, payload, progress)
+    page = await notion.create_page(**_page_args(payload), progress=progress)
+    return _result(page)
+
+  def compensation(self, payload: dict, result: dict) -> dict | None:
+    # Rolling back an upsert that edited an existing page is not supported
+    if not result.get("id") or result.get("outcome", "created") != "created":
+      return None
+    return {"action": "notion.archive_page", "page_id": result["id"]}
+
+  def compensate(self, action: dict) -> None:
+    get_notion_client().archive_page(page_id=action["page_id"])
+    page_index.forget_page(action["page_id"])
+
+  async def acompensate(self, action: dict) -> None:
+    await get_async_notion_client().archive_page(page_id=action["page_id"])
+    await run_in_threadpool(page_index.forget_page, action["page_id"])
+
+
+def _page_args(payload: dict) -> dict:
+  return {
+    "title": payload.get("title") or "Untitled",
+    "content": payload.get("content") or "",
+    "parent_page_id": payload.get("parent_page_id"),
+  }
+
+
+def _upsert_plan(args: dict) -> tuple[str, list[dict], list[str]]:
+  settings = get_settings()
+  parent = args["parent_page_id"] or settings.notion_parent_page_id or f"database:{settings.notion_database_id}"
+  key = page_key(args["title"], parent)
+  with phase("blocks"):
+    blocks = text_to_blocks(args["content"])
+    hashes = block_hashes(blocks)
+  return key, blocks, hashes
+
+
+@contextmanager
+def _claimed(key: str):
+  # One upsert per page key at a time, through the state backend like
+  # idempotency claims (across workers when it is shared); otherwise two
+  # first publishes would both create the page
+  backend, token = get_state_backend(), uuid.uuid4().hex.encode()
+  settings = get_settings()
+  while not backend.set_if_absent(_LOCK_PREFIX + key, token, settings.idempotency_lease_seconds):
+    time.sleep(settings.state_poll_interval_seconds)
+  try:
+    yield
+  finally:
+    backend.release(_LOCK_PREFIX + key, token)
+
+
+@asynccontextmanager
+async def _aclaimed(key: str):
+  backend, token = get_state_backend(), uuid.uuid4().hex.encode()
+  settings = get_settings()
+  while not await run_in_threadpool(backend.set_if_absent, _LOCK_PREFIX + key, token, settings.idempotency_lease_seconds):
+    await asyncio.sleep(settings.state_poll_interval_seconds)
+  try:
+    yield
+  finally:
+    await run_in_threadpool(backend.release, _LOCK_PREFIX + key, token)
+
+
+def _gone(notion_page: dict | None) -> bool:
+  # Only the page itself missing (or in the trash) means "create it again";
+  # a single block that vanished does not
+  return notion_page is None or bool(notion_page.get("in_trash") or notion_page.get("archived"))
+
+
+def _edit_failed(entry: PageEntry) -> PageEntry:
+  # The page may be half edited: drop its hashes so the next upsert diffs
+  # instead of answering "unchanged"
+  return PageEntry(entry.page_id, entry.url, [])
+
+
+def _upsert(notion, payload: dict) -> dict:
+  args = _page_args(payload)
+  key, blocks, hashes = _upsert_plan(args)
+  with _claimed(key):
+    entry = page_index.get(key)
+    if entry is not None and entry.hashes == hashes:
+      return _upsert_result(entry.page_id, entry.url, "unchanged", 0)
+    if entry is not None:
+      try:
+        written = _rewrite(notion, entry.page_id, blocks)
+      except Exception as e:
+        if not _maybe_gone(e) or not _gone(_retrieve(notion, entry.page_id)):
+          page_index.put(key, _edit_failed(entry))
+          raise
+        page_index.forget(key)
+      else:
+        page_index.put(key, PageEntry(entry.page_id, entry.url, hashes))
+        return _upsert_result(entry.page_id, entry.url, "updated", written)
+    page = notion.create_page(**args)
+    page_index.put(key, PageEntry(page["id"], page.get("url"), hashes))
+  return _upsert_result(page["id"], page.get("url"), "created", len(blocks))
+
+
+async def _aupsert(notion, payload: dict, progress: Progress | None = None) -> dict:
+  args = _page_args(payload)
+  key, blocks, hashes = _upsert_plan(args)
+  async with _aclaimed(key):
+    entry = await run_in_threadpool(page_index.get, key)
+    if entry is not None and entry.hashes == hashes:
+      return _upsert_result(entry.page_id, entry.url, "unchanged", 0)
+    if entry is not None:
+      try:
+        written = await _arewrite(notion, entry.page_id, blocks)
+      except Exception as e:
+        if not _maybe_gone(e) or not _gone(await _aretrieve(notion, entry.page_id)):
+          await run_in_threadpool(page_index.put, key, _edit_failed(entry))
+          raise
+        await run_in_threadpool(page_index.forget, key)
+      else:
+        await run_in_threadpool(page_index.put, key, PageEntry(entry.page_id, entry.url, hashes))
+        return _upsert_result(entry.page_id, entry.url, "updated", written)
+    page = await notion.create_page(**args, progress=progress)
+    await run_in_threadpool(page_index.put, key, PageEntry(page["id"], page.get("url"), hashes))
+  return _upsert_result(page["id"], page.get("url"), "created", len(blocks))
+
+
+def _maybe_gone(exc: BaseException) -> bool:
+  # 404 for a deleted page, 400 when editing one that is in the trash
+  return getattr(exc, "status", None) in (400, 404)
+
+
+def _retrieve(notion, page_id: str) -> dict | None:
+  try:
+    return notion.retrieve_page(page_id)
+  except Exception as e:
+    if getattr(e, "status", None) == 404:
+      return None
+    raise
+
+
+async def _aretrieve(notion, page_id: str) -> dict | None:
+  try:
+    return await notion.retrieve_page(page_id)
+  except Exception as e:
+    if getattr(e, "status", None) == 404:
+      return None
+    raise
+
+
+def _rewrite(notion, page_id: str, blocks: list[dict]) -> int:
+  # The diff runs against the page as it is now, so edits made in Notion
+  # since the last upsert are corrected too. If a block disappears or
+  # Notion rejects an edit while editing, the page is rewritten in full.
+  steps = _diff(notion.list_children(page_id), blocks)
+  try:
+    _apply(notion, page_id, steps)
+  except Exception as e:
+    if not _stale(e):
+      raise
+    steps = _full(notion.list_children(page_id), blocks)
+    _apply(notion, page_id, steps)
+  return _written(steps)
+
+
+async def _arewrite(notion, page_id: str, blocks: list[dict]) -> int:
+  steps = _diff(await notion.list_children(page_id), blocks)
+  try:
+    await _aapply(notion, page_id, steps)
+  except Exception as e:
+    if not _stale(e):
+      raise
+    steps = _full(await notion.list_children(page_id), blocks)
+    await _aapply(notion, page_id, steps)
+  return _written(steps)
+
+
+def _stale(exc: BaseException) -> bool:
+  status = getattr(exc, "status", None)
+  return status == 404 or (status == 400 and getattr(exc, "code", None) == "validation_error")
+
+
+def _diff(children: list[dict], blocks: list[dict]) -> list[Step]:
+  ids, kinds = [c["id"] for c in children], [c.get("type") for c in children]
+  return plan_blocks(ids, listed_hashes(children), block_hashes(blocks), blocks, kinds)
+
+
+def _full(children: list[dict], blocks: list[dict]) -> list[Step]:
+  return [("delete", [c["id"] for c in children], []), ("insert", [], blocks)]
+
+
+def _apply(notion, page_id: str, steps: list[Step]) -> None:
+  out: list[str] = []  # the page's block ids so far, to insert after
+  for kind, ids, blocks in steps:
+    if kind == "keep":
+      out.extend(ids)
+    elif kind == "update":
+      notion.update_block(ids[0], blocks[0])
+      out.extend(ids)
+    elif kind == "delete":
+      for block_id in ids:
+        notion.delete_block(block_id)
+    else:
+      out.extend(notion.append_blocks(page_id, blocks, after=out[-1] if out else None))
+
+
+async def _aapply(notion, page_id: str, steps: list[Step]) -> None:
+  out: list[str] = []
+  for kind, ids, blocks in steps:
+    if kind == "keep":
+      out.extend(ids)
+    elif kind == "update":
+      await notion.update_block(ids[0], blocks[0])
+      out.extend(ids)
+    elif kind == "delete":
+      for block_id in ids:
+        await notion.delete_block(block_id)
+    else:
+      out.extend(await notion.append_blocks(page_id, blocks, after=out[-1] if out else None))
+
+
+def _written(steps: list[Step]) -> int:
+  return sum(len(blocks) for kind, _ids, blocks in steps if kind in ("update", "insert"))
+
+
+def _result(page: dict) -> dict:
+  return {"provider": "notion", "action": "create_page", "id": page.get("id"), "url": page.get("url")}
+
 
+def _upsert_result(page_id: str, url: str | None, outcome: str, blocks_written: int) -> dict:
+  return {
+    "provider": "notion",
+    "action": "upsert_page",
+    "outcome": outcome,  # created | updated | unchanged
+    "id": page_id,
+    "url": url,
+    "blocks_written": blocks_written,
+  }
@@ -1,24 +1,108 @@
+import importlib
+import logging
+import threading
+import time
+from importlib.metadata import entry_points
+
 from fastapi import HTTPException, status
 
+from backend.core.config import get_settings
+from backend.core.metrics import metrics
+from backend.core.timing import record
 from backend.tools.base import BaseTool
-from backend.tools.calendar_tool import CalendarTool
-from backend.tools.notion_db_tool import NotionDbTool
-from backend.tools.notion_page_tool import NotionPageTool
+
+logger = logging.getLogger("app.tools")
+
+metrics.describe("zelo_tool_import_seconds", "Time to import and construct a tool on first use")
+
+# name -> "module:Class". Modules (and the provider SDKs behind them) are only
+# imported when a tool is first used, so a worker serving Notion traffic never
+# pays for googleapiclient.
+BUILTIN_TOOLS = {
+  "notion_page": "backend.tools.notion_page_tool:NotionPageTool",
+  "notion_db": "backend.tools.notion_db_tool:NotionDbTool",
+  "calendar_event": "backend.tools.calendar_tool:CalendarTool",
+}
+
+# Third-party packages register tools under this entry point group, e.g.
+#   [project.entry-points."zelo.tools"]
+#   jira_issue = "zelo_jira.tool:JiraIssueTool"
+ENTRY_POINT_GROUP = "zelo.tools"
 
 
 class ToolRouter:
-  def __init__(self, tools: list[BaseTool]):
-    self._tools = {t.name: t for t in tools}
+  def __init__(self, specs: dict[str, str]):
+    self._specs = dict(specs)
+    self._tools: dict[str, BaseTool] = {}
+    self._lock = threading.Lock()
+    self._discovered = False
+    self.load_seconds: dict[str, float] = {}
+
+  def register(self, name: str, spec: str) -> None:
+    with self._lock:
+      self._specs[name] = spec
+      self._tools.pop(name, None)
+
+  def discover(self) -> None:
+    # Entry points are read once; built-in names cannot be overridden
+    if self._discovered:
+      return
+    self._discovered = True
+    if not get_settings().tool_entry_points:
+      return
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+      if ep.name in self._specs:
+        logger.warning("tool %s from %s ignored: name already registered", ep.name, ep.value)
+        continue
+      self._specs[ep.name] = ep.value
+
+  def names(self) -> list[str]:
+    self.discover()
+    return sorted(set(self._specs) | set(self._tools))
+
+  def _load(self, name: str) -> BaseTool:
+    spec = self._specs[name]
+    module, _, attr = spec.partition(":")
+    start = time.perf_counter()
+    cls = getattr(importlib.import_module(module), attr)
+    tool = cls()
+    if not isinstance(tool, BaseTool):
+      raise TypeError(f"{spec} is not a BaseTool")
+    elapsed = time.perf_counter() - start
+    self.load_seconds[name] = elapsed
+    record("tool_load", elapsed)
+    metrics.set_gauge("zelo_tool_import_seconds", elapsed, tool=name)
+    return tool
 
   def get(self, name: str) -> BaseTool:
     tool = self._tools.get(name)
-    if not tool:
+    if tool is not None:
+      return tool
+    if name not in self._specs:
+      self.discover()
+    if name not in self._specs:
       raise HTTPException(
         status_code=status.HTTP_400_BAD_REQUEST,
         detail=f"unknown tool: {name}",
       )
+    with self._lock:
+      tool = self._tools.get(name)
+      if tool is None:
+        tool = self._tools[name] = self._load(name)
     return tool
 
+  def preload(self, names: list[str]) -> list[str]:
+    # "*" loads every registered tool
+    if "*" in names:
+      names = self.names()
+    loaded = []
+    for name in names:
+      try:
+        self.get(name)
+        loaded.append(name)
+      except Exception:  # noqa: BLE001
+        logger.exception("preloading tool %s failed", name)
+    return loaded
 
-tool_router = ToolRouter([NotionPageTool(), NotionDbTool(), CalendarTool()])
 
+tool_router = ToolRouter(BUILTIN_TOOLS)
@@ -1,4 +1,3 @@
-from backend.services.retry_service import with_backoff
-
-__all__ = ["with_backoff"]
+from backend.services.retry_service import awith_backoff, with_backoff
 
+__all__ = ["awith_backoff", "with_backoff"]
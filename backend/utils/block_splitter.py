@@ -1,3 +1,26 @@
+from collections.abc import Iterator, Sequence
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
 def split_blocks(text: str) -> list[str]:
   return [b.strip() for b in text.split("\n\n") if b.strip()]
 
+
+def split_text(text: str, limit: int) -> list[str]:
+  # Split into pieces of at most `limit` chars, preferring a whitespace break
+  pieces: list[str] = []
+  while len(text) > limit:
+    cut = text.rfind(" ", limit // 2, limit)
+    cut = cut + 1 if cut != -1 else limit
+    pieces.append(text[:cut])
+    text = text[cut:]
+  if text:
+    pieces.append(text)
+  return pieces
+
+
+def chunked(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+  for i in range(0, len(items), size):
+    yield items[i : i + size]
@@ -0,0 +1,25 @@
+import json
+
+from fastapi.responses import JSONResponse
+
+from backend.core.config import get_settings
+
+try:
+  import orjson
+except ImportError:  # optional speedup
+  orjson = None
+
+
+def json_bytes(value: object) -> bytes:
+  # Compact UTF-8 JSON; orjson when installed unless JSON_ENCODER=std
+  if orjson is not None and get_settings().json_encoder != "std":
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+  return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+  # For handlers that build responses from plain dicts. Routes with a
+  # response_model keep FastAPI's own Pydantic serialization, which is
+  # already direct-to-bytes.
+  def render(self, content: object) -> bytes:
+    return json_bytes(content)
@@ -1,6 +1,15 @@
 import hashlib
+import json
 
 
 def sha256(text: str) -> str:
   return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
+
+def canonical_json(value: object) -> str:
+  # Sorted keys and fixed separators: equal payloads always serialize alike
+  return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def canonical_hash(value: object) -> str:
+  return sha256(canonical_json(value))
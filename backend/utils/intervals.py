@@ -0,0 +1,76 @@
+from bisect import insort
+
+
+class IntervalIndex:
+  # Half-open [start, end) intervals kept sorted by start, read as an implicit
+  # balanced search tree: the node for slice [lo, hi) is its middle element
+  # and _max_end[mid] holds the largest end in that slice. Queries skip every
+  # subtree that ends before the window or starts after it, so finding the k
+  # overlaps costs O(log n + k). Writes only mark the index dirty; the tree
+  # is rebuilt (O(n)) on the next query, which suits a cache that is read far
+  # more often than synced.
+  def __init__(self):
+    self._items: list[tuple[float, float, str]] = []  # (start, end, key)
+    self._max_end: list[float] = []
+    self._dirty = False
+
+  def __len__(self) -> int:
+    return len(self._items)
+
+  def add(self, start: float, end: float, key: str) -> None:
+    insort(self._items, (start, end, key))
+    self._dirty = True
+
+  def remove(self, start: float, end: float, key: str) -> None:
+    self._items.remove((start, end, key))
+    self._dirty = True
+
+  def replace(self, items: list[tuple[float, float, str]]) -> None:
+    self._items = sorted(items)
+    self._dirty = True
+
+  def clear(self) -> None:
+    self.replace([])
+
+  def _build(self) -> None:
+    items = self._items
+    max_end = [0.0] * len(items)
+
+    def fill(lo: int, hi: int) -> float:
+      mid = (lo + hi) // 2
+      best = items[mid][1]
+      if lo < mid:
+        best = max(best, fill(lo, mid))
+      if mid + 1 < hi:
+        best = max(best, fill(mid + 1, hi))
+      max_end[mid] = best
+      return best
+
+    if items:
+      fill(0, len(items))
+    self._max_end = max_end
+    self._dirty = False
+
+  def overlapping(self, start: float, end: float) -> list[tuple[float, float, str]]:
+    # Intervals sharing any time with [start, end), ordered by start
+    if self._dirty:
+      self._build()
+    items, max_end = self._items, self._max_end
+    out = []
+    stack = [(0, len(items))]
+    while stack:
+      lo, hi = stack.pop()
+      if lo >= hi:
+        continue
+      mid = (lo + hi) // 2
+      if max_end[mid] <= start:
+        continue
+      item = items[mid]
+      stack.append((lo, mid))
+      # Everything right of mid starts at or after items[mid]
+      if item[0] < end:
+        if item[1] > start:
+          out.append(item)
+        stack.append((mid + 1, hi))
+    out.sort()
+    return out